@@ -1,10 +1,36 @@
 import os
+import threading
 from PyPDF2 import PdfReader
 from livekit.agents import function_tool, RunContext
 
 from . import config
 
 
+# Extracted PDF text, re-read only when the file changes
+_text_cache: dict = {}
+_text_lock = threading.Lock()
+
+
+def load_company_text(pdf_path: str = None) -> str:
+    """Return the extracted text of the company PDF, cached in process memory."""
+    pdf_path = pdf_path or config.COMPANY_INFO_PDF
+    st = os.stat(pdf_path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _text_lock:
+        cached = _text_cache.get(pdf_path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    reader = PdfReader(pdf_path)
+    text = ""
+    for page in reader.pages:
+        page_text = page.extract_text() or ""
+        text += page_text + "\n"
+    with _text_lock:
+        _text_cache[pdf_path] = (stamp, text)
+    return text
+
+
 @function_tool()
 async def company_info(context: RunContext, query: str = "general") -> str:
     """
@@ -17,11 +43,7 @@ async def company_info(context: RunContext, query: str = "general") -> str:
         if not os.path.exists(pdf_path):
             return "Company information file is missing."
 
-        reader = PdfReader(pdf_path)
-        text = ""
-        for page in reader.pages:
-            page_text = page.extract_text() or ""
-            text += page_text + "\n"
+        text = load_company_text(pdf_path)
 
         if not text.strip():
             return "Company information could not be extracted."
@@ -38,5 +60,3 @@ async def company_info(context: RunContext, query: str = "general") -> str:
 
     except Exception as e:
         return f"Error reading company information: {str(e)}"
-
-
@@ -0,0 +1,34 @@
+import os
+import threading
+from typing import Dict, Tuple
+
+import pandas as pd
+
+
+# Parsed CSVs kept in process memory, keyed by path and read options.
+# Entries are re-read when the file's mtime or size changes.
+_csv_cache: Dict[Tuple, Tuple[Tuple[int, int], pd.DataFrame]] = {}
+_lock = threading.Lock()
+
+
+def read_csv(path: str, **kwargs) -> pd.DataFrame:
+    """Drop-in for pd.read_csv that serves a private copy of a cached parse."""
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    key = (os.path.abspath(path), tuple(sorted((k, repr(v)) for k, v in kwargs.items())))
+    with _lock:
+        cached = _csv_cache.get(key)
+    if cached is None or cached[0] != stamp:
+        df = pd.read_csv(path, **kwargs)
+        with _lock:
+            _csv_cache[key] = (stamp, df)
+    else:
+        df = cached[1]
+    # callers add helper columns, so never hand out the cached frame itself
+    return df.copy()
+
+
+def clear() -> None:
+    """Forget all cached CSVs."""
+    with _lock:
+        _csv_cache.clear()
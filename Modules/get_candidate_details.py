@@ -1,11 +1,10 @@
 import os
 import smtplib
-import pandas as pd
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from livekit.agents import function_tool, RunContext
 
-from . import config
+from . import config, data_cache
 
 # Simple session memory
 otp_sessions = {}
@@ -14,7 +13,7 @@ otp_sessions = {}
 @function_tool()
 async def get_candidate_details(context: RunContext, candidate_name: str, interview_code: str) -> str:
     try:
-        df_candidates = pd.read_csv(config.CANDIDATE_CSV, dtype=str).fillna("")
+        df_candidates = data_cache.read_csv(config.CANDIDATE_CSV, dtype=str).fillna("")
         df_candidates["InterviewCode_norm"] = (
             df_candidates["Interview Code"].astype(str).str.encode("ascii", "ignore").str.decode("ascii").str.strip().str.replace(r"[^0-9A-Za-z]", "", regex=True).str.upper()
         )
@@ -45,7 +44,7 @@ async def get_candidate_details(context: RunContext, candidate_name: str, interv
         cand_role = record["Interview Role"]
         cand_time = record["Interview Time"]
 
-        df_employees = pd.read_csv(config.EMPLOYEE_CSV, dtype=str).fillna("")
+        df_employees = data_cache.read_csv(config.EMPLOYEE_CSV, dtype=str).fillna("")
         df_employees["Name_norm"] = df_employees["Name"].astype(str).str.strip().str.lower()
         interviewer = df_employees[df_employees["Name_norm"] == interviewer_name.strip().lower()]
         if interviewer.empty:
@@ -5,7 +5,7 @@ from datetime import datetime
 import pandas as pd
 from livekit.agents import function_tool, RunContext
 
-from . import config
+from . import config, data_cache
 from .state import otp_sessions, employee_access
 from .send_email import send_email_smtp
 
@@ -29,7 +29,7 @@ async def get_employee_details(context: RunContext, name: str, employee_id: str,
         # Check if employee was authenticated via face recognition FIRST
         if employee_access.get(empid_norm, {}).get("granted") and employee_access[empid_norm]["source"] == "face":
             # Skip all validation for face-recognized employees
-            df = pd.read_csv(config.EMPLOYEE_CSV)
+            df = data_cache.read_csv(config.EMPLOYEE_CSV)
             df["EmployeeID_norm"] = df["EmployeeID"].astype(str).str.strip().str.upper()
             
             id_match = df[df["EmployeeID_norm"] == empid_norm]
@@ -40,7 +40,7 @@ async def get_employee_details(context: RunContext, name: str, employee_id: str,
             emp_name = record["Name"]
             # Skip OTP verification for face-recognized employees
             try:
-                df_mgr = pd.read_csv(config.MANAGER_VISIT_CSV, dtype=str).fillna("")
+                df_mgr = data_cache.read_csv(config.MANAGER_VISIT_CSV, dtype=str).fillna("")
                 df_mgr["Visit Date"] = pd.to_datetime(df_mgr["Visit Date"]).dt.strftime("%Y-%m-%d")
                 today = datetime.now().strftime("%Y-%m-%d")
                 mgr_match = df_mgr[
@@ -63,7 +63,7 @@ async def get_employee_details(context: RunContext, name: str, employee_id: str,
             return f"✅ Welcome back, {emp_name}! You have full access to all tools."
         
         # Regular validation for non-face-recognized employees
-        df = pd.read_csv(config.EMPLOYEE_CSV)
+        df = data_cache.read_csv(config.EMPLOYEE_CSV)
         df["Name_norm"] = df["Name"].astype(str).str.strip().str.lower()
         df["EmployeeID_norm"] = df["EmployeeID"].astype(str).str.strip().str.upper()
 
@@ -115,7 +115,7 @@ async def get_employee_details(context: RunContext, name: str, employee_id: str,
             employee_access[empid_norm]["source"] = "otp"
 
             try:
-                df_mgr = pd.read_csv(config.MANAGER_VISIT_CSV, dtype=str).fillna("")
+                df_mgr = data_cache.read_csv(config.MANAGER_VISIT_CSV, dtype=str).fillna("")
                 df_mgr["Visit Date"] = pd.to_datetime(df_mgr["Visit Date"]).dt.strftime("%Y-%m-%d")
                 today = datetime.now().strftime("%Y-%m-%d")
                 mgr_match = df_mgr[
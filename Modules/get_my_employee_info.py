@@ -1,8 +1,7 @@
 import re
-import pandas as pd
 from livekit.agents import function_tool, RunContext
 
-from . import config
+from . import config, data_cache
 from .state import employee_access
 
 
@@ -44,7 +43,7 @@ async def get_my_employee_info(context: RunContext, employee_id: str = None) ->
             return "❌ You need to be authenticated first. Please use face recognition or OTP verification."
         
         # Load employee data
-        df = pd.read_csv(config.EMPLOYEE_CSV)
+        df = data_cache.read_csv(config.EMPLOYEE_CSV)
         df["EmployeeID_norm"] = df["EmployeeID"].astype(str).str.strip().str.upper()
         
         # Find employee record
@@ -101,7 +100,7 @@ async def get_employee_field(context: RunContext, name: str, field: str) -> str:
             return "❌ You need to be authenticated first. Please use face recognition or OTP verification."
         
         # Load employee data
-        df = pd.read_csv(config.EMPLOYEE_CSV)
+        df = data_cache.read_csv(config.EMPLOYEE_CSV)
         df["Name_norm"] = df["Name"].astype(str).str.strip().str.lower()
         
         name_norm = re.sub(r"\s+", " ", name).strip().lower()
@@ -200,7 +199,7 @@ async def get_employee_by_name(context: RunContext, name: str) -> str:
     """
     try:
         # Load employee data
-        df = pd.read_csv(config.EMPLOYEE_CSV)
+        df = data_cache.read_csv(config.EMPLOYEE_CSV)
         df["Name_norm"] = df["Name"].astype(str).str.strip().str.lower()
         
         name_norm = re.sub(r"\s+", " ", name).strip().lower()
@@ -278,7 +277,7 @@ async def who_am_i(context: RunContext) -> str:
             return "❌ You need to be authenticated first. Please use face recognition or OTP verification."
 
         # Load employee data
-        df = pd.read_csv(config.EMPLOYEE_CSV, dtype=str).fillna("")
+        df = data_cache.read_csv(config.EMPLOYEE_CSV, dtype=str).fillna("")
         df["EmployeeID_norm"] = df["EmployeeID"].astype(str).str.strip().str.upper()
 
         match = df[df["EmployeeID_norm"] == empid_norm]
@@ -2,7 +2,7 @@ import pandas as pd
 from datetime import datetime
 from livekit.agents import function_tool, RunContext
 
-from . import config
+from . import config, data_cache
 from .send_email import send_email_smtp
 
 
@@ -26,7 +26,7 @@ async def log_and_notify_visitor(context: RunContext, visitor_name: str, phone:
         df = pd.concat([df, pd.DataFrame([log_entry])], ignore_index=True)
         df.to_csv(config.VISITOR_LOG, index=False)
 
-        df_employees = pd.read_csv(config.EMPLOYEE_CSV, dtype=str).fillna("")
+        df_employees = data_cache.read_csv(config.EMPLOYEE_CSV, dtype=str).fillna("")
         df_employees["Name_norm"] = df_employees["Name"].str.strip().str.lower()
         emp_match = df_employees[df_employees["Name_norm"] == meeting_employee.strip().lower()]
         if emp_match.empty:
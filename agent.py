@@ -7,11 +7,20 @@ import logging
 from logging import handlers
 import threading
 import asyncio
+import time
 from livekit import agents
 from livekit.agents import AgentSession, Agent, RoomInputOptions
 from livekit.plugins import noise_cancellation, google, tavus
 from prompts import AGENT_INSTRUCTION, SESSION_INSTRUCTION
 from face_recognition import start_face_greeting, retry_face_recognition, reset_face_recognition_state, new_user_detected, register_employee_face, request_employee_face_registration, complete_employee_face_registration
+from face_recognition import models as face_models
+from face_recognition.embedding_store import open_store
+from face_recognition.face_integration import load_employee_db
+from face_recognition.photo_watcher import start_photo_watcher
+from face_recognition.recognize_wrapper import load_gallery
+from face_recognition.room_video import attach_room, detach_room
+from Modules import config, data_cache
+from Modules.company_info import load_company_text
 from Modules.tools_registry import (
     get_weather,
     send_email,
@@ -158,6 +167,40 @@ class Assistant(Agent):
         # )
         # logger.info("Assistant initialized with tools: %s", [t.__name__ for t in self.tools])
 
+def _prewarm_employee_directory():
+    load_employee_db(config.EMPLOYEE_CSV)
+    data_cache.read_csv(config.EMPLOYEE_CSV)
+    data_cache.read_csv(config.EMPLOYEE_CSV, dtype=str)
+    for optional_csv in (config.CANDIDATE_CSV, config.MANAGER_VISIT_CSV):
+        if os.path.exists(optional_csv):
+            data_cache.read_csv(optional_csv, dtype=str)
+
+
+def prewarm(proc: agents.JobProcess):
+    """Load face models and reference data into the worker process before its first job."""
+    started = time.time()
+    embeddings_path = os.getenv("VR_FACE_EMBEDDINGS", "face_embeddings.pkl")
+    steps = [
+        ("face_model", face_models.warmup),
+        ("face_detector", face_models.warmup_detector),
+        ("embeddings", lambda: load_gallery(embeddings_path)),
+        ("employee_directory", _prewarm_employee_directory),
+        ("company_info", load_company_text),
+    ]
+    ready = {}
+    for name, step in steps:
+        t0 = time.time()
+        try:
+            step()
+            ready[name] = True
+            logger.info("Prewarm: %s loaded in %.2fs", name, time.time() - t0)
+        except Exception as e:
+            ready[name] = False
+            logger.warning("Prewarm: %s not loaded: %s", name, e)
+    proc.userdata["prewarm"] = ready
+    logger.info("Worker ready in %.2fs (%s)", time.time() - started, ", ".join(f"{k}={'ok' if v else 'skipped'}" for k, v in ready.items()))
+
+
 async def entrypoint(ctx: agents.JobContext):
     # Initialize AgentSession
     session = AgentSession()
@@ -205,6 +248,16 @@ async def entrypoint(ctx: agents.JobContext):
         logger.exception("Failed to connect job context: %s", e)
         raise
 
+    # Recognize from the kiosk's published camera instead of a camera on this machine
+    if os.getenv("VR_VIDEO_SOURCE", "camera") == "room":
+        attach_room(ctx.room)
+        logger.info("Face recognition reading frames from the room video track.")
+
+        async def _detach_room_video():
+            detach_room()
+
+        ctx.add_shutdown_callback(_detach_room_video)
+
     # Reset face recognition state for new session
     reset_face_recognition_state()
     logger.info("Face recognition state reset.")
@@ -225,6 +278,18 @@ async def entrypoint(ctx: agents.JobContext):
 print("Tavus API Key being used:", os.getenv("TAVUS_API_KEY"))
 
 if __name__ == "__main__":
+    # auto-enroll new employee photos; job processes registering faces write to the same store,
+    # serialized by its lock file
+    if os.getenv("VR_PHOTO_WATCH", "0") == "1":
+        embeddings_file = os.getenv("VR_FACE_EMBEDDINGS", "face_embeddings.pkl")
+        # migrate a legacy pickle before the watcher's first sync merges photos into the store
+        open_store(embeddings_file)
+        start_photo_watcher(os.getenv("VR_EMP_PHOTOS", os.path.join("Employee", "EMP_Photos")), embeddings_file)
     agents.cli.run_app(
-        agents.WorkerOptions(entrypoint_fnc=entrypoint)
+        agents.WorkerOptions(
+            entrypoint_fnc=entrypoint,
+            prewarm_fnc=prewarm,
+            # loading the face model can take longer than the default process init timeout
+            initialize_process_timeout=float(os.getenv("VR_PREWARM_TIMEOUT", "60")),
+        )
     )
@@ -0,0 +1,166 @@
+"""
+Persistent camera capture.
+
+One background thread per device keeps grabbing frames so OpenCV's internal
+buffer never goes stale, and only the newest frame is kept. Face tools share
+the same service instead of opening and releasing the device on every call.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .frame_source import FrameSource
+
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_WIDTH = 640
+CAPTURE_HEIGHT = 480
+# Consecutive failed grabs after which the device is reopened
+REOPEN_AFTER_FAILURES = 30
+
+
+class CameraService(FrameSource):
+    """Owns one ``cv2.VideoCapture`` and publishes its newest frame."""
+
+    def __init__(self, index: int = 0, width: int = CAPTURE_WIDTH, height: int = CAPTURE_HEIGHT):
+        self.index = index
+        self.width = width
+        self.height = height
+        self._cap = None
+        self._frame: Optional[np.ndarray] = None
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _open(self) -> bool:
+        cap = cv2.VideoCapture(self.index)
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        # keep the driver queue short; the grab loop drains whatever is left
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        if not cap.isOpened():
+            cap.release()
+            return False
+        self._cap = cap
+        return True
+
+    def start(self) -> bool:
+        """Open the device and start the grab thread; returns False if the camera cannot be opened."""
+        if self._thread and self._thread.is_alive():
+            return True
+        if not self._open():
+            logger.error("Camera index %s could not be opened", self.index)
+            return False
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"camera-{self.index}", daemon=True)
+        self._thread.start()
+        logger.info("Camera index %s capture started", self.index)
+        return True
+
+    def is_opened(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        failures = 0
+        try:
+            while not self._stop.is_set():
+                ok, frame = self._cap.read()
+                if not ok:
+                    failures += 1
+                    if failures >= REOPEN_AFTER_FAILURES:
+                        logger.warning("Camera index %s stopped delivering frames; reopening", self.index)
+                        self._cap.release()
+                        if not self._open():
+                            time.sleep(1.0)
+                            continue
+                        failures = 0
+                    time.sleep(0.01)
+                    continue
+                failures = 0
+                # read() allocates a fresh array per frame, so publishing the reference is safe
+                with self._cond:
+                    self._frame = frame
+                    self._seq += 1
+                    self._cond.notify_all()
+        finally:
+            if self._cap is not None:
+                self._cap.release()
+                self._cap = None
+
+    def latest(self) -> Tuple[int, Optional[np.ndarray]]:
+        """Return ``(sequence, frame)`` for the newest frame without copying.
+
+        The frame is shared with other readers and must be treated as read-only;
+        copy it before drawing on it.
+        """
+        with self._cond:
+            return self._seq, self._frame
+
+    def wait_newer(self, after_seq: int, timeout: float = 1.0) -> Tuple[int, Optional[np.ndarray]]:
+        """Block until a frame newer than ``after_seq`` arrives; returns ``(after_seq, None)`` on timeout."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > after_seq or self._stop.is_set(), timeout=timeout):
+                return after_seq, None
+            if self._seq <= after_seq:
+                return after_seq, None
+            return self._seq, self._frame
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=2)
+        self._thread = None
+
+
+_cameras: Dict[int, CameraService] = {}
+_cameras_lock = threading.Lock()
+
+
+def get_camera(index: int = 0) -> CameraService:
+    """Return the shared capture service for ``index``, starting it on first use.
+
+    If the device cannot be opened the returned service reports
+    ``is_opened() == False`` and the next call tries again.
+    """
+    with _cameras_lock:
+        service = _cameras.get(index)
+        if service is not None and service.is_opened():
+            return service
+        service = CameraService(index)
+        if service.start():
+            _cameras[index] = service
+        else:
+            _cameras.pop(index, None)
+        return service
+
+
+def get_frame_source(index: int = 0):
+    """The frame source the face tools should read from.
+
+    Once the agent has attached its room (``room_video.attach_room``, done when
+    ``VR_VIDEO_SOURCE=room``) this is the room's video track, otherwise the
+    local camera ``index``. Both offer ``is_opened``, ``latest`` and ``cursor``.
+    """
+    from .room_video import get_room_source
+    source = get_room_source()
+    if source is not None and source.is_opened():
+        return source
+    return get_camera(index)
+
+
+def release_camera(index: Optional[int] = None):
+    """Stop the capture service for ``index``, or every service when no index is given."""
+    with _cameras_lock:
+        indexes = list(_cameras) if index is None else [index]
+        services = [_cameras.pop(i) for i in indexes if i in _cameras]
+    for service in services:
+        service.stop()
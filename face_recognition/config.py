@@ -1,3 +1,5 @@
+import os
+
 EMBEDDING_FILE = 'embeddings.pkl'
 
 SIMILARITY_THRESHOLD = 0.5
@@ -6,21 +8,178 @@ EMPLOYEE_PHOTOS_DIR = './photos'
 
 ARC_FACE_MODEL = 'ArcFace'
 
+# InsightFace analysis modules to load (comma-separated task names, or "all").
+# Only bbox/kps and the embedding are used, so landmarks and gender/age are skipped.
+_face_modules = os.getenv("VR_FACE_MODULES", "detection,recognition")
+FACE_MODULES = () if _face_modules.strip() == "all" else tuple(m.strip() for m in _face_modules.split(",") if m.strip())
+
+# Model tiers. The detection tier runs on every frame and should be cheap
+# (buffalo_s is SCRFD-500M); the recognition tier's pack produces the gallery
+# embeddings (enrollment uses it too) and its detector only re-localizes the
+# few face crops about to be embedded, at CONFIRM_DET_SIZE. Setting both tiers
+# to the same model and size runs a single model, as before. A detection pack
+# that is not installed falls back to the recognition pack (see
+# models.detection_pack), so only the recognition pack is ever required.
+DETECT_MODEL = os.getenv("VR_DETECT_MODEL", "buffalo_s")
+DETECT_SIZE = tuple(int(v) for v in os.getenv("VR_DETECT_SIZE", "320,320").split(","))
+RECOGNITION_MODEL = os.getenv("VR_RECOGNITION_MODEL", "buffalo_l")
+RECOGNITION_DET_SIZE = (640, 640)
+CONFIRM_DET_SIZE = (224, 224)
+CONFIRM_PAD = 0.5
+CONFIRM_MIN_IOU = 0.3
+# Aligned face crops per ArcFace run; every face of a frame (and of frames
+# queued behind it) is embedded in batches of up to this many
+REC_BATCH_SIZE = int(os.getenv("VR_REC_BATCH_SIZE", "16"))
+
+# ONNX Runtime session settings for the face models (models.session_settings).
+# ORT's default of one intra-op thread per core competes with the LiveKit audio
+# pipeline and noise cancellation, and idle spinning threads burn the cores
+# they free. VR_ORT_OPTIONS overrides these for every model as
+# "key=value,...", VR_ORT_OPTIONS_<PACK> (e.g. VR_ORT_OPTIONS_BUFFALO_S) for
+# one model pack; pick values with scripts/bench_ort_sweep.py.
+ORT_OPTIONS = {
+    "intra_op_threads": 2,  # 0 lets ORT use every physical core
+    "inter_op_threads": 1,
+    "graph_optimization": "all",  # disable, basic, extended or all
+    "memory_arena": True,
+    "execution_mode": "sequential",  # or parallel
+    "allow_spinning": False,
+}
+ORT_MODEL_OPTIONS = {}  # per-pack overrides, e.g. {"buffalo_s": {"intra_op_threads": 1}}
+
 FRAME_COUNT = 5
 
 CONSECUTIVE_REQUIRED = 3
 
-VAR_LAPLACIAN_MIN = 100.0
+# Quality gate between detection and recognition (quality.py): faces failing
+# any of these are not embedded. Sharpness is measured on a 112x112 crop, the
+# face ratio is the face's share of the frame width or height, and the pose
+# limits are in inter-eye distances (yaw) and eye-to-mouth heights (pitch).
+# Off by default: the thresholds are not calibrated for every lobby and webcam.
+# Gated faces are counted as faces_gated in the metrics and logged at debug
+# level with their scores, to tune the thresholds before turning the gate on.
+QUALITY_GATE = os.getenv("VR_QUALITY_GATE", "0") == "1"
+
+VAR_LAPLACIAN_MIN = float(os.getenv("VR_QUALITY_SHARPNESS_MIN", "100"))
 
-MIN_FACE_RATIO = 0.05
+MIN_FACE_RATIO = float(os.getenv("VR_QUALITY_FACE_RATIO_MIN", "0.05"))
 
-BRIGHTNESS_MIN = 60
-BRIGHTNESS_MAX = 200
+BRIGHTNESS_MIN = float(os.getenv("VR_QUALITY_BRIGHTNESS_MIN", "60"))
+BRIGHTNESS_MAX = float(os.getenv("VR_QUALITY_BRIGHTNESS_MAX", "200"))
+
+POSE_MAX_YAW = float(os.getenv("VR_QUALITY_MAX_YAW", "0.35"))
+POSE_MAX_PITCH = float(os.getenv("VR_QUALITY_MAX_PITCH", "0.2"))
 
 RECOG_TIME_LIMIT_SECS = 10
 
+# Identity decisions (decision.py): each fresh match adds (score - threshold) /
+# DECISION_SCORE_SCALE log-odds. An employee is accepted after
+# DECISION_MIN_FRAMES consecutive top-1 frames once the mean top-1/top-2 margin
+# clears EARLY_ACCEPT_MARGIN or the log-odds reach DECISION_ACCEPT_LOG_ODDS
+# (3.0 ~ 95%); DECISION_REJECT_FRAMES unknown frames with as much evidence reject.
 EARLY_ACCEPT_MARGIN = 0.05
+DECISION_MIN_FRAMES = 2
+DECISION_REJECT_FRAMES = 3
+DECISION_SCORE_SCALE = 0.05
+DECISION_ACCEPT_LOG_ODDS = 3.0
 
 PREFERRED_CAMERA_INDEX = 0
 
 PREFERRED_CAMERA_BACKEND = 'CAP_ANY'
+
+# Face tracking: a track keeps its cached identity until its box drifts below
+# TRACK_REEMBED_IOU of the box it was embedded at, or TRACK_REFRESH_SECS pass
+TRACK_IOU_MIN = 0.3
+TRACK_MAX_CENTROID_SHIFT = 0.5
+TRACK_MAX_MISSED = 5
+TRACK_REEMBED_IOU = 0.6
+TRACK_REFRESH_SECS = 2.0
+TRACK_CONFIRM_EMBEDS = 3
+
+# Which faces are recognized: "primary" embeds only the person addressing
+# Clara (largest, most central face; others stay tracked boxes), "all" embeds
+# every face. A new primary must outscore the current one by PRIMARY_SWITCH_RATIO.
+FACE_MODE = os.getenv("VR_FACE_MODE", "primary")
+PRIMARY_CENTER_WEIGHT = 0.5
+PRIMARY_SWITCH_RATIO = 1.25
+
+# Motion gating in front of the detector (FaceGreetingService). Frames are
+# compared at MOTION_DOWNSCALE_WIDTH px wide; a frame counts as motion when at
+# least MOTION_MIN_CHANGED_RATIO of its pixels moved by more than MOTION_PIXEL_DELTA
+MOTION_GATING = os.getenv("VR_MOTION_GATING", "1") == "1"
+MOTION_DOWNSCALE_WIDTH = 160
+MOTION_PIXEL_DELTA = 18
+MOTION_MIN_CHANGED_RATIO = 0.01
+MOTION_BACKGROUND_ALPHA = 0.05
+
+# Frame-rate policy: idle until motion or a face appears, active for ACTIVE_HOLD_SECS after
+IDLE_FPS = float(os.getenv("VR_IDLE_FPS", "4"))
+ACTIVE_FPS = float(os.getenv("VR_ACTIVE_FPS", "15"))
+ACTIVE_HOLD_SECS = float(os.getenv("VR_ACTIVE_HOLD_SECS", "5"))
+
+# Staged pipeline (pipeline.py): frames, plans and results waiting between the
+# capture, detect and recognize threads; when a queue is full the oldest item is dropped
+PIPELINE_QUEUE_SIZE = int(os.getenv("VR_PIPELINE_QUEUE_SIZE", "2"))
+
+# Stage latency metrics (metrics.py). Off by default; when on, a summary is
+# logged every METRICS_LOG_INTERVAL_SECS and a non-zero METRICS_PORT serves
+# /metrics (Prometheus text) and /metrics.json on METRICS_HOST
+METRICS = os.getenv("VR_METRICS", "0") == "1"
+METRICS_HOST = os.getenv("VR_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("VR_METRICS_PORT", "0"))
+METRICS_LOG_INTERVAL_SECS = float(os.getenv("VR_METRICS_LOG_SECS", "60"))
+# every LiveKit job process serves its own debug endpoints: each binds the first
+# free port of the DEBUG_PORT_ATTEMPTS ports starting at the configured one and logs its URL
+DEBUG_PORT_ATTEMPTS = int(os.getenv("VR_DEBUG_PORT_ATTEMPTS", "16"))
+
+# Room video (room_video.py, used when the agent runs with VR_VIDEO_SOURCE=room):
+# frames wider than ROOM_VIDEO_MAX_WIDTH are downscaled for the detector
+ROOM_VIDEO_MAX_WIDTH = int(os.getenv("VR_ROOM_VIDEO_MAX_WIDTH", "640"))
+
+# Debug preview (preview.py). Headless mode skips every window and frame copy;
+# a non-zero MJPEG port serves annotated frames to local viewers at MJPEG_FPS
+HEADLESS = os.getenv("VR_HEADLESS", "0") == "1"
+MJPEG_HOST = os.getenv("VR_MJPEG_HOST", "127.0.0.1")
+MJPEG_PORT = int(os.getenv("VR_MJPEG_PORT", "0"))
+MJPEG_FPS = float(os.getenv("VR_MJPEG_FPS", "5"))
+MJPEG_QUALITY = 70
+
+# Enrollment journal: concurrent appends share one fsync every
+# JOURNAL_FSYNC_INTERVAL_SECS; the compactor folds the journal into the main
+# matrix every JOURNAL_COMPACT_INTERVAL_SECS
+JOURNAL_FSYNC_INTERVAL_SECS = 0.005
+JOURNAL_COMPACT_INTERVAL_SECS = float(os.getenv("VR_JOURNAL_COMPACT_SECS", "30"))
+
+# Live Recognizers poll the embedding store for new enrollments this often
+GALLERY_RELOAD_INTERVAL_SECS = float(os.getenv("VR_GALLERY_RELOAD_SECS", "0.5"))
+
+# Nearest-neighbour index over the gallery: "bruteforce" (exact), "ivf" (NumPy
+# inverted file) or "faiss" (HNSW, needs faiss installed). Galleries smaller
+# than INDEX_MIN_ROWS are always searched exactly.
+FACE_INDEX = os.getenv("VR_FACE_INDEX", "bruteforce")
+INDEX_MIN_ROWS = int(os.getenv("VR_INDEX_MIN_ROWS", "5000"))
+IVF_NLIST = int(os.getenv("VR_IVF_NLIST", "0"))  # 0 = 4 * sqrt(rows)
+IVF_NPROBE = int(os.getenv("VR_IVF_NPROBE", "8"))
+# a new generation reuses the previous IVF centroids until the gallery has grown
+# past this multiple of the size they were trained on
+IVF_RETRAIN_GROWTH = 1.5
+HNSW_M = int(os.getenv("VR_HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("VR_HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("VR_HNSW_EF_SEARCH", "64"))
+# Approximate search fetches this many rows per requested label, since one
+# employee can own several of the nearest enrollments
+INDEX_CANDIDATES_PER_LABEL = 8
+
+# Photo-directory watcher: auto-enroll images dropped into VR_EMP_PHOTOS.
+# Uses filesystem notifications when watchfiles is installed, else polls.
+# Changes are batched until the folder is quiet for PHOTO_WATCH_DEBOUNCE_SECS.
+PHOTO_WATCH = os.getenv("VR_PHOTO_WATCH", "0") == "1"
+PHOTO_WATCH_POLL_SECS = float(os.getenv("VR_PHOTO_WATCH_POLL_SECS", "2"))
+PHOTO_WATCH_DEBOUNCE_SECS = 1.0
+
+# Gallery matrix precision for matching: float32, int8 (a quarter of the resident
+# memory, about float32 speed) or float16 (half the memory, 2-3x slower; not
+# recommended). Compact modes rescore the best QUANT_RESCORE_FACTOR * k employees
+# against the memory-mapped float32 rows, so reported scores stay exact.
+GALLERY_PRECISION = os.getenv("VR_GALLERY_PRECISION", "float32")
+QUANT_RESCORE_FACTOR = 4
@@ -0,0 +1,141 @@
+"""
+Streaming identity decisions.
+
+``DecisionEngine`` is fed the per-frame results of ``Recognizer.recognize_frame``
+and accumulates evidence like a sequential probability ratio test: every fresh
+match adds ``(score - threshold) / scale`` log-odds to the top-1 employee, and
+every frame whose best face is below the threshold adds log-odds towards
+"unknown". It accepts as soon as one employee has been top-1 for
+``min_frames`` frames and either the top-1/top-2 margin clears
+``EARLY_ACCEPT_MARGIN`` or the log-odds reach ``accept_log_odds``; it rejects
+once unknown frames have piled up the same way. Clear faces are confirmed in
+two or three frames instead of waiting for a timeout.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from . import config
+
+
+ACCEPT = "accept"
+REJECT = "reject"
+PENDING = "pending"
+TIMEOUT = "timeout"
+
+
+@dataclass
+class Verdict:
+    """``outcome`` is accept, reject, pending or timeout; ``confidence`` is the probability of that outcome."""
+    outcome: str
+    emp_id: Optional[str]
+    confidence: float
+    score: float
+    margin: float
+    frames: int
+    reason: str = ""
+
+    @property
+    def decided(self) -> bool:
+        return self.outcome in (ACCEPT, REJECT)
+
+
+def _sigmoid(x: float) -> float:
+    return 1.0 / (1.0 + math.exp(-max(-50.0, min(50.0, x))))
+
+
+class DecisionEngine:
+    """Sequential evidence accumulation over per-frame match results."""
+
+    def __init__(
+        self,
+        threshold: float,
+        margin: float = config.EARLY_ACCEPT_MARGIN,
+        min_frames: int = config.DECISION_MIN_FRAMES,
+        reject_frames: int = config.DECISION_REJECT_FRAMES,
+        score_scale: float = config.DECISION_SCORE_SCALE,
+        accept_log_odds: float = config.DECISION_ACCEPT_LOG_ODDS,
+    ):
+        self.threshold = threshold
+        self.margin = margin
+        self.min_frames = max(1, min_frames)
+        self.reject_frames = max(1, reject_frames)
+        self.score_scale = score_scale
+        self.accept_log_odds = accept_log_odds
+        self.reset()
+
+    def reset(self):
+        self.log_odds: Dict[str, float] = {}
+        self.frames = 0
+        self.faces_seen = 0
+        self._leader: Optional[str] = None
+        self._streak: List[tuple] = []  # (score, margin) of the leader's consecutive frames
+        self._unknown_log_odds = 0.0
+        self._unknown_scores: List[float] = []
+
+    @staticmethod
+    def _primary(results: List[Dict]) -> Optional[Dict]:
+        # the face with the strongest match, not whichever the detector listed first
+        scored = [r for r in results if r.get("candidates")]
+        return max(scored, key=lambda r: r["candidates"][0][1]) if scored else None
+
+    def update(self, results: List[Dict]) -> Verdict:
+        """Add one frame's results; returns the current verdict."""
+        self.frames += 1
+        if results:
+            self.faces_seen += 1
+        # with a tracker, results repeat the cached identity between embeddings; count each embedding once
+        fresh = [r for r in results if r.get("fresh", True)]
+        primary = self._primary(fresh)
+        if primary is None:
+            return self.verdict()
+
+        candidates = primary["candidates"]
+        label, score = candidates[0]
+        second = candidates[1][1] if len(candidates) > 1 else -1.0
+        margin = score - second
+        if score >= self.threshold:
+            self.log_odds[label] = self.log_odds.get(label, 0.0) + (score - self.threshold) / self.score_scale
+            if label != self._leader:
+                self._leader, self._streak = label, []
+            self._streak.append((score, margin))
+            self._unknown_log_odds = 0.0
+            self._unknown_scores = []
+        else:
+            self._unknown_log_odds += (self.threshold - score) / self.score_scale
+            self._unknown_scores.append(score)
+            self._leader, self._streak = None, []
+            # a run of unknown frames erodes earlier evidence for any employee
+            for key in self.log_odds:
+                self.log_odds[key] *= 0.5
+        return self.verdict()
+
+    def verdict(self) -> Verdict:
+        if self._leader is not None and len(self._streak) >= self.min_frames:
+            log_odds = self.log_odds[self._leader]
+            score = sum(s for s, _ in self._streak) / len(self._streak)
+            margin = sum(m for _, m in self._streak) / len(self._streak)
+            if margin >= self.margin:
+                return Verdict(ACCEPT, self._leader, _sigmoid(log_odds), score, margin, len(self._streak), "margin")
+            if log_odds >= self.accept_log_odds:
+                return Verdict(ACCEPT, self._leader, _sigmoid(log_odds), score, margin, len(self._streak), "evidence")
+        if len(self._unknown_scores) >= self.reject_frames and self._unknown_log_odds >= self.accept_log_odds:
+            score = sum(self._unknown_scores) / len(self._unknown_scores)
+            return Verdict(REJECT, None, _sigmoid(self._unknown_log_odds), score, 0.0, len(self._unknown_scores), "unknown")
+        return self._pending(PENDING)
+
+    def finalize(self) -> Verdict:
+        """Verdict when time runs out: a decision if one was reached, otherwise the leading hypothesis."""
+        current = self.verdict()
+        if current.decided:
+            return current
+        return self._pending(TIMEOUT, "no face" if self.faces_seen == 0 else "undecided")
+
+    def _pending(self, outcome: str, reason: str = "") -> Verdict:
+        if self._leader is not None:
+            score = sum(s for s, _ in self._streak) / len(self._streak)
+            margin = sum(m for _, m in self._streak) / len(self._streak)
+            return Verdict(outcome, self._leader, _sigmoid(self.log_odds[self._leader]), score, margin, len(self._streak), reason)
+        score = sum(self._unknown_scores) / len(self._unknown_scores) if self._unknown_scores else 0.0
+        return Verdict(outcome, None, _sigmoid(self._unknown_log_odds), score, 0.0, len(self._unknown_scores), reason)
@@ -0,0 +1,405 @@
+"""
+Versioned, memory-mapped embedding store.
+
+A store is a directory holding:
+
+- ``index.json``: format version, dimension, generation counter, the employee
+  labels and their row offsets, and the name of the current matrix file.
+- ``embeddings-<generation>.npy``: one contiguous float32 matrix of normalized
+  enrollments, rows grouped by label, opened with ``np.load(mmap_mode="r")``.
+
+- ``journal.log``: append-only enrollments not yet folded into the matrix.
+- ``journal-<generation>-<stamp>.compacting``: a journal detached by a rewrite;
+  ``index.json`` lists the ones its generation folded, and any other is folded
+  by the next rewrite (one left behind by a rewrite that failed or died).
+- ``store.lock``: lock file serializing writers across processes (``filelock.py``).
+- ``<index>-<generation>-<params>.npz``: optional nearest-neighbour index over
+  the matrix (``VR_FACE_INDEX``), built by the writer of each generation.
+- ``quantized-<generation>-<precision>.npy``: optional float16/int8 copy of the
+  matrix (``VR_GALLERY_PRECISION``), also built by the writer.
+
+Every rewrite produces a new matrix file and then atomically replaces
+``index.json``, so readers always see a complete generation. The legacy
+``face_embeddings.pkl`` is converted once by :func:`migrate_pickle`.
+"""
+
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from . import config
+from .gallery import Gallery, GalleryBase, GalleryView, as_enrollments, normalize_rows
+from .filelock import FileLock, get_file_lock
+from .gallery_index import load_or_build
+from .journal import EnrollmentJournal, get_journal, read_records
+from .quantization import load_or_quantize
+
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+INDEX_FILE = "index.json"
+JOURNAL_FILE = "journal.log"
+LOCK_FILE = "store.lock"
+STORE_SUFFIX = ".store"
+
+
+def _atomic_write_bytes(path: str, data: bytes):
+    tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _without_rows(rows: np.ndarray, drop) -> np.ndarray:
+    """``rows`` minus those equal (up to float rounding) to a row of ``drop``."""
+    drop = as_enrollments(drop)
+    if drop.size == 0 or drop.shape[1] != rows.shape[1]:
+        return rows
+    sims = normalize_rows(rows) @ normalize_rows(drop).T
+    return rows[sims.max(axis=1) < 1.0 - 1e-5]
+
+
+class EmbeddingStore:
+    """Directory-backed gallery of face embeddings.
+
+    New enrollments go to an append-only journal (see ``journal.py``) and are
+    folded into the main matrix by a background compactor; readers always see
+    the main matrix plus any journaled rows as one gallery. Writers are
+    serialized across threads and processes by ``lock``.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @property
+    def lock(self) -> FileLock:
+        """The store's cross-process writer lock; create the directory before acquiring it."""
+        return get_file_lock(os.path.join(self.path, LOCK_FILE))
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.path, INDEX_FILE)
+
+    @property
+    def journal(self) -> EnrollmentJournal:
+        return get_journal(os.path.join(self.path, JOURNAL_FILE), os.path.join(self.path, LOCK_FILE))
+
+    def exists(self) -> bool:
+        """Whether the store has a main generation or journaled enrollments."""
+        return os.path.exists(self.index_path) or self.journal.size() > 0 or bool(self._detached())
+
+    def read_index(self) -> dict:
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        version = index.get("format_version")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported embedding store format {version} in {self.path}")
+        return index
+
+    def stamp(self) -> tuple:
+        """Cheap change token covering the current generation and the journal."""
+        journal_size = self.journal.size()
+        try:
+            st = os.stat(self.index_path)
+        except FileNotFoundError:
+            if journal_size == 0:
+                raise
+            return (0, 0, 0, journal_size)
+        # the index is replaced, never edited in place, so its inode changes per generation
+        return (st.st_ino, st.st_mtime_ns, st.st_size, journal_size)
+
+    def _index_or_none(self) -> Optional[dict]:
+        return self.read_index() if os.path.exists(self.index_path) else None
+
+    @property
+    def generation(self) -> int:
+        index = self._index_or_none()
+        return int(index["generation"]) if index else 0
+
+    def _detached(self) -> List[str]:
+        return glob.glob(os.path.join(self.path, "journal-*.compacting"))
+
+    def _pending_journals(self, index: Optional[dict]) -> List[str]:
+        """Detached journals not folded into ``index``'s generation, oldest first."""
+        folded = set(index.get("folded_journals", ())) if index else set()
+        # stores written before folded_journals was recorded folded every number up to journal_folded
+        legacy = index.get("journal_folded", 0) if index and "folded_journals" not in index else 0
+        pending = []
+        for path in self._detached():
+            name = os.path.basename(path)
+            order = tuple(int(part) for part in name[len("journal-"):-len(".compacting")].split("-")[:2])
+            if name not in folded and order[0] > legacy:
+                pending.append((order, path))
+        return [path for _, path in sorted(pending)]
+
+    def _load_main(self, index: dict, mmap: bool) -> Gallery:
+        if index["count"] == 0:
+            return Gallery(np.zeros((0, index["dim"]), dtype=np.float32), [], [0])
+        matrix = np.load(os.path.join(self.path, index["matrix"]), mmap_mode="r" if mmap else None)
+        return Gallery(matrix, index["labels"], index["offsets"])
+
+    def _derived(self, loader, matrix: np.ndarray, generation: int):
+        # normally persisted by the writer of the generation; otherwise built once, under the writer lock
+        try:
+            return loader(self.path, generation, matrix, build=False)
+        except FileNotFoundError:
+            with self.lock:
+                return loader(self.path, generation, matrix)
+
+    def _attach_index(self, main: Gallery, generation: int):
+        try:
+            main.index = self._derived(load_or_build, main.matrix, generation)
+        except Exception as e:
+            logger.warning("Face index unavailable for %s, using exact search: %s", self.path, e)
+        try:
+            main.quantized = self._derived(load_or_quantize, main.matrix, generation)
+        except Exception as e:
+            logger.warning("Compact gallery unavailable for %s, using float32: %s", self.path, e)
+
+    @staticmethod
+    def _journal_gallery(paths: List[str]) -> Gallery:
+        data: Dict[str, List[np.ndarray]] = {}
+        for path in paths:
+            for label, vector in read_records(path):
+                data.setdefault(label, []).append(vector)
+        return Gallery.from_dict(data)
+
+    def load(self, mmap: bool = True, index: bool = True) -> GalleryBase:
+        """Open the current generation, memory-mapped, plus any journaled enrollments.
+
+        With ``index`` the main matrix gets the configured nearest-neighbour index
+        and compact copy.
+        """
+        if not os.path.exists(self.index_path):
+            return self._journal_gallery(self._pending_journals(None) + [self.journal.path])
+        for attempt in range(3):
+            detached = set(self._detached())
+            before = os.stat(self.index_path)
+            meta = self.read_index()
+            try:
+                main = self._load_main(meta, mmap)
+            except FileNotFoundError:
+                # a writer replaced the generation between reading the index and the matrix
+                if attempt == 2:
+                    raise
+                continue
+            journaled = self._journal_gallery(self._pending_journals(meta) + [self.journal.path])
+            # a detach or rewrite landing while the journals were read could hide journaled rows
+            after = os.stat(self.index_path)
+            if set(self._detached()) == detached and (before.st_ino, before.st_mtime_ns) == (after.st_ino, after.st_mtime_ns):
+                break
+        if index:
+            self._attach_index(main, meta["generation"])
+        if len(journaled) == 0:
+            return main
+        return GalleryView([main, journaled])
+
+    def to_dict(self) -> Dict[str, np.ndarray]:
+        """All enrollments as ``{emp_id: (n, d) array}`` (materialized in memory)."""
+        gallery = self.load(mmap=False, index=False)
+        return {str(label): np.array(gallery.rows(i)) for i, label in enumerate(gallery.labels)}
+
+    def add(self, label: str, vectors, durable: bool = True) -> int:
+        """Journal one or more enrollments for ``label``; cost does not depend on gallery size.
+
+        Returns the journal sequence number. The rows are visible to readers
+        immediately and folded into the main matrix by the background compactor.
+        """
+        rows = normalize_rows(as_enrollments(vectors))
+        os.makedirs(self.path, exist_ok=True)
+        seq = self.journal.append(str(label), rows, durable=durable)
+        start_compactor(self)
+        return seq
+
+    def write_dict(self, data: Dict[str, object]) -> int:
+        """Replace the whole store with ``{emp_id: vector | [vectors]}``; returns the new generation."""
+        def mutate(current):
+            current.clear()
+            current.update(data)
+        return self._rewrite(mutate)
+
+    def replace(self, label: str, vectors) -> int:
+        """Replace every enrollment of ``label``; returns the new generation."""
+        return self._rewrite(lambda current: current.__setitem__(label, normalize_rows(as_enrollments(vectors))))
+
+    def remove(self, label: str) -> int:
+        return self._rewrite(lambda current: current.pop(label, None))
+
+    def update(self, upserts: Dict[str, object], removals=(), replacing: Optional[Dict[str, np.ndarray]] = None) -> int:
+        """Replace the enrollments of several labels and drop others in a single rewrite.
+
+        For a label in ``replacing`` only its rows matching ``replacing[label]`` are
+        dropped before the upserts are added; its other enrollments stay.
+        """
+        def mutate(current):
+            for label in removals:
+                current.pop(str(label), None)
+            for label, vectors in upserts.items():
+                label = str(label)
+                rows = normalize_rows(as_enrollments(vectors))
+                if replacing is not None and label in replacing and label in current:
+                    kept = _without_rows(current[label], replacing[label])
+                    rows = np.concatenate([kept, rows]) if len(kept) else rows
+                current[label] = rows
+        return self._rewrite(mutate)
+
+    def compact(self) -> Optional[int]:
+        """Fold the journal into a new main generation; returns it, or None if there was nothing to fold."""
+        return self._rewrite(lambda current: None, only_if_journaled=True)
+
+    def _rewrite(self, mutate, only_if_journaled: bool = False) -> Optional[int]:
+        os.makedirs(self.path, exist_ok=True)
+        # the generation number and every file name below are chosen under the cross-process lock
+        with self.lock:
+            index = self._index_or_none()
+            pending = self._pending_journals(index)
+            if only_if_journaled and not pending and self.journal.size() == 0:
+                return None
+            generation = (index["generation"] if index else 0) + 1
+            # appends wait for the lock, so the live journal is complete until it is detached below
+            parts = [self._load_main(index, mmap=False)] if index else []
+            view = GalleryView(parts + [self._journal_gallery(pending + [self.journal.path])])
+            data = {str(label): np.array(view.rows(i)) for i, label in enumerate(view.labels)}
+            mutate(data)
+            # a failing mutation (e.g. a dimension mismatch) raises here, with the journal still in place
+            gallery = Gallery.from_dict(data)
+            # a unique name: a detached journal is never replaced, even by a retry of the same generation
+            detached = os.path.join(self.path, f"journal-{generation}-{time.time_ns()}.compacting")
+            if self.journal.detach(detached):
+                pending.append(detached)
+            self._write(gallery, generation, [os.path.basename(p) for p in pending])
+            # everything detached is folded now, including leftovers of a rewrite that died after its index write
+            for path in self._detached():
+                os.remove(path)
+            return generation
+
+    def _write(self, gallery: Gallery, generation: int, folded_journals: List[str]):
+        os.makedirs(self.path, exist_ok=True)
+        matrix_name = f"embeddings-{generation}.npy"
+        matrix_path = os.path.join(self.path, matrix_name)
+        tmp = f"{matrix_path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        with open(tmp, "wb") as f:
+            np.save(f, np.ascontiguousarray(gallery.matrix, dtype=np.float32))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, matrix_path)
+        # build the search index and compact copy while the previous generation's are still on disk to reuse
+        try:
+            load_or_build(self.path, generation, gallery.matrix)
+        except Exception as e:
+            logger.warning("Could not build the face index for %s generation %d: %s", self.path, generation, e)
+        try:
+            load_or_quantize(self.path, generation, gallery.matrix)
+        except Exception as e:
+            logger.warning("Could not build the compact gallery for %s generation %d: %s", self.path, generation, e)
+        index = {
+            "format_version": FORMAT_VERSION,
+            "dim": gallery.dim,
+            "count": int(gallery.matrix.shape[0]),
+            "generation": generation,
+            "journal_folded": generation,
+            "folded_journals": folded_journals,
+            "matrix": matrix_name,
+            "labels": [str(label) for label in gallery.labels],
+            "offsets": [int(o) for o in gallery.offsets],
+        }
+        _atomic_write_bytes(self.index_path, json.dumps(index).encode("utf-8"))
+        self._remove_stale(keep=matrix_name)
+
+    def _remove_stale(self, keep: str):
+        generation = keep[len("embeddings-"):-len(".npy")]
+        stale = glob.glob(os.path.join(self.path, "embeddings-*.npy"))
+        for pattern in ("ivf-*.npz", "faiss-*.index", "quantized-*.npy"):
+            stale += [p for p in glob.glob(os.path.join(self.path, pattern)) if os.path.basename(p).split("-")[1] != generation]
+        for old in stale:
+            if os.path.basename(old) == keep:
+                continue
+            try:
+                os.remove(old)
+            except OSError:
+                # still memory-mapped by a reader on platforms that forbid unlinking; retried next write
+                pass
+
+
+_compactors: Dict[str, threading.Thread] = {}
+_compactors_lock = threading.Lock()
+
+
+def _compact_loop(store: EmbeddingStore, interval: float):
+    while True:
+        time.sleep(interval)
+        try:
+            generation = store.compact()
+            if generation is not None:
+                logger.info("Compacted enrollment journal into %s generation %d", store.path, generation)
+        except Exception as e:
+            logger.warning("Enrollment journal compaction failed for %s: %s", store.path, e)
+
+
+def start_compactor(store: EmbeddingStore, interval: float = config.JOURNAL_COMPACT_INTERVAL_SECS):
+    """Start the background compactor for ``store`` once per process."""
+    key = os.path.abspath(store.path)
+    with _compactors_lock:
+        thread = _compactors.get(key)
+        if thread is None or not thread.is_alive():
+            thread = threading.Thread(target=_compact_loop, args=(EmbeddingStore(store.path), interval), name="enroll-journal-compactor", daemon=True)
+            _compactors[key] = thread
+            thread.start()
+
+
+def resolve_store_path(path: str) -> str:
+    """Map a legacy ``*.pkl`` path to its sibling store directory; other paths are used as-is."""
+    root, ext = os.path.splitext(path)
+    return root + STORE_SUFFIX if ext.lower() == ".pkl" else path
+
+
+def migrate_pickle(pickle_path: str, store_path: Optional[str] = None, overwrite: bool = False) -> EmbeddingStore:
+    """One-shot conversion of a legacy embeddings pickle into a store."""
+    import pickle
+
+    store = EmbeddingStore(store_path or resolve_store_path(pickle_path))
+    os.makedirs(store.path, exist_ok=True)
+    # several processes may open the store for the first time at once; only one migrates
+    with store.lock:
+        if store.exists() and not overwrite:
+            return store
+        with open(pickle_path, "rb") as f:
+            data = pickle.load(f)
+        generation = store.write_dict(data)
+    logger.info("Migrated %s to embedding store %s (generation %d)", pickle_path, store.path, generation)
+    return store
+
+
+def open_store(path: str) -> EmbeddingStore:
+    """Open the store for ``path``, migrating a legacy pickle on first use."""
+    store = EmbeddingStore(resolve_store_path(path))
+    if not store.exists() and store.path != path and os.path.isfile(path):
+        migrate_pickle(path, store.path)
+    return store
+
+
+def store_exists(path: str) -> bool:
+    """Whether ``path`` names an existing store or a legacy pickle that can be migrated."""
+    return EmbeddingStore(resolve_store_path(path)).exists() or os.path.isfile(path)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert a legacy face_embeddings.pkl into an embedding store.")
+    parser.add_argument("pickle_path")
+    parser.add_argument("store_path", nargs="?")
+    parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    migrated = migrate_pickle(args.pickle_path, args.store_path, overwrite=args.overwrite)
+    print(f"Embedding store ready at {migrated.path} (generation {migrated.generation})")
@@ -1,53 +1,288 @@
+"""
+Bulk enrollment from a folder of employee photos.
+
+Photos are named ``<EmployeeID>.<ext>`` or grouped as ``<EmployeeID>/<any>.<ext>``.
+Detection and embedding run in a process pool with one model per worker. A
+content-hash cache next to the store skips photos that did not change, and
+only employees whose photos changed are merged into the existing store, in a
+single rewrite. Photos saved by the camera-registration tools are tagged with
+a ``.registered`` sidecar and skipped, so their averaged multi-frame enrollment
+is not replaced by an embedding of the one saved frame (``--full`` re-embeds
+them). Run from the repository root:
+
+    python -m face_recognition.enroll_faces --photos Employee/EMP_Photos --output face_embeddings.pkl
+"""
+
+import argparse
+import hashlib
+import json
 import os
-import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
 import cv2
-import insightface
 import numpy as np
-from collections import defaultdict
+
+from .embedding_store import open_store
+from .gallery_watcher import notify_gallery_changed
+from .models import get_face_analysis
+from .quality import best_face
 
 
 # Path to your face database folder
-FACE_DB_DIR = r"C:\Users\Gokulakrishnan\Documents\virtual-receptionist-main\Employee\EMP_Photos"
-# Output pickle file
-EMBEDDINGS_FILE = r"C:\Users\Gokulakrishnan\Documents\virtual-receptionist-main\face_embeddings.pkl"
+FACE_DB_DIR = os.getenv("VR_EMP_PHOTOS", os.path.join("Employee", "EMP_Photos"))
+# Output embeddings path (a legacy *.pkl name maps to its sibling .store directory)
+EMBEDDINGS_FILE = os.getenv("VR_FACE_EMBEDDINGS", "face_embeddings.pkl")
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+CACHE_FILE = "enroll_cache.json"
+CACHE_VECTORS = "enroll_cache.npz"
+REGISTERED_SUFFIX = ".registered"
+
 
 def get_employee_id(filename):
     # Extract employee ID or name from filename (without extension)
     return os.path.splitext(filename)[0]
 
+
+def scan_photos(photos_dir: str) -> List[Tuple[str, str]]:
+    """``(relative path, emp_id)`` for every photo, sorted for stable output."""
+    found = []
+    for root, _, files in os.walk(photos_dir):
+        rel_root = os.path.relpath(root, photos_dir)
+        for fname in files:
+            if os.path.splitext(fname)[1].lower() not in IMAGE_EXTENSIONS:
+                continue
+            rel = os.path.normpath(os.path.join(rel_root, fname))
+            # photos in a sub-folder belong to the employee named by the folder
+            emp_id = rel.split(os.sep)[0] if os.sep in rel else get_employee_id(fname)
+            found.append((rel, emp_id))
+    return sorted(found)
+
+
+def file_sha1(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def save_registration_photo(path: str, frame: np.ndarray) -> bool:
+    """Save a camera-registration frame to ``path``, tagged so photo enrollment leaves it alone."""
+    ok, buf = cv2.imencode(os.path.splitext(path)[1] or ".jpg", frame)
+    if not ok:
+        return False
+    data = buf.tobytes()
+    # the tag is written first, so a watcher sync between the two writes already skips the photo
+    with open(f"{path}{REGISTERED_SUFFIX}", "w", encoding="utf-8") as f:
+        f.write(hashlib.sha1(data).hexdigest())
+    tmp = f"{path}.tmp"  # not an image extension, so the photo watcher ignores it
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return True
+
+
+def is_registration_photo(path: str, digest: str) -> bool:
+    """Whether ``path`` is still the frame a camera registration saved (a replaced photo is enrolled)."""
+    try:
+        with open(f"{path}{REGISTERED_SUFFIX}", "r", encoding="utf-8") as f:
+            return f.read().strip() == digest
+    except OSError:
+        return False
+
+
+class EnrollmentCache:
+    """Photo content hash -> embedding, plus file stats so unchanged files are not even re-hashed.
+
+    A hash mapped to ``None`` records a photo with no usable face.
+    """
+
+    def __init__(self, store_path: str):
+        self.meta_path = os.path.join(store_path, CACHE_FILE)
+        self.vectors_path = os.path.join(store_path, CACHE_VECTORS)
+        self.files: Dict[str, dict] = {}
+        self.embeddings: Dict[str, Optional[np.ndarray]] = {}
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self.files = meta.get("files", {})
+            for digest in meta.get("no_face", []):
+                self.embeddings[digest] = None
+            with np.load(self.vectors_path) as data:
+                for digest, vector in zip(data["hashes"], data["embeddings"]):
+                    self.embeddings[str(digest)] = vector
+        except (OSError, ValueError, KeyError):
+            # missing or unreadable cache: everything is re-embedded
+            self.files, self.embeddings = {}, {}
+
+    def digest(self, photos_dir: str, rel: str) -> str:
+        st = os.stat(os.path.join(photos_dir, rel))
+        entry = self.files.get(rel)
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            return entry["sha1"]
+        digest = file_sha1(os.path.join(photos_dir, rel))
+        self.files[rel] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha1": digest}
+        return digest
+
+    def save(self, current: Dict[str, str]):
+        """Persist entries for the photos in ``current`` (rel path -> hash) only."""
+        os.makedirs(os.path.dirname(self.meta_path), exist_ok=True)
+        files = {rel: self.files[rel] for rel in current}
+        live = set(current.values())
+        vectors = {h: v for h, v in self.embeddings.items() if h in live and v is not None}
+        tmp = f"{self.vectors_path}.tmp.npz"
+        hashes = sorted(vectors)
+        dim = next(iter(vectors.values())).shape[0] if vectors else 0
+        np.savez(tmp, hashes=np.asarray(hashes, dtype="U40"),
+                 embeddings=np.stack([vectors[h] for h in hashes]) if hashes else np.zeros((0, dim), dtype=np.float32))
+        os.replace(tmp, self.vectors_path)
+        meta = {"files": files, "no_face": sorted(h for h in live if h in self.embeddings and self.embeddings[h] is None)}
+        with open(f"{self.meta_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(f"{self.meta_path}.tmp", self.meta_path)
+
+
+_worker_model = None
+
+
+def _init_worker():
+    global _worker_model
+    # one model per worker process, loaded once and reused for every photo
+    _worker_model = get_face_analysis()
+
+
+def embed_photo(path: str) -> Tuple[Optional[np.ndarray], str]:
+    """Normalized embedding of the best-quality face in ``path`` and a warning, or ``(None, reason)``."""
+    if _worker_model is None:
+        _init_worker()
+    img = cv2.imread(path)
+    if img is None:
+        return None, "could not read image"
+    faces = _worker_model.get(img)
+    if not faces:
+        return None, "no face found"
+    face, quality = best_face(img, faces)
+    embedding = face.embedding.astype(np.float32)
+    norm = np.linalg.norm(embedding)
+    if norm == 0:
+        return None, "no usable embedding"
+    # posed photos are still enrolled, but poor ones are flagged for a retake
+    return embedding / norm, "" if quality.ok else f"low quality: {quality.reason}"
+
+
+def enroll(photos_dir: str, output: str, workers: int = 0, full: bool = False, prune: bool = False) -> dict:
+    """Enroll every photo under ``photos_dir`` into the store for ``output``; returns a summary."""
+    started = time.time()
+    # a legacy pickle is migrated first, so its camera registrations are merged rather than replaced
+    store = open_store(output)
+    cache = EnrollmentCache(store.path)
+    # what each photo was enrolled from before this run, so a changed photo only replaces its own rows
+    previous = {rel: (entry.get("emp_id"), entry.get("sha1")) for rel, entry in cache.files.items()}
+    previous_labels = {emp_id for emp_id, _ in previous.values()}
+
+    photos = scan_photos(photos_dir)
+    hashes = {rel: cache.digest(photos_dir, rel) for rel, _ in photos}
+    if not full:
+        registered = {rel for rel, _ in photos if is_registration_photo(os.path.join(photos_dir, rel), hashes[rel])}
+        photos = [(rel, emp_id) for rel, emp_id in photos if rel not in registered]
+        hashes = {rel: digest for rel, digest in hashes.items() if rel not in registered}
+    todo = sorted({digest for digest in hashes.values() if digest not in cache.embeddings})
+    todo_set = set(todo)
+    path_of = {hashes[rel]: os.path.join(photos_dir, rel) for rel, _ in photos}
+    unchanged = sum(digest not in todo_set for digest in hashes.values())
+    print(f"{len(photos)} photos, {unchanged} unchanged, {len(todo)} to embed", flush=True)
+
+    done = 0
+
+    def record(digest, result):
+        nonlocal done
+        done += 1
+        embedding, reason = result
+        if embedding is not None or reason == "no face found":
+            # unreadable files and worker errors are retried on the next run
+            cache.embeddings[digest] = embedding
+        status = ("ok" + (f" ({reason})" if reason else "")) if embedding is not None else reason
+        print(f"[{done}/{len(todo)}] {os.path.relpath(path_of[digest], photos_dir)}: {status}", flush=True)
+
+    workers = workers or max(1, min(len(todo), (os.cpu_count() or 2) - 1))
+    if workers == 1 or len(todo) <= 1:
+        for digest in todo:
+            record(digest, embed_photo(path_of[digest]))
+    elif todo:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = {pool.submit(embed_photo, path_of[digest]): digest for digest in todo}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = (None, f"failed: {e}")
+                record(futures[future], result)
+
+    by_label: Dict[str, List[np.ndarray]] = {}
+    for rel, emp_id in photos:
+        cache.files[rel]["emp_id"] = emp_id
+        vector = cache.embeddings.get(hashes[rel])
+        if vector is not None:
+            by_label.setdefault(emp_id, []).append(vector)
+
+    changed = {emp_id for rel, emp_id in photos if hashes[rel] in todo_set}
+    # an employee also changes when one of their earlier photos was removed
+    changed |= {entry.get("emp_id") for rel, entry in cache.files.items() if rel not in hashes}
+    changed.discard(None)
+    removed = sorted((previous_labels - set(by_label)) - {None}) if prune else []
+
+    if full or not store.exists():
+        generation = store.write_dict(by_label)
+    else:
+        existing = set(store.load(index=False).labels)
+        upserts = {label: by_label[label] for label in changed if label in by_label}
+        # brand-new employees are journaled (no matrix rewrite)
+        for label in sorted(set(upserts) - existing):
+            store.add(label, np.stack(upserts.pop(label)))
+        # changed ones swap their earlier photo rows; camera registrations are kept
+        replacing = {
+            label: [cache.embeddings[digest] for emp_id, digest in previous.values()
+                    if emp_id == label and cache.embeddings.get(digest) is not None]
+            for label in upserts
+        }
+        generation = (
+            store.update(upserts, removals=removed, replacing=replacing) if upserts or removed else store.generation
+        )
+    cache.save(hashes)
+    if changed or removed or full:
+        notify_gallery_changed(store.path)
+
+    return {
+        "photos": len(photos),
+        "embedded": len(todo),
+        "employees": len(by_label),
+        "updated": sorted(label for label in changed if label in by_label),
+        "removed": removed,
+        "generation": generation,
+        "store": store.path,
+        "seconds": time.time() - started,
+    }
+
+
 def main():
-    # Load InsightFace model
-    model = insightface.app.FaceAnalysis(name="buffalo_l",providers=['CPUExecutionProvider'])
-    model.prepare(ctx_id=0, det_size=(640, 640))
-
-    embeddings_dict = defaultdict(list) # To hold embeddings
-
-    for fname in os.listdir(FACE_DB_DIR):
-        fpath = os.path.join(FACE_DB_DIR, fname)
-        if not os.path.isfile(fpath):
-            continue
-        img = cv2.imread(fpath)
-        if img is None:
-            print(f"Could not read {fname}, skipping.")
-            continue
-
-        faces = model.get(img)
-        if not faces:
-            print(f"No face found in {fname}, skipping.")
-            continue
-
-        # Use the first detected face
-        embedding = faces[0].embedding.astype(np.float32)
-        embedding = embedding / np.linalg.norm(embedding) # Normalize
-
-        emp_id = get_employee_id(fname)
-        embeddings_dict[emp_id].append(embedding)
-        print(f"Captured embedding for {emp_id} from {fname}")
-
-    # Save all embeddings to a pickle file
-    with open(EMBEDDINGS_FILE, "wb") as f:
-        pickle.dump(embeddings_dict, f)
-    print(f"✅ Enrollment complete. Saved to {EMBEDDINGS_FILE}")
+    parser = argparse.ArgumentParser(description="Enroll employee photos into the face embedding store.")
+    parser.add_argument("--photos", default=FACE_DB_DIR, help="folder of <EmployeeID>.<ext> photos (default: %(default)s)")
+    parser.add_argument("--output", default=EMBEDDINGS_FILE, help="embedding store, or legacy .pkl name (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=0, help="worker processes (default: CPU count - 1)")
+    parser.add_argument("--full", action="store_true", help="rebuild the store from the photos instead of merging")
+    parser.add_argument("--prune", action="store_true", help="drop employees whose photos were all deleted")
+    args = parser.parse_args()
+
+    summary = enroll(args.photos, args.output, workers=args.workers, full=args.full, prune=args.prune)
+    print(
+        f"✅ Enrollment complete in {summary['seconds']:.1f}s: {summary['employees']} employees, "
+        f"{len(summary['updated'])} updated, {len(summary['removed'])} removed. "
+        f"Saved to {summary['store']} (generation {summary['generation']})"
+    )
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
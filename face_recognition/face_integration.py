@@ -2,9 +2,8 @@ import os
 import time
 import threading
 import logging
-from typing import Dict, Optional
+from typing import Dict, Optional, Union
 
-import cv2
 import pandas as pd
 
 from livekit.agents import function_tool, RunContext
@@ -14,9 +13,21 @@ from Modules import config
 from Modules.state import employee_access, otp_sessions
 from Modules.send_email import send_email_smtp
 import Modules.state as state_module
-from .recognize_wrapper import Recognizer, draw_detections
+from .recognize_wrapper import Recognizer
+from .preview import Preview
+from .models import get_face_analysis
+from .frame_source import FrameSource, open_source, owns_source
+from .pipeline import recognize_stream
+from .embedding_store import open_store, store_exists
+from .enroll_faces import save_registration_photo
+from .gallery_watcher import notify_gallery_changed
+from .tracker import FaceTracker
+from .motion import MotionGate, FramePacer
+from .quality import best_face
+from .decision import ACCEPT, REJECT, DecisionEngine
+from . import config as face_config
+from . import metrics
 import numpy as np
-import pickle
 try:
     import insightface
 except Exception:
@@ -45,7 +56,16 @@ def wait_for_wakeword(wake_phrase: str = "hey clara") -> None:
                 break
 
 
+# Parsed employee directories keyed by path; re-read when the CSV changes
+_employee_db_cache: Dict[str, tuple] = {}
+
+
 def load_employee_db(csv_path: str) -> Dict[str, Dict[str, str]]:
+    st = os.stat(csv_path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _employee_db_cache.get(csv_path)
+    if cached and cached[0] == stamp:
+        return cached[1]
     df = pd.read_csv(csv_path, dtype=str).fillna("")
     # Expect columns: EmployeeID, Name, Email, ... adapt if needed
     id_col = "EmployeeID" if "EmployeeID" in df.columns else "id"
@@ -53,11 +73,20 @@ def load_employee_db(csv_path: str) -> Dict[str, Dict[str, str]]:
     for _, row in df.iterrows():
         emp_id = str(row[id_col]).strip()
         result[emp_id] = {k: str(v) for k, v in row.items()}
+    _employee_db_cache[csv_path] = (stamp, result)
     return result
 
 
 class FaceGreetingService:
-    def __init__(self, embeddings_path: str, employee_csv: str, threshold: float = 0.65, cooldown_s: int = 20, camera_index: int = 0):
+    def __init__(
+        self,
+        embeddings_path: str,
+        employee_csv: str,
+        threshold: float = 0.65,
+        cooldown_s: int = 20,
+        camera_index: int = 0,
+        source: Union[None, str, FrameSource] = None,
+    ):
         try:
             self.recognizer = Recognizer(embeddings_path=embeddings_path, threshold=threshold)
             self.employee_db = load_employee_db(employee_csv)
@@ -67,6 +96,8 @@ class FaceGreetingService:
             self.employee_db = {}
         self.cooldown_s = cooldown_s
         self.camera_index = camera_index
+        # any frame source spec (see frame_source.open_source); None is the live camera or room video
+        self.source = source
         self._last_greet_time: Dict[str, float] = {}
         self._stop = threading.Event()
         self._thread: Optional[threading.Thread] = None
@@ -86,38 +117,23 @@ class FaceGreetingService:
         self._stop.set()
         if self._thread and self._thread.is_alive():
             self._thread.join(timeout=2)
-        
-        # Cleanup camera resources
-        if hasattr(self, '_cap') and self._cap is not None:
-            self._cap.release()
-            cv2.destroyAllWindows()
+        # The camera itself is shared and stays open for other face tools
 
     def _run(self, on_greet, on_prompt=None):
-        print(f"[FaceGreetingService] Opening camera index {self.camera_index} ...")
-        cap = cv2.VideoCapture(self.camera_index)
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        if not cap.isOpened():
-            print(f"Error: Camera index {self.camera_index} could not be opened.")
-        window_name = "Clara Face Recognition"
-        try:
-            cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
-            cv2.resizeWindow(window_name, 800, 600)
-        except Exception:
-            pass
+        print(f"[FaceGreetingService] Opening frame source {self.source if self.source is not None else self.camera_index} ...")
+        with metrics.timer("camera_open"):
+            camera = open_source(self.source, self.camera_index)
+        if not camera.is_opened():
+            print(f"Error: Frame source {self.source if self.source is not None else self.camera_index} could not be opened.")
+        preview = Preview("Clara Face Recognition", (800, 600))
         print("Face recognition started. Press 'q' window focus to stop.")
+        gate = MotionGate() if face_config.MOTION_GATING else None
+        stream = None
         try:
-            while not self._stop.is_set():
-                ok, frame = cap.read()
-                if not ok:
-                    print("[FaceGreetingService] Failed to read frame from camera.")
-                    break
-                detections = self.recognizer.recognize_frame(frame)
-
-                # draw and show
-                out = draw_detections(frame.copy(), detections)
-                cv2.imshow(window_name, out)
-                if cv2.waitKey(1) & 0xFF == ord('q'):
+            # capture, detection and recognition run on their own threads; this loop only decides
+            stream = recognize_stream(self.recognizer, camera, FaceTracker(), gate=gate, pacer=FramePacer(), stop=self._stop)
+            for frame, detections in stream:
+                if not preview.show(frame, detections):
                     break
 
                 # greet highest-confidence recognized emp once per cooldown
@@ -131,6 +147,7 @@ class FaceGreetingService:
                         self._last_greet_time[emp_id] = now
                         emp = self.employee_db.get(emp_id)
                         if emp:
+                            metrics.incr("decisions_made")
                             on_greet(emp)
                         else:
                             print(f"Recognized {emp_id}, but not found in CSV")
@@ -142,13 +159,33 @@ class FaceGreetingService:
                         self._last_unknown_time = now
                         if on_prompt:
                             on_prompt("I don't recognize you. Are you a candidate or a visitor?")
+            else:
+                if not self._stop.is_set():
+                    print("[FaceGreetingService] Failed to read frame from camera.")
         finally:
-            cap.release()
-            cv2.destroyAllWindows()
+            if stream is not None:
+                stream.close()
+            preview.close()
+            # a replay or synthetic source opened from a spec is ours to stop; shared ones stay open
+            if owns_source(self.source):
+                camera.stop()
 
 
 service_singleton: Optional[FaceGreetingService] = None
 
+# Recognizers shared across tool calls; they hot-reload new enrollments, so there is no need to rebuild per call
+_recognizers: Dict[tuple, Recognizer] = {}
+_recognizers_lock = threading.Lock()
+
+
+def _get_recognizer(embeddings_path: str, threshold: float = 0.65) -> Recognizer:
+    key = (os.path.abspath(embeddings_path), float(threshold))
+    with _recognizers_lock:
+        recognizer = _recognizers.get(key)
+        if recognizer is None:
+            recognizer = _recognizers[key] = Recognizer(embeddings_path=embeddings_path, threshold=threshold)
+        return recognizer
+
 
 def reset_face_recognition_state():
     """Reset the face recognition state for a new session."""
@@ -191,119 +228,99 @@ async def new_user_detected(reason: str = "goodbye") -> str:
     return "Ready for the next person. Are you an employee, a candidate, or a visitor?"
 
 
-def _first_decision(embeddings_path: str, employee_csv: str, cam_index: int, threshold: float, min_stable_frames: int = 3, timeout_s: int = 8):
+def _first_decision(
+    embeddings_path: str,
+    employee_csv: str,
+    cam_index: int,
+    threshold: float,
+    min_stable_frames: int = 3,
+    timeout_s: int = 8,
+    source: Union[None, str, FrameSource] = None,
+):
     """One-time face recognition decision with camera display.
+    ``source`` replaces the live camera with any frame source (e.g. a recorded clip).
     Returns (message: str | None)."""
-    recog = Recognizer(embeddings_path=embeddings_path, threshold=threshold)
+    started = time.perf_counter()
+    recog = _get_recognizer(embeddings_path, threshold)
     employees = load_employee_db(employee_csv)
 
-    cap = cv2.VideoCapture(cam_index)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-    if not cap.isOpened():
+    with metrics.timer("camera_open"):
+        camera = open_source(source, cam_index)
+    if not camera.is_opened():
+        if owns_source(source):
+            camera.stop()
         return "❌ Camera could not be opened. Check VR_CAMERA_INDEX."
 
-    # Create camera window
-    window_name = "Clara Face Recognition"
-    try:
-        cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
-        cv2.resizeWindow(window_name, 800, 600)
-    except Exception:
-        pass
+    preview = Preview("Clara Face Recognition", (800, 600))
+
+    engine = DecisionEngine(recog.threshold, min_frames=min_stable_frames)
+    stream = None
 
-    stable_count: Dict[str, int] = {}
-    start = time.time()
-    face_detected = False
-    
     try:
-        while time.time() - start < timeout_s:
-            ok, frame = cap.read()
-            if not ok:
+        stream = recognize_stream(recog, camera, FaceTracker(), timeout_s=timeout_s)
+        for frame, dets in stream:
+            # 'q' in the preview window quits early
+            if not preview.show(frame, dets):
                 break
-            
-            # Detect faces and draw bounding boxes
-            dets = recog.recognize_frame(frame)
-            out = draw_detections(frame.copy(), dets)
-            cv2.imshow(window_name, out)
-            
-            # Check for 'q' key to quit early
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
-            
-            # Check if any face is detected (even unknown)
-            if dets:
-                face_detected = True
-                print(f"DEBUG: Face detected: {dets}")
-                
-                # Check all detections, not just recognized ones
-                for det in dets:
-                    emp_id = det["emp_id"]
-                    conf = det["conf"]
-                    print(f"DEBUG: Detection - ID: {emp_id}, Confidence: {conf:.3f}, Threshold: {threshold}")
-                
-                # take top recognized
-                recogs = [d for d in dets if d["emp_id"] != "Unknown"]
-                if recogs:
-                    top = max(recogs, key=lambda d: d["conf"])
-                    emp_id = top["emp_id"]
-                    print(f"DEBUG: Top recognized employee: {emp_id} with confidence {top['conf']}")
-                    stable_count[emp_id] = stable_count.get(emp_id, 0) + 1
-                    print(f"DEBUG: Stable count for {emp_id}: {stable_count[emp_id]}/{min_stable_frames}")
-                    if stable_count[emp_id] >= min_stable_frames:
-                        emp = employees.get(emp_id)
-                        print(f"DEBUG: Employee data for {emp_id}: {emp}")
-                        if emp:
-                            name = emp.get("Name") or emp.get("Employee Name") or emp_id
-                            print(f"DEBUG: Found employee name: {name}")
-                            # Mark access granted via face recognition
-                            empid_norm_key = str(emp_id).strip().upper()
-                            employee_access[empid_norm_key]["granted"] = True
-                            employee_access[empid_norm_key]["source"] = "face"
-                            # Set current employee ID for easy access
-                            state_module.current_employee_id = empid_norm_key
-                            print(f"DEBUG: Set current_employee_id to {emp_id}")
-                            return f"SUCCESS: Hello {name}! Welcome back! How can I assist you today? (Employee verified via face recognition)"
-                        else:
-                            print(f"DEBUG: Employee {emp_id} not found in database")
-                            return f"UNKNOWN: I don't recognize you. Can we register your face?"
-                else:
-                    # Unknown face detected - wait a bit for stability then return
-                    print("DEBUG: Unknown face detected, returning message")
-                    time.sleep(1)  # Give a moment for stable detection
-                    return "UNKNOWN: I don't recognize you. Can we register your face?"
-        
-        # timeout -> check if face was detected
-        print(f"DEBUG: Timeout reached, face_detected={face_detected}")
-        if face_detected:
-            return "UNKNOWN: I don't recognize you. Can we register your face?"
-        else:
-            # No face detected - still ask the question as if they're there
-            print("DEBUG: No face detected, but asking question anyway")
-            return "UNKNOWN: I don't recognize you. Can we register your face?"
+
+            with metrics.timer("decision"):
+                verdict = engine.update(dets)
+            if not verdict.decided:
+                continue
+            metrics.incr("decisions_made")
+            metrics.observe("time_to_decision", time.perf_counter() - started)
+            print(f"DEBUG: Face decision {verdict.outcome} ({verdict.reason}) for {verdict.emp_id} after {engine.frames} frames, "
+                  f"score={verdict.score:.3f} margin={verdict.margin:.3f} confidence={verdict.confidence:.2f}")
+            if verdict.outcome == REJECT:
+                return "UNKNOWN: I don't recognize you. Can we register your face?"
+            emp_id = verdict.emp_id
+            emp = employees.get(emp_id)
+            if emp:
+                name = emp.get("Name") or emp.get("Employee Name") or emp_id
+                # Mark access granted via face recognition
+                empid_norm_key = str(emp_id).strip().upper()
+                employee_access[empid_norm_key]["granted"] = True
+                employee_access[empid_norm_key]["source"] = "face"
+                # Set current employee ID for easy access
+                state_module.current_employee_id = empid_norm_key
+                print(f"DEBUG: Set current_employee_id to {emp_id}")
+                return f"SUCCESS: Hello {name}! Welcome back! How can I assist you today? (Employee verified via face recognition)"
+            print(f"DEBUG: Employee {emp_id} not found in database")
+            return f"UNKNOWN: I don't recognize you. Can we register your face?"
+
+        # timeout -> no confident decision; ask to register either way
+        verdict = engine.finalize()
+        print(f"DEBUG: Timeout reached ({verdict.reason}), leading={verdict.emp_id} confidence={verdict.confidence:.2f}")
+        return "UNKNOWN: I don't recognize you. Can we register your face?"
     except Exception as e:
         print(f"ERROR in _first_decision: {e}")
         import traceback
         traceback.print_exc()
         return "UNKNOWN: I don't recognize you. Can we register your face?"
     finally:
-        cap.release()
-        cv2.destroyAllWindows()
+        if stream is not None:
+            stream.close()
+        preview.close()
+        if owns_source(source):
+            camera.stop()
 
 
 def _append_embedding_for_employee(employee_id: str, embeddings_file: str, camera_index: int = 0, frames_to_collect: int = 5) -> str:
-    """Capture embeddings from camera and append to the pickle for a specific employee ID."""
+    """Capture embeddings from camera and append them to the embedding store for a specific employee ID."""
     if insightface is None:
         return "❌ Enrollment requires insightface. Please ensure it is installed."
 
-    app = insightface.app.FaceAnalysis(name="buffalo_l", providers=['CPUExecutionProvider'])
-    app.prepare(ctx_id=0, det_size=(640, 640))
+    app = get_face_analysis()
 
-    cap = cv2.VideoCapture(camera_index)
-    if not cap.isOpened():
+    camera = open_source(None, camera_index)
+    if not camera.is_opened():
         return f"❌ Could not open camera {camera_index} for enrollment."
+    cap = camera.cursor()
 
-    collected: list[np.ndarray] = []
-    best_face_frame = None
+    # (quality score, embedding, frame) of every usable capture; the best ones are kept
+    collected: list[tuple] = []
+    last_reason = ""
+    preview = Preview("Clara Face Registration")
     try:
         # Brief warm-up and countdown overlay
         countdown_secs = 3
@@ -312,62 +329,44 @@ def _append_embedding_for_employee(employee_id: str, embeddings_file: str, camer
             ok, frame = cap.read()
             if not ok:
                 continue
-            msg = f"Look at the camera… {int(end_warmup - time.time())+1}"
-            try:
-                cv2.putText(frame, msg, (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 255), 2, cv2.LINE_AA)
-                cv2.imshow("Clara Face Registration", frame)
-                cv2.waitKey(1)
-            except Exception:
-                pass
+            preview.show(frame, text=f"Look at the camera… {int(end_warmup - time.time())+1}", scale=1.0)
 
         start_time = time.time()
         capture_timeout = 10
-        while len(collected) < frames_to_collect and time.time() - start_time < capture_timeout:
+        # sample twice as many usable frames as needed and keep the sharpest, best-lit ones
+        while len(collected) < 2 * frames_to_collect and time.time() - start_time < capture_timeout:
             ok, frame = cap.read()
             if not ok:
                 continue
-            try:
-                cv2.putText(frame, "Capturing… Please keep looking at the camera", (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2, cv2.LINE_AA)
-                cv2.imshow("Clara Face Registration", frame)
-                cv2.waitKey(1)
-            except Exception:
-                pass
+            hint = f"Capturing… {last_reason}" if last_reason else "Capturing… Please keep looking at the camera"
+            preview.show(frame, text=hint, color=(0, 255, 0))
 
             faces = app.get(frame)
             if not faces:
                 continue
-            # keep a copy of a frame with a detected face to save image later
-            if best_face_frame is None:
-                best_face_frame = frame.copy()
-            emb = faces[0].embedding.astype(np.float32)
+            face, quality = best_face(frame, faces)
+            if not quality.ok:
+                last_reason = quality.reason
+                continue
+            emb = face.embedding.astype(np.float32)
             norm = np.linalg.norm(emb)
             if norm > 0:
                 emb = emb / norm
-            collected.append(emb)
+            collected.append((quality.score, emb, frame.copy()))
         if not collected:
+            if last_reason:
+                return f"❌ Unable to capture a clear face ({last_reason}). Please adjust and try again."
             return "❌ Unable to capture a face for enrollment. Please try again."
-        avg_emb = np.mean(collected, axis=0).astype(np.float32)
+        collected.sort(key=lambda item: item[0], reverse=True)
+        best = collected[:frames_to_collect]
+        best_face_frame = best[0][2]
+        avg_emb = np.mean([emb for _, emb, _ in best], axis=0).astype(np.float32)
         norm = np.linalg.norm(avg_emb)
         if norm > 0:
             avg_emb = avg_emb / norm
 
-        # Load existing
-        if os.path.exists(embeddings_file):
-            try:
-                with open(embeddings_file, "rb") as f:
-                    db = pickle.load(f)
-            except Exception:
-                db = {}
-        else:
-            db = {}
-
-        # Ensure list container
-        if employee_id not in db:
-            db[employee_id] = []
-        db[employee_id].append(avg_emb)
-
-        with open(embeddings_file, "wb") as f:
-            pickle.dump(db, f)
+        open_store(embeddings_file).add(employee_id, avg_emb)
+        notify_gallery_changed(embeddings_file)
 
         # Also save the captured face image if not present
         photos_dir = os.getenv("VR_EMP_PHOTOS", os.path.join("Employee", "EMP_Photos"))
@@ -375,7 +374,7 @@ def _append_embedding_for_employee(employee_id: str, embeddings_file: str, camer
         img_path = os.path.join(photos_dir, f"{employee_id}.jpg")
         if best_face_frame is not None and not os.path.exists(img_path):
             try:
-                cv2.imwrite(img_path, best_face_frame)
+                save_registration_photo(img_path, best_face_frame)
             except Exception:
                 pass
 
@@ -386,11 +385,7 @@ def _append_embedding_for_employee(employee_id: str, embeddings_file: str, camer
         state_module.current_employee_id = empid_norm_key
         return f"✅ Face registered for {employee_id}. You're all set."
     finally:
-        cap.release()
-        try:
-            cv2.destroyAllWindows()
-        except Exception:
-            pass
+        preview.close()
 
 
 @function_tool()
@@ -505,59 +500,63 @@ async def complete_employee_face_registration(
     camera_index = int(os.getenv("VR_CAMERA_INDEX", "0"))
     if insightface is None:
         return "❌ insightface not available to generate embeddings."
-    app = insightface.app.FaceAnalysis(name="buffalo_l", providers=['CPUExecutionProvider'])
-    app.prepare(ctx_id=0, det_size=(640, 640))
+    app = get_face_analysis()
+
+    camera = open_source(None, camera_index)
+    if not camera.is_opened():
+        return f"❌ Could not access camera index {camera_index}."
+    cap = camera.cursor()
 
     # Try multiple attempts to capture a usable face
     max_attempts = 3
     found_face = None
     captured_frame = None
+    preview = Preview("Clara Registration")
 
     for attempt in range(1, max_attempts + 1):
-        cap = cv2.VideoCapture(camera_index)
-        if not cap.isOpened():
-            return f"❌ Could not access camera index {camera_index}."
-
         # brief on-screen cue
         end_time = time.time() + 2
         while time.time() < end_time:
-            ok, preview = cap.read()
+            ok, cue = cap.read()
             if not ok:
                 continue
-            try:
-                cv2.putText(preview, f"Attempt {attempt}/{max_attempts}: Please face the camera", (18, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2, cv2.LINE_AA)
-                cv2.imshow("Clara Registration", preview)
-                cv2.waitKey(1)
-            except Exception:
-                pass
-
-        # capture a frame and check for a face
-        ret, frame = cap.read()
-        cap.release()
-        if not ret:
+            preview.show(cue, text=f"Attempt {attempt}/{max_attempts}: Please face the camera")
+
+        # sample frames for a moment and keep the best-quality face
+        best_quality = None
+        frame = None
+        sample_until = time.time() + 1.0
+        while time.time() < sample_until:
+            ret, sample = cap.read()
+            if not ret:
+                continue
+            frame = sample
+            faces = app.get(sample)
+            if not faces:
+                continue
+            face, quality = best_face(sample, faces)
+            if best_quality is None or quality.score > best_quality.score:
+                best_quality, found_face, captured_frame = quality, face, sample
+        if frame is None:
             continue
 
-        faces = app.get(frame)
-        if faces:
-            found_face = faces[0]
-            captured_frame = frame
+        if best_quality is not None and best_quality.ok:
             break
         else:
+            hint = f"Face {best_quality.reason}" if best_quality is not None else "No face detected"
+            found_face, captured_frame = None, None
             # Inform the user to adjust and we will retry (the agent will speak the return string)
             if attempt < max_attempts:
-                try:
-                    cv2.putText(frame, "No face detected. Adjust lighting/positioning…", (18, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2, cv2.LINE_AA)
-                    cv2.imshow("Clara Registration", frame)
-                    cv2.waitKey(800)
-                except Exception:
-                    pass
+                preview.show(frame, text=f"{hint}. Adjust lighting/positioning…", color=(0, 0, 255), delay_ms=800)
+    preview.close()
 
     if not found_face or captured_frame is None:
         return "❌ I couldn't detect your face. Please face the camera with good lighting and say 'yes' to try again."
 
     # Save image
     try:
-        cv2.imwrite(img_path, captured_frame)
+        if not save_registration_photo(img_path, captured_frame):
+            return "❌ Failed to save captured image."
     except Exception:
         return "❌ Failed to save captured image."
 
@@ -568,22 +567,9 @@ async def complete_employee_face_registration(
         emb = emb / norm
 
     embeddings_file = os.getenv("VR_FACE_EMBEDDINGS", "face_embeddings.pkl")
-    if os.path.exists(embeddings_file):
-        try:
-            with open(embeddings_file, "rb") as f:
-                db = pickle.load(f)
-        except Exception:
-            db = {}
-    else:
-        db = {}
-
-    if emp_id not in db:
-        db[emp_id] = []
-    db[emp_id].append(emb)
-
     try:
-        with open(embeddings_file, "wb") as f:
-            pickle.dump(db, f)
+        open_store(embeddings_file).add(emp_id, emb)
+        notify_gallery_changed(embeddings_file)
     except Exception:
         return "❌ Failed to update embeddings file."
 
@@ -632,70 +618,67 @@ async def retry_face_recognition(
         if not employee_db:
             return "❌ Could not load employee database. Please try manual verification."
         
-        # Load face recognition models
-        recognizer = Recognizer(embeddings_path)
-        
-        # Open camera
         camera_index = int(os.getenv("VR_CAMERA_INDEX", "0"))
-        cap = cv2.VideoCapture(camera_index)
-        if not cap.isOpened():
+        return _retry_decision(embeddings_path, employee_db, camera_index, min_stable_frames, timeout_s, threshold=threshold)
+
+    except Exception as e:
+        print(f"Retry face recognition error: {e}")
+        return f"❌ Error during retry face recognition: {str(e)}"
+
+
+def _retry_decision(
+    embeddings_path: str,
+    employee_db: Dict[str, Dict[str, str]],
+    camera_index: int,
+    min_stable_frames: int = 2,
+    timeout_s: int = 8,
+    source: Union[None, str, FrameSource] = None,
+    threshold: float = 0.65,
+) -> str:
+    """The recognition loop behind ``retry_face_recognition``, on the live camera or any ``source``."""
+    started = time.perf_counter()
+    camera = None
+    stream = None
+    try:
+        # Load face recognition models
+        recognizer = _get_recognizer(embeddings_path, threshold)
+
+        with metrics.timer("camera_open"):
+            camera = open_source(source, camera_index)
+        if not camera.is_opened():
             return f"❌ Could not open camera {camera_index}. Please check camera connection."
-        
-        print(f"Retry face recognition: Opening camera index {camera_index}")
+
+        print(f"Retry face recognition: Opening frame source {source if source is not None else camera_index}")
         
         # Try recognition for a shorter time
-        start_time = time.time()
-        last_recognition = None
-        stable_count = 0
-        
-        while time.time() - start_time < timeout_s:
-            ret, frame = cap.read()
-            if not ret:
-                continue
-                
-            # Resize frame for better performance
-            frame = cv2.resize(frame, (640, 480))
-            
-            # Try to recognize faces
-            try:
-                results = recognizer.recognize_frame(frame)
-                
-                if results:
-                    # Use the first (most confident) result
-                    result = results[0]
-                    emp_id = result['emp_id']
-                    confidence = result['conf']
-                    
-                    # Check if this is a new recognition or same as before
-                    if last_recognition != emp_id:
-                        last_recognition = emp_id
-                        stable_count = 0
-                    else:
-                        stable_count += 1
-                    
-                    # If we have stable recognition, process it
-                    if stable_count >= min_stable_frames:
-                        cap.release()
-                        
-                        # Look up employee details
-                        emp = employee_db.get(emp_id)
-                        if emp:
-                            name = emp.get("Name") or emp.get("Employee Name") or emp_id
-                            # Mark access granted via face recognition (normalized)
-                            empid_norm_key = str(emp_id).strip().upper()
-                            employee_access[empid_norm_key]["granted"] = True
-                            employee_access[empid_norm_key]["source"] = "face"
-                            state_module.current_employee_id = empid_norm_key
-                            
-                            return f"SUCCESS: Hello {name}! Welcome back! How can I assist you today? (Employee verified via face recognition)"
-                        else:
-                            return f"Recognized {emp_id}, but I couldn't find your details. Are you a candidate or a visitor?"
-                
-            except Exception as e:
-                print(f"Recognition error: {e}")
-                continue
-        
-        cap.release()
+        engine = DecisionEngine(recognizer.threshold, min_frames=min_stable_frames)
+
+        # the stream ends at the timeout or when a replayed clip runs out
+        stream = recognize_stream(recognizer, camera, FaceTracker(), timeout_s=timeout_s)
+        for frame, results in stream:
+            with metrics.timer("decision"):
+                verdict = engine.update(results)
+            if verdict.decided:
+                metrics.incr("decisions_made")
+                metrics.observe("time_to_decision", time.perf_counter() - started)
+            if verdict.outcome == REJECT:
+                break
+            if verdict.outcome == ACCEPT:
+                emp_id = verdict.emp_id
+                # Look up employee details
+                emp = employee_db.get(emp_id)
+                if emp:
+                    name = emp.get("Name") or emp.get("Employee Name") or emp_id
+                    # Mark access granted via face recognition (normalized)
+                    empid_norm_key = str(emp_id).strip().upper()
+                    employee_access[empid_norm_key]["granted"] = True
+                    employee_access[empid_norm_key]["source"] = "face"
+                    state_module.current_employee_id = empid_norm_key
+
+                    return f"SUCCESS: Hello {name}! Welcome back! How can I assist you today? (Employee verified via face recognition)"
+                else:
+                    return f"Recognized {emp_id}, but I couldn't find your details. Are you a candidate or a visitor?"
+
         return (
             "I still couldn't recognize you. Let's try manual verification instead. "
             "Please provide your employee ID and name for verification."
@@ -704,6 +687,11 @@ async def retry_face_recognition(
     except Exception as e:
         print(f"Retry face recognition error: {e}")
         return f"❌ Error during retry face recognition: {str(e)}"
+    finally:
+        if stream is not None:
+            stream.close()
+        if camera is not None and owns_source(source):
+            camera.stop()
 
 
 @function_tool()
@@ -730,7 +718,7 @@ async def start_face_greeting(
     logger.info("start_face_greeting invoked (wait_for_wake=%s, timeout_s=%s)", wait_for_wake, timeout_s)
     if not embeddings_path:
         embeddings_path = os.getenv("VR_FACE_EMBEDDINGS")
-    if not embeddings_path or not os.path.exists(embeddings_path):
+    if not embeddings_path or not store_exists(embeddings_path):
         err = "❌ Face embeddings path not set or not found. Set VR_FACE_EMBEDDINGS or pass embeddings_path."
         print(err)
         return err
@@ -0,0 +1,285 @@
+"""
+Frame sources for the face loops.
+
+Every source publishes its newest frame behind the same small interface:
+``is_opened``, ``latest``, ``wait_newer`` and ``cursor`` (a per-consumer reader
+with ``cv2.VideoCapture.read()`` semantics). The live sources are the local
+camera (``camera.CameraService``) and the LiveKit room track
+(``room_video.RoomVideoSource``); this module adds recorded-video and
+image-sequence replay and a synthetic generator, so lobby incidents can be
+reproduced offline and the pipeline's throughput measured on real clips.
+
+Replay runs either in real time, like a camera (frames the consumer is too
+slow for are dropped), or at maximum speed, where every frame is delivered
+exactly once and the reader sets the pace. ``open_source`` turns a spec such
+as ``0``, ``"room"``, ``"lobby.mp4"``, ``"incident_frames/"`` or
+``"synthetic"`` into a source.
+"""
+
+import glob
+import logging
+import os
+import threading
+import time
+from typing import List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+class FrameSource:
+    """A publisher of frames; ``latest`` and ``wait_newer`` return shared, read-only arrays."""
+
+    def is_opened(self) -> bool:
+        raise NotImplementedError
+
+    def latest(self) -> Tuple[int, Optional[np.ndarray]]:
+        """Return ``(sequence, frame)`` for the newest frame without copying."""
+        raise NotImplementedError
+
+    def wait_newer(self, after_seq: int, timeout: float = 1.0) -> Tuple[int, Optional[np.ndarray]]:
+        """Block until a frame newer than ``after_seq`` arrives; returns ``(after_seq, None)`` on timeout or end of stream."""
+        raise NotImplementedError
+
+    def cursor(self) -> "FrameCursor":
+        """A per-consumer reader with ``cv2.VideoCapture.read()``-style semantics."""
+        return FrameCursor(self)
+
+    def stop(self):
+        pass
+
+
+class FrameCursor:
+    """Tracks the last frame a consumer saw so each ``read()`` returns a newer one."""
+
+    def __init__(self, service: FrameSource):
+        self._service = service
+        self._seq = 0
+
+    def read(self, timeout: float = 1.0) -> Tuple[bool, Optional[np.ndarray]]:
+        seq, frame = self._service.wait_newer(self._seq, timeout)
+        if frame is None:
+            return False, None
+        self._seq = seq
+        return True, frame
+
+
+class ThreadedSource(FrameSource):
+    """Base for sources whose frames come from ``_read()`` on a background thread."""
+
+    def __init__(self, fps: float, realtime: bool = True, name: str = "frame-source"):
+        self.fps = fps
+        self.realtime = realtime
+        self.name = name
+        self.frames = 0
+        self._frame: Optional[np.ndarray] = None
+        self._seq = 0
+        self._consumed = 0
+        self._done = False
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _read(self) -> Optional[np.ndarray]:
+        """Next frame, or None at the end of the stream."""
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+    def start(self) -> "ThreadedSource":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        started = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                frame = self._read()
+                if frame is None:
+                    break
+                if self.realtime:
+                    # hold each frame until its timestamp, as a camera would deliver it
+                    delay = started + self.frames / self.fps - time.monotonic()
+                    if delay > 0 and self._stop.wait(delay):
+                        break
+                with self._cond:
+                    if not self.realtime:
+                        # max speed: never overwrite a frame nobody has read yet
+                        self._cond.wait_for(lambda: self._consumed >= self._seq or self._stop.is_set())
+                    self._frame = frame
+                    self._seq += 1
+                    self.frames += 1
+                    self._cond.notify_all()
+        finally:
+            self._close()
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
+
+    def is_opened(self) -> bool:
+        # still readable after the end of the stream until the last frame has been consumed
+        with self._cond:
+            return not self._stop.is_set() and (not self._done or self._consumed < self._seq)
+
+    def latest(self) -> Tuple[int, Optional[np.ndarray]]:
+        with self._cond:
+            return self._seq, self._frame
+
+    def wait_newer(self, after_seq: int, timeout: float = 1.0) -> Tuple[int, Optional[np.ndarray]]:
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > after_seq or self._done or self._stop.is_set(), timeout=timeout)
+            if self._seq <= after_seq:
+                return after_seq, None
+            self._consumed = max(self._consumed, self._seq)
+            self._cond.notify_all()
+            return self._seq, self._frame
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+
+
+def _image_paths(path: str) -> List[str]:
+    if os.path.isdir(path):
+        path = os.path.join(path, "*")
+    return sorted(p for p in glob.glob(path) if p.lower().endswith(IMAGE_EXTENSIONS))
+
+
+class ReplaySource(ThreadedSource):
+    """Replays a video file, or an image directory / glob in name order, as a frame source."""
+
+    def __init__(self, path: str, realtime: bool = True, fps: Optional[float] = None, loop: bool = False):
+        self.path = path
+        self.loop = loop
+        self._images = _image_paths(path) if (os.path.isdir(path) or glob.has_magic(path)) else []
+        self._index = 0
+        self._cap = None
+        if self._images:
+            fps = fps or 10.0
+        else:
+            self._cap = cv2.VideoCapture(path)
+            if not self._cap.isOpened():
+                self._cap.release()
+                raise FileNotFoundError(f"Cannot open video or image sequence: {path}")
+            fps = fps or self._cap.get(cv2.CAP_PROP_FPS) or 25.0
+        super().__init__(fps, realtime, name=f"replay-{os.path.basename(path.rstrip(os.sep)) or path}")
+
+    def _read(self) -> Optional[np.ndarray]:
+        if self._cap is not None:
+            ok, frame = self._cap.read()
+            if not ok and self.loop and self.frames:
+                self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ok, frame = self._cap.read()
+            return frame if ok else None
+        while self._index < len(self._images) or (self.loop and self._images):
+            if self._index >= len(self._images):
+                self._index = 0
+            path = self._images[self._index]
+            self._index += 1
+            frame = cv2.imread(path)
+            if frame is not None:
+                return frame
+            logger.warning("Skipping unreadable frame %s", path)
+        return None
+
+    def _close(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+
+class SyntheticSource(ThreadedSource):
+    """Generated frames: an optional face image drifting over a noisy background.
+
+    Without ``image`` the frames contain no face, which measures the cost of
+    the empty-lobby path; ``frames=0`` generates forever.
+    """
+
+    def __init__(
+        self,
+        width: int = 640,
+        height: int = 480,
+        fps: float = 15.0,
+        realtime: bool = True,
+        frames: int = 0,
+        image: Optional[np.ndarray] = None,
+        seed: int = 0,
+    ):
+        super().__init__(fps, realtime, name="synthetic")
+        self.width, self.height = width, height
+        self.limit = frames
+        self._rng = np.random.default_rng(seed)
+        ramp = np.linspace(60, 180, width, dtype=np.float32)
+        self._background = np.repeat(np.tile(ramp, (height, 1))[:, :, None], 3, axis=2).astype(np.uint8)
+        self._face = None
+        if image is not None:
+            size = height // 2
+            scale = size / max(image.shape[:2])
+            self._face = cv2.resize(image, (max(1, int(image.shape[1] * scale)), max(1, int(image.shape[0] * scale))))
+
+    def _read(self) -> Optional[np.ndarray]:
+        if self.limit and self.frames >= self.limit:
+            return None
+        frame = self._background.copy()
+        noise = self._rng.integers(-6, 7, size=frame.shape[:2], dtype=np.int16)
+        frame = np.clip(frame.astype(np.int16) + noise[:, :, None], 0, 255).astype(np.uint8)
+        if self._face is not None:
+            fh, fw = self._face.shape[:2]
+            # slow horizontal sway around the centre, like someone at the desk
+            span = max(0, self.width - fw)
+            x = int(span / 2 + span / 4 * np.sin(self.frames / max(self.fps, 1.0)))
+            y = (self.height - fh) // 2
+            frame[y:y + fh, x:x + fw] = self._face
+        return frame
+
+
+def owns_source(spec: Union[None, int, str, FrameSource]) -> bool:
+    """Whether ``open_source(spec)`` builds a new source (a replay or synthetic stream) that the caller must stop.
+
+    Cameras and the room track are shared, and a ``FrameSource`` passed in belongs to its creator.
+    """
+    if spec is None or isinstance(spec, (int, FrameSource)):
+        return False
+    return not (str(spec).isdigit() or spec == "room")
+
+
+def open_source(spec: Union[None, int, str, FrameSource] = None, camera_index: int = 0, realtime: bool = True) -> FrameSource:
+    """Resolve ``spec`` to a started frame source.
+
+    ``None`` is the default live source (room video when attached, else camera
+    ``camera_index``); an int or digit string is a camera index; ``"room"`` is
+    the attached room track; ``"synthetic"`` or ``"synthetic:<image>"`` a
+    generated stream; anything else a video file, image directory or glob.
+    """
+    from .camera import get_camera, get_frame_source
+
+    if spec is None:
+        return get_frame_source(camera_index)
+    if isinstance(spec, FrameSource):
+        return spec
+    if isinstance(spec, int) or str(spec).isdigit():
+        return get_camera(int(spec))
+    if spec == "room":
+        from .room_video import get_room_source
+        source = get_room_source()
+        if source is None:
+            raise RuntimeError("No LiveKit room is attached for face recognition")
+        return source
+    if spec == "synthetic" or spec.startswith("synthetic:"):
+        image_path = spec.partition(":")[2]
+        image = cv2.imread(image_path) if image_path else None
+        if image_path and image is None:
+            raise FileNotFoundError(f"Cannot read synthetic face image: {image_path}")
+        return SyntheticSource(realtime=realtime, image=image).start()
+    return ReplaySource(spec, realtime=realtime).start()
@@ -0,0 +1,250 @@
+"""
+Vectorized gallery matching.
+
+All enrolled embeddings live in one contiguous float32 matrix with rows grouped
+by employee. A batch of query faces is scored with a single matrix multiply and
+reduced per employee with max-over-exemplars. Large galleries can attach an
+approximate index (see ``gallery_index.py``) that only scores candidate rows,
+or a compact float16/int8 copy (see ``quantization.py``) that is scored first
+and rescored in float32.
+"""
+
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from . import config
+
+
+def normalize_rows(x: np.ndarray) -> np.ndarray:
+    """L2-normalize each row of a 2-D array; zero rows stay zero."""
+    x = np.asarray(x, dtype=np.float32)
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return x / norms
+
+
+def as_enrollments(value) -> np.ndarray:
+    """Coerce one gallery entry (a vector, a list of vectors or a 2-D array) to an (n, d) float32 array."""
+    if isinstance(value, (list, tuple)):
+        parts = [np.asarray(v, dtype=np.float32).reshape(-1, np.asarray(v).shape[-1]) for v in value if np.size(v)]
+        if not parts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.concatenate(parts, axis=0)
+    arr = np.asarray(value, dtype=np.float32)
+    if arr.ndim == 1:
+        return arr[None, :]
+    return arr.reshape(-1, arr.shape[-1])
+
+
+class GalleryBase:
+    """Top-k search shared by galleries; subclasses provide ``labels`` and ``label_scores``."""
+
+    labels: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def label_scores(self, queries: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def search(self, queries: np.ndarray, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """Score normalized queries and return top-k ``(scores, label_indices)``, each of shape (q, k)."""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        n_labels = len(self.labels)
+        k = max(0, min(int(k), n_labels))
+        if k == 0 or queries.shape[0] == 0:
+            empty = np.zeros((queries.shape[0], 0))
+            return empty.astype(np.float32), empty.astype(np.int64)
+        per_label = self.label_scores(queries)
+        if k < n_labels:
+            idx = np.argpartition(-per_label, k - 1, axis=1)[:, :k]
+        else:
+            idx = np.broadcast_to(np.arange(n_labels), per_label.shape).copy()
+        scores = np.take_along_axis(per_label, idx, axis=1)
+        order = np.argsort(-scores, axis=1, kind="stable")
+        return np.take_along_axis(scores, order, axis=1), np.take_along_axis(idx, order, axis=1)
+
+    def match(self, queries: np.ndarray, k: int = 1) -> List[List[Tuple[str, float]]]:
+        """Top-k ``(emp_id, score)`` pairs for each normalized query embedding."""
+        scores, idx = self.search(queries, k)
+        # approximate search may return fewer than k labels, padded with -1
+        return [
+            [(str(self.labels[j]), float(s)) for j, s in zip(row_idx, row_scores) if j >= 0]
+            for row_idx, row_scores in zip(idx, scores)
+        ]
+
+
+class Gallery(GalleryBase):
+    """Contiguous matrix of normalized enrollments with a parallel label array."""
+
+    def __init__(self, matrix: np.ndarray, labels: Sequence[str], offsets: Sequence[int]):
+        # rows offsets[i]:offsets[i+1] of ``matrix`` belong to labels[i]
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self.labels = np.asarray(list(labels), dtype=object)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        counts = np.diff(self.offsets)
+        self.row_labels = np.repeat(np.arange(len(self.labels), dtype=np.int32), counts)
+        # optional GalleryIndex over ``matrix``; None means exact search
+        self.index = None
+        # optional QuantizedMatrix copy of ``matrix`` used for first-pass scoring
+        self.quantized = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, object]) -> "Gallery":
+        """Build a gallery from ``{emp_id: vector | [vectors]}``, dropping zero vectors."""
+        blocks: List[np.ndarray] = []
+        labels: List[str] = []
+        offsets = [0]
+        dim = None
+        for key, value in data.items():
+            arr = as_enrollments(value)
+            if arr.size == 0:
+                continue
+            arr = arr[np.linalg.norm(arr, axis=1) > 0]
+            if arr.shape[0] == 0:
+                continue
+            if dim is None:
+                dim = arr.shape[1]
+            elif arr.shape[1] != dim:
+                raise ValueError(f"Embedding for {key} has dimension {arr.shape[1]}, expected {dim}")
+            blocks.append(normalize_rows(arr))
+            labels.append(str(key))
+            offsets.append(offsets[-1] + arr.shape[0])
+        if not blocks:
+            return cls(np.zeros((0, dim or 512), dtype=np.float32), [], [0])
+        return cls(np.concatenate(blocks, axis=0), labels, offsets)
+
+    @property
+    def dim(self) -> int:
+        return int(self.matrix.shape[1])
+
+    @property
+    def size(self) -> int:
+        """Number of enrollment rows."""
+        return int(self.matrix.shape[0])
+
+    def label_scores(self, queries: np.ndarray) -> np.ndarray:
+        """Return the (q, n_labels) best cosine score of each query against each employee."""
+        sims = queries @ self.matrix.T
+        return np.maximum.reduceat(sims, self.offsets[:-1], axis=1)
+
+    @property
+    def accelerated(self) -> bool:
+        """Whether search goes through an index or a compact copy rather than a full float32 scan."""
+        return self.index is not None or self.quantized is not None
+
+    def search(self, queries: np.ndarray, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        if not self.accelerated:
+            return super().search(queries, k)
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        k = max(0, min(int(k), len(self.labels)))
+        if k == 0 or queries.shape[0] == 0:
+            return super().search(queries, k)
+        if self.index is None:
+            return self._search_quantized(queries, k)
+        n_rows = min(self.size, k * config.INDEX_CANDIDATES_PER_LABEL)
+        row_scores, rows = self.index.search(queries, n_rows)
+        scores = np.full((queries.shape[0], k), -np.inf, dtype=np.float32)
+        idx = np.full((queries.shape[0], k), -1, dtype=np.int64)
+        for q in range(queries.shape[0]):
+            valid = rows[q] >= 0
+            labels = self.row_labels[rows[q][valid]]
+            # candidates come best first, so a label's first occurrence is its max-over-exemplars
+            _, first = np.unique(labels, return_index=True)
+            take = np.sort(first)[:k]
+            scores[q, :len(take)] = row_scores[q][valid][take]
+            idx[q, :len(take)] = labels[take]
+        return scores, idx
+
+    def _search_quantized(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        approx = np.maximum.reduceat(self.quantized.scores(queries), self.offsets[:-1], axis=1)
+        n_labels = len(self.labels)
+        n_cand = min(n_labels, k * config.QUANT_RESCORE_FACTOR)
+        if n_cand < n_labels:
+            candidates = np.argpartition(-approx, n_cand - 1, axis=1)[:, :n_cand]
+        else:
+            candidates = np.broadcast_to(np.arange(n_labels), approx.shape)
+        exact = np.empty(candidates.shape, dtype=np.float32)
+        counts = (self.offsets[1:] - self.offsets[:-1])[candidates]
+        for q in range(queries.shape[0]):
+            # float32 rows of the candidate employees only, gathered in one read
+            rows = np.concatenate([np.arange(self.offsets[j], self.offsets[j + 1]) for j in candidates[q]])
+            sims = self.matrix[rows] @ queries[q]
+            exact[q] = np.maximum.reduceat(sims, np.concatenate([[0], np.cumsum(counts[q])[:-1]]))
+        order = np.argsort(-exact, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(exact, order, axis=1), np.take_along_axis(candidates, order, axis=1).astype(np.int64)
+
+    def rows(self, i: int) -> np.ndarray:
+        """Enrollment rows of the i-th label."""
+        return self.matrix[self.offsets[i]:self.offsets[i + 1]]
+
+
+class GalleryView(GalleryBase):
+    """Read-only union of several galleries, e.g. the main matrix plus journaled enrollments.
+
+    Labels present in more than one part are merged with max-over-exemplars.
+    """
+
+    def __init__(self, parts: Sequence[Gallery]):
+        self.parts = [p for p in parts if len(p)]
+        labels: List[str] = []
+        position: Dict[str, int] = {}
+        self._maps = []
+        for part in self.parts:
+            mapping = []
+            for label in part.labels:
+                if label not in position:
+                    position[label] = len(labels)
+                    labels.append(label)
+                mapping.append(position[label])
+            self._maps.append(np.asarray(mapping, dtype=np.int64))
+        self.labels = np.asarray(labels, dtype=object)
+
+    @property
+    def dim(self) -> int:
+        return self.parts[0].dim if self.parts else 0
+
+    @property
+    def size(self) -> int:
+        return sum(p.size for p in self.parts)
+
+    def label_scores(self, queries: np.ndarray) -> np.ndarray:
+        out = np.full((queries.shape[0], len(self.labels)), -np.inf, dtype=np.float32)
+        for part, mapping in zip(self.parts, self._maps):
+            # mapping has no duplicates within a part, so fancy assignment is safe
+            out[:, mapping] = np.maximum(out[:, mapping], part.label_scores(queries))
+        return out
+
+    def search(self, queries: np.ndarray, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        if not any(part.accelerated for part in self.parts):
+            return super().search(queries, k)
+        # a label in the union top-k is in the top-k of the part holding its best score,
+        # so merging per-part top-k results is exact with respect to each part's search
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        k = max(0, min(int(k), len(self.labels)))
+        if k == 0 or queries.shape[0] == 0:
+            return super().search(queries, k)
+        best = np.full((queries.shape[0], len(self.labels)), -np.inf, dtype=np.float32)
+        for part, mapping in zip(self.parts, self._maps):
+            part_scores, part_idx = part.search(queries, k)
+            for q in range(queries.shape[0]):
+                valid = part_idx[q] >= 0
+                cols = mapping[part_idx[q][valid]]
+                best[q, cols] = np.maximum(best[q, cols], part_scores[q][valid])
+        idx = np.argsort(-best, axis=1, kind="stable")[:, :k]
+        scores = np.take_along_axis(best, idx, axis=1)
+        return scores, np.where(np.isfinite(scores), idx, -1)
+
+    def rows(self, i: int) -> np.ndarray:
+        label = self.labels[i]
+        blocks = [part.rows(int(np.nonzero(part.labels == label)[0][0])) for part in self.parts if label in set(part.labels)]
+        return np.concatenate(blocks, axis=0)
+
+
+def stack_embeddings(embeddings: Iterable[np.ndarray]) -> np.ndarray:
+    """Stack per-face embeddings into one normalized (n, d) float32 matrix."""
+    rows = [np.asarray(e, dtype=np.float32).ravel() for e in embeddings]
+    if not rows:
+        return np.zeros((0, 0), dtype=np.float32)
+    return normalize_rows(np.stack(rows))
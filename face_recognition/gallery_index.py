@@ -0,0 +1,291 @@
+"""
+Pluggable nearest-neighbour indexes over the gallery matrix.
+
+The default, ``VR_FACE_INDEX=bruteforce``, means no index: the gallery scans
+its matrix exactly. ``IVFIndex`` is an inverted-file index in pure NumPy: rows
+are clustered with spherical k-means and a query only scans the ``nprobe``
+closest lists. ``FaissIndex`` wraps a faiss HNSW graph when faiss is
+installed. Indexes return candidate *rows*; the gallery reduces them to
+employees with max-over-exemplars.
+
+The store builds the index for a generation once, under its writer lock, when
+it writes that generation; a compaction that only folds in a few journaled
+rows reuses the previous generation's IVF centroids instead of retraining.
+"""
+
+import glob
+import logging
+import os
+import threading
+from typing import Optional, Tuple
+
+import numpy as np
+
+from . import config
+
+try:
+    import faiss
+except Exception:
+    faiss = None
+
+
+logger = logging.getLogger(__name__)
+
+
+class GalleryIndex:
+    """Interface: build over a normalized (n, d) matrix, then search by inner product."""
+
+    kind = "base"
+
+    def build(self, matrix: np.ndarray) -> "GalleryIndex":
+        raise NotImplementedError
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(scores, rows)`` of shape (q, k), best first; missing results have row -1."""
+        raise NotImplementedError
+
+    suffix = ".npz"
+
+    def params(self) -> dict:
+        """Build parameters; a persisted index is only reused when they match."""
+        return {}
+
+    def file_name(self, generation: int) -> str:
+        tag = "".join(f"-{k}{v}" for k, v in sorted(self.params().items()))
+        return f"{self.kind}-{generation}{tag}{self.suffix}"
+
+    def save(self, path: str):
+        raise NotImplementedError
+
+    def load(self, path: str, matrix: np.ndarray) -> "GalleryIndex":
+        raise NotImplementedError
+
+    def build_from(self, previous_path: str, matrix: np.ndarray) -> Optional["GalleryIndex"]:
+        """Build over ``matrix`` reusing the persisted index at ``previous_path``; None to build from scratch."""
+        return None
+
+
+def _tmp_name(path: str) -> str:
+    # unique per writer: several processes may persist the same generation at once
+    return f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+
+
+def _top_k(scores: np.ndarray, rows: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Best ``k`` of per-query candidate ``(scores, rows)``, padded with -inf / -1."""
+    q, n = scores.shape
+    if n > k:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        scores = np.take_along_axis(scores, part, axis=1)
+        rows = np.take_along_axis(rows, part, axis=1)
+    order = np.argsort(-scores, axis=1, kind="stable")
+    scores = np.take_along_axis(scores, order, axis=1)
+    rows = np.take_along_axis(rows, order, axis=1)
+    if scores.shape[1] < k:
+        pad = k - scores.shape[1]
+        scores = np.pad(scores, ((0, 0), (0, pad)), constant_values=-np.inf)
+        rows = np.pad(rows, ((0, 0), (0, pad)), constant_values=-1)
+    return scores, rows
+
+
+class IVFIndex(GalleryIndex):
+    """Inverted-file index with spherical k-means coarse quantization."""
+
+    kind = "ivf"
+
+    def __init__(self, nlist: int = config.IVF_NLIST, nprobe: int = config.IVF_NPROBE, iterations: int = 10, seed: int = 0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.iterations = iterations
+        self.seed = seed
+
+    def params(self) -> dict:
+        return {"nlist": self.nlist, "iter": self.iterations, "seed": self.seed}
+
+    def _kmeans(self, matrix: np.ndarray, nlist: int) -> np.ndarray:
+        rng = np.random.default_rng(self.seed)
+        # train on a sample; assignment of every row happens afterwards
+        sample = matrix[rng.choice(matrix.shape[0], size=min(matrix.shape[0], nlist * 64), replace=False)]
+        centroids = sample[rng.choice(sample.shape[0], size=nlist, replace=False)].copy()
+        for _ in range(self.iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            counts = np.bincount(assign, minlength=nlist)
+            empty = counts == 0
+            # re-seed empty lists from random sample points
+            sums[empty] = sample[rng.choice(sample.shape[0], size=int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = sums / np.maximum(norms, 1e-12)
+        return centroids.astype(np.float32)
+
+    def build(self, matrix: np.ndarray, centroids: Optional[np.ndarray] = None, trained_rows: int = 0) -> "IVFIndex":
+        """Cluster ``matrix`` and assign every row to a list; given ``centroids``, only assign."""
+        self.matrix = matrix
+        n = matrix.shape[0]
+        if centroids is None:
+            nlist = self.nlist or max(1, int(4 * np.sqrt(n)))
+            nlist = max(1, min(nlist, n))
+            centroids = self._kmeans(np.asarray(matrix, dtype=np.float32), nlist)
+            trained_rows = n
+        self.centroids = centroids
+        # gallery size the centroids were trained on, to decide when they are due for retraining
+        self.trained_rows = trained_rows
+        nlist = centroids.shape[0]
+        assign = np.empty(n, dtype=np.int32)
+        for start in range(0, n, 8192):
+            block = np.asarray(matrix[start:start + 8192], dtype=np.float32)
+            assign[start:start + 8192] = np.argmax(block @ self.centroids.T, axis=1)
+        self.order = np.argsort(assign, kind="stable").astype(np.int64)
+        self.list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=nlist))]).astype(np.int64)
+        return self
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        nprobe = max(1, min(self.nprobe, self.centroids.shape[0]))
+        coarse = queries @ self.centroids.T
+        if nprobe < coarse.shape[1]:
+            probes = np.argpartition(-coarse, nprobe - 1, axis=1)[:, :nprobe]
+        else:
+            probes = np.broadcast_to(np.arange(coarse.shape[1]), coarse.shape)
+        out_scores, out_rows = [], []
+        for query, lists in zip(queries, probes):
+            rows = np.concatenate([self.order[self.list_offsets[c]:self.list_offsets[c + 1]] for c in lists])
+            rows.sort()  # sequential access into the (memory-mapped) matrix
+            scores = self.matrix[rows] @ query
+            s, r = _top_k(scores[None, :], rows[None, :], k)
+            out_scores.append(s[0])
+            out_rows.append(r[0])
+        return np.stack(out_scores), np.stack(out_rows)
+
+    def save(self, path: str):
+        tmp = _tmp_name(path)
+        # a file object keeps np.savez from appending .npz to the name
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                centroids=self.centroids,
+                order=self.order,
+                list_offsets=self.list_offsets,
+                trained_rows=np.int64(self.trained_rows),
+            )
+        os.replace(tmp, path)
+
+    def load(self, path: str, matrix: np.ndarray) -> "IVFIndex":
+        data = np.load(path)
+        self.matrix = matrix
+        self.centroids = data["centroids"]
+        self.order = data["order"]
+        self.list_offsets = data["list_offsets"]
+        self.trained_rows = int(data["trained_rows"]) if "trained_rows" in data else len(self.order)
+        return self
+
+    def build_from(self, previous_path: str, matrix: np.ndarray) -> Optional["IVFIndex"]:
+        # the clusters of a slightly smaller gallery still partition it well; retrain once it has grown
+        with np.load(previous_path) as data:
+            trained_rows = int(data["trained_rows"]) if "trained_rows" in data else len(data["order"])
+            if matrix.shape[0] > trained_rows * config.IVF_RETRAIN_GROWTH:
+                return None
+            centroids = data["centroids"]
+        return self.build(matrix, centroids, trained_rows)
+
+
+class FaissIndex(GalleryIndex):
+    """HNSW graph from faiss (optional dependency)."""
+
+    kind = "faiss"
+
+    def __init__(self, m: int = config.HNSW_M, ef_construction: int = config.HNSW_EF_CONSTRUCTION, ef_search: int = config.HNSW_EF_SEARCH):
+        if faiss is None:
+            raise RuntimeError("faiss is not installed")
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+
+    suffix = ".index"
+
+    def params(self) -> dict:
+        return {"m": self.m, "efc": self.ef_construction}
+
+    def build(self, matrix: np.ndarray) -> "FaissIndex":
+        self._index = faiss.IndexHNSWFlat(matrix.shape[1], self.m, faiss.METRIC_INNER_PRODUCT)
+        self._index.hnsw.efConstruction = self.ef_construction
+        self._index.add(np.ascontiguousarray(matrix, dtype=np.float32))
+        return self
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        self._index.hnsw.efSearch = max(self.ef_search, k)
+        scores, rows = self._index.search(np.ascontiguousarray(queries, dtype=np.float32), k)
+        scores[rows < 0] = -np.inf
+        return scores, rows.astype(np.int64)
+
+    def save(self, path: str):
+        tmp = _tmp_name(path)
+        faiss.write_index(self._index, tmp)
+        os.replace(tmp, path)
+
+    def load(self, path: str, matrix: np.ndarray) -> "FaissIndex":
+        self._index = faiss.read_index(path)
+        return self
+
+
+def create_index(kind: Optional[str] = None) -> Optional[GalleryIndex]:
+    """Instantiate the configured index, or None for ``bruteforce`` (the gallery's exact scan)."""
+    kind = (kind or config.FACE_INDEX).lower()
+    if kind == "bruteforce":
+        return None
+    if kind == "ivf":
+        return IVFIndex()
+    if kind == "faiss":
+        if faiss is None:
+            logger.warning("VR_FACE_INDEX=faiss but faiss is not installed; using the NumPy IVF index")
+            return IVFIndex()
+        return FaissIndex()
+    raise ValueError(f"Unknown face index type: {kind}")
+
+
+def _previous(store_dir: str, index: GalleryIndex, generation: int) -> Optional[str]:
+    """Path of the newest persisted index with the same parameters from an earlier generation."""
+    tag = "".join(f"-{k}{v}" for k, v in sorted(index.params().items()))
+    found = []
+    for path in glob.glob(os.path.join(store_dir, f"{index.kind}-*{tag}{index.suffix}")):
+        number = os.path.basename(path)[len(index.kind) + 1:].split("-", 1)[0]
+        if number.isdigit() and int(number) < generation and os.path.basename(path) == index.file_name(int(number)):
+            found.append((int(number), path))
+    return max(found)[1] if found else None
+
+
+def load_or_build(
+    store_dir: str, generation: int, matrix: np.ndarray, kind: Optional[str] = None, build: bool = True
+) -> Optional[GalleryIndex]:
+    """Index for one store generation: loaded from disk if persisted, otherwise built and saved.
+
+    Building is meant to happen once per generation, with the store's writer
+    lock held; with ``build=False`` a missing index raises ``FileNotFoundError``.
+    """
+    if matrix.shape[0] < config.INDEX_MIN_ROWS:
+        return None
+    index = create_index(kind)
+    if index is None:
+        return None
+    path = os.path.join(store_dir, index.file_name(generation))
+    if os.path.exists(path):
+        try:
+            return index.load(path, matrix)
+        except Exception as e:
+            logger.warning("Rebuilding unreadable face index %s: %s", path, e)
+    if not build:
+        raise FileNotFoundError(path)
+    previous = _previous(store_dir, index, generation)
+    built = None
+    if previous is not None:
+        try:
+            built = index.build_from(previous, matrix)
+        except Exception as e:
+            logger.warning("Could not reuse face index %s: %s", previous, e)
+    if built is None:
+        logger.info("Building %s face index over %d enrollments", index.kind, matrix.shape[0])
+        index.build(matrix)
+    try:
+        index.save(path)
+    except OSError as e:
+        logger.warning("Could not persist face index %s: %s", path, e)
+    return index
@@ -0,0 +1,107 @@
+"""
+Hot reload for live galleries.
+
+A watcher thread polls the embedding store's change token (index inode/mtime
+plus journal size) and, when it changes, builds the new gallery off the
+recognition path and hands it to every subscribed Recognizer, which swaps its
+reference atomically. Recognition threads keep using the old snapshot until
+the swap; no model is reloaded.
+"""
+
+import logging
+import os
+import threading
+import weakref
+from typing import Callable, Dict, List, Optional
+
+from . import config
+from .embedding_store import open_store
+
+
+logger = logging.getLogger(__name__)
+
+
+class GalleryWatcher:
+    """Publishes new gallery snapshots of one embedding store to subscribers."""
+
+    def __init__(self, path: str, interval: float = config.GALLERY_RELOAD_INTERVAL_SECS):
+        self.path = path
+        self.interval = interval
+        self._store = open_store(path)
+        self._stamp: Optional[tuple] = None
+        self._subscribers: List[weakref.WeakMethod] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, callback: Callable):
+        """Register a bound method called with each new gallery; held weakly."""
+        with self._lock:
+            self._subscribers.append(weakref.WeakMethod(callback))
+            # the first check republishes the (cached) current gallery, so a change
+            # landing between a subscriber's initial load and subscribing is not missed
+            self._stamp = None
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="gallery-watcher", daemon=True)
+                self._thread.start()
+
+    def _current_stamp(self) -> Optional[tuple]:
+        try:
+            return self._store.stamp()
+        except FileNotFoundError:
+            return None
+
+    def notify(self):
+        """Check for changes now instead of waiting for the next poll."""
+        self._wake.set()
+
+    def check(self) -> bool:
+        """Reload and publish if the store changed; returns True when a new gallery was published."""
+        from .recognize_wrapper import load_gallery
+
+        stamp = self._current_stamp()
+        if stamp is None or stamp == self._stamp:
+            return False
+        gallery = load_gallery(self.path)
+        with self._lock:
+            self._stamp = stamp
+            alive = [ref for ref in self._subscribers if ref() is not None]
+            self._subscribers = alive
+        for ref in alive:
+            callback = ref()
+            if callback is not None:
+                callback(gallery)
+        logger.info("Reloaded face gallery from %s (%d employees)", self._store.path, len(gallery))
+        return True
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.check()
+            except Exception as e:
+                logger.warning("Gallery reload from %s failed: %s", self.path, e)
+            with self._lock:
+                if not any(ref() is not None for ref in self._subscribers):
+                    self._thread = None
+                    return
+
+
+_watchers: Dict[str, GalleryWatcher] = {}
+_watchers_lock = threading.Lock()
+
+
+def get_watcher(path: str) -> GalleryWatcher:
+    """The process-wide watcher for the store behind ``path``."""
+    key = os.path.abspath(open_store(path).path)
+    with _watchers_lock:
+        watcher = _watchers.get(key)
+        if watcher is None:
+            watcher = _watchers[key] = GalleryWatcher(path)
+        return watcher
+
+
+def notify_gallery_changed(path: str):
+    """Tell live Recognizers on ``path`` to pick up a just-written enrollment right away."""
+    get_watcher(path).notify()
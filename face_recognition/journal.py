@@ -0,0 +1,173 @@
+"""
+Append-only enrollment journal.
+
+New enrollments are appended to a small log next to the embedding matrix
+instead of rewriting the matrix. Each record is self-describing and carries a
+CRC so a torn tail after a crash is detected and ignored. Concurrent writers
+share one background fsync, so a burst of registrations costs a single flush.
+
+Appends from every process hold the store's ``FileLock``, the same lock the
+compactor holds while it detaches the journal. A writer whose open file was
+detached by another process reopens ``journal.log`` before writing, so no
+record lands in a file that is about to be folded and deleted.
+"""
+
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import config
+from .filelock import get_file_lock
+
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"EJ"
+# magic, label length, vector dimension, crc32 of label + vector bytes
+_HEADER = struct.Struct("<2sHII")
+
+
+def encode_record(label: str, vector: np.ndarray) -> bytes:
+    label_bytes = label.encode("utf-8")
+    payload = np.ascontiguousarray(vector, dtype="<f4").tobytes()
+    crc = zlib.crc32(label_bytes + payload)
+    return _HEADER.pack(_MAGIC, len(label_bytes), len(payload) // 4, crc) + label_bytes + payload
+
+
+def read_records(path: str) -> List[Tuple[str, np.ndarray]]:
+    """Decode every complete record in a journal file; a torn or corrupt tail is skipped."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return []
+    records: List[Tuple[str, np.ndarray]] = []
+    pos = 0
+    while pos + _HEADER.size <= len(data):
+        magic, label_len, dim, crc = _HEADER.unpack_from(data, pos)
+        end = pos + _HEADER.size + label_len + dim * 4
+        if magic != _MAGIC or end > len(data):
+            break
+        body = data[pos + _HEADER.size:end]
+        if zlib.crc32(body) != crc:
+            break
+        label = body[:label_len].decode("utf-8")
+        records.append((label, np.frombuffer(body[label_len:], dtype="<f4").astype(np.float32)))
+        pos = end
+    if pos < len(data):
+        logger.warning("Ignoring %d trailing bytes in enrollment journal %s", len(data) - pos, path)
+    return records
+
+
+class EnrollmentJournal:
+    """Append-only log with group-committed fsync, safe to append to from several processes."""
+
+    def __init__(
+        self,
+        path: str,
+        fsync_interval: float = config.JOURNAL_FSYNC_INTERVAL_SECS,
+        lock_path: Optional[str] = None,
+    ):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.lock = get_file_lock(lock_path or f"{path}.lock")
+        self._cond = threading.Condition()
+        self._fd = None
+        self._written = 0
+        self._synced = 0
+        self._flusher = None
+
+    def _open(self) -> int:
+        # called with self.lock held; another process may have detached the file we have open
+        if self._fd is not None:
+            try:
+                current = os.stat(self.path)
+                opened = os.fstat(self._fd)
+                moved = (current.st_ino, current.st_dev) != (opened.st_ino, opened.st_dev)
+            except FileNotFoundError:
+                moved = True
+            if moved:
+                self._close()
+        if self._fd is None:
+            flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, "O_BINARY", 0)
+            self._fd = os.open(self.path, flags, 0o644)
+        return self._fd
+
+    def _close(self):
+        # called with self._cond held
+        os.fsync(self._fd)
+        os.close(self._fd)
+        self._fd = None
+        self._synced = self._written
+        self._cond.notify_all()
+
+    def append(self, label: str, vectors: np.ndarray, durable: bool = True) -> int:
+        """Append one record per row of ``vectors``; with ``durable`` wait until it is fsynced."""
+        data = b"".join(encode_record(label, row) for row in np.atleast_2d(vectors))
+        with self.lock, self._cond:
+            os.write(self._open(), data)
+            self._written += 1
+            seq = self._written
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(target=self._flush_loop, name="enroll-journal-fsync", daemon=True)
+                self._flusher.start()
+            self._cond.notify_all()
+        if durable:
+            with self._cond:
+                self._cond.wait_for(lambda: self._synced >= seq)
+        return seq
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._written > self._synced)
+            # let concurrent writers pile into the same fsync
+            time.sleep(self.fsync_interval)
+            with self._cond:
+                target = self._written
+                if self._fd is not None:
+                    os.fsync(self._fd)
+                self._synced = max(self._synced, target)
+                self._cond.notify_all()
+
+    def size(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def detach(self, target_path: str) -> bool:
+        """Flush and move the current journal to ``target_path``; later appends start a fresh file.
+
+        Appends in other processes reopen ``path`` once they see it moved.
+        """
+        with self.lock, self._cond:
+            if self._fd is not None:
+                self._close()
+            if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+                return False
+            if os.path.exists(target_path):
+                # replacing it would drop records that were never folded
+                raise FileExistsError(target_path)
+            os.replace(self.path, target_path)
+            return True
+
+
+_journals: Dict[str, EnrollmentJournal] = {}
+_journals_lock = threading.Lock()
+
+
+def get_journal(path: str, lock_path: Optional[str] = None) -> EnrollmentJournal:
+    """The process-wide journal writer for ``path``, appending under the file lock at ``lock_path``."""
+    key = os.path.abspath(path)
+    with _journals_lock:
+        journal = _journals.get(key)
+        if journal is None:
+            journal = _journals[key] = EnrollmentJournal(path, lock_path=lock_path)
+        return journal
@@ -0,0 +1,282 @@
+"""
+Per-stage latency metrics for the face pipeline.
+
+Stages are timed with ``timer("detect")`` blocks and events counted with
+``incr("faces_detected")``; the process-wide ``Metrics`` keeps a fixed-bucket
+latency histogram per stage and a total per counter. With ``VR_METRICS`` unset
+both calls return immediately, so instrumented code costs one config lookup.
+
+When enabled, aggregates are reported two ways:
+
+    VR_METRICS_LOG_SECS    periodic one-line summary per stage in the log
+    VR_METRICS_PORT        http://127.0.0.1:<port>/metrics       Prometheus text
+                           http://127.0.0.1:<port>/metrics.json  the same as JSON
+
+Metrics are per process. Each LiveKit job process binds the first free port
+from ``VR_METRICS_PORT`` upward and logs the URL it got.
+
+Stages recorded by the face tools: camera_open, frame_read, detect, quality,
+confirm, embed, match, decision and time_to_decision (a whole first-decision
+or retry call). Counters: frames_processed, frames_skipped, frames_dropped,
+faces_detected, faces_gated (failed the quality gate), faces_embedded and
+decisions_made.
+"""
+
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from . import config
+
+
+logger = logging.getLogger(__name__)
+
+# upper bucket bounds in seconds; the last bucket is everything slower
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram with count, sum and max."""
+
+    def __init__(self, bounds=BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the ``q`` quantile (the max for the overflow bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+    def as_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": dict(zip([str(b) for b in self.bounds] + ["+Inf"], self.counts)),
+        }
+
+
+class _Timer:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics: "Metrics", stage: str):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """Thread-safe stage histograms and counters."""
+
+    def __init__(self):
+        self.stages: Dict[str, Histogram] = {}
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def timer(self, stage: str) -> _Timer:
+        return _Timer(self, stage)
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            hist = self.stages.get(stage)
+            if hist is None:
+                hist = self.stages[stage] = Histogram()
+            hist.observe(seconds)
+
+    def incr(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "stages": {name: hist.as_dict() for name, hist in sorted(self.stages.items())},
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def prometheus(self) -> str:
+        """The aggregates in the Prometheus text exposition format."""
+        snap = self.snapshot()
+        lines: List[str] = []
+        if snap["stages"]:
+            lines.append("# HELP clara_face_stage_seconds Face pipeline stage latency.")
+            lines.append("# TYPE clara_face_stage_seconds histogram")
+        for stage, hist in snap["stages"].items():
+            cumulative = 0
+            for le, n in hist["buckets"].items():
+                cumulative += n
+                lines.append(f'clara_face_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'clara_face_stage_seconds_sum{{stage="{stage}"}} {hist["sum"]:.6f}')
+            lines.append(f'clara_face_stage_seconds_count{{stage="{stage}"}} {hist["count"]}')
+        for name, value in snap["counters"].items():
+            lines.append(f"# TYPE clara_face_{name}_total counter")
+            lines.append(f"clara_face_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """One line per stage with count and p50/p95/max in milliseconds, then the counters."""
+        snap = self.snapshot()
+        lines = [
+            f"{stage}: n={h['count']} p50={h['p50'] * 1000:.1f}ms p95={h['p95'] * 1000:.1f}ms max={h['max'] * 1000:.1f}ms"
+            for stage, h in snap["stages"].items()
+        ]
+        if snap["counters"]:
+            lines.append(" ".join(f"{name}={value}" for name, value in snap["counters"].items()))
+        return "\n".join(lines)
+
+
+class MetricsServer:
+    """Serves a ``Metrics`` instance at ``/metrics`` (Prometheus text) and ``/metrics.json``."""
+
+    def __init__(self, metrics: Metrics, host: str = config.METRICS_HOST, port: int = config.METRICS_PORT):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def start(self) -> "MetricsServer":
+        if self._server is not None:
+            return self
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, fmt, *args):
+                logger.debug("metrics %s: " + fmt, self.address_string(), *args)
+
+            def do_GET(self):
+                if self.path.startswith("/metrics.json"):
+                    body, ctype = json.dumps(metrics.snapshot()).encode(), "application/json"
+                elif self.path.startswith("/metrics"):
+                    body, ctype = metrics.prometheus().encode(), "text/plain; version=0.0.4"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        attempts = max(1, config.DEBUG_PORT_ATTEMPTS) if self.port else 1
+        for port in range(self.port, self.port + attempts):
+            try:
+                self._server = ThreadingHTTPServer((self.host, port), Handler)
+                break
+            except OSError:
+                # taken by another job process of this worker
+                if port == self.port + attempts - 1:
+                    raise
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True).start()
+        logger.info("Face metrics of process %d on http://%s:%d/metrics", os.getpid(), self.host, self.port)
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def _log_summaries(metrics: Metrics, interval: float):
+    last = None
+    while True:
+        time.sleep(interval)
+        snap = metrics.snapshot()
+        if snap != last and (snap["stages"] or snap["counters"]):
+            logger.info("Face pipeline metrics:\n%s", metrics.summary())
+            last = snap
+
+
+_metrics: Optional[Metrics] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Optional[Metrics]:
+    """The process-wide ``Metrics``, with its endpoint and log summary started on first use; None when disabled."""
+    global _metrics
+    if not config.METRICS:
+        return None
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                metrics = Metrics()
+                if config.METRICS_PORT:
+                    try:
+                        MetricsServer(metrics).start()
+                    except OSError as e:
+                        logger.warning(
+                            "Face metrics endpoint could not start on ports %s-%s: %s",
+                            config.METRICS_PORT, config.METRICS_PORT + config.DEBUG_PORT_ATTEMPTS - 1, e,
+                        )
+                if config.METRICS_LOG_INTERVAL_SECS > 0:
+                    threading.Thread(
+                        target=_log_summaries,
+                        args=(metrics, config.METRICS_LOG_INTERVAL_SECS),
+                        name="metrics-log",
+                        daemon=True,
+                    ).start()
+                _metrics = metrics
+    return _metrics
+
+
+def timer(stage: str):
+    """Context manager timing ``stage``; a shared no-op when metrics are disabled."""
+    if not config.METRICS:
+        return _NULL_TIMER
+    return get_metrics().timer(stage)
+
+
+def observe(stage: str, seconds: float):
+    if config.METRICS:
+        get_metrics().observe(stage, seconds)
+
+
+def incr(name: str, n: int = 1):
+    if config.METRICS:
+        get_metrics().incr(name, n)
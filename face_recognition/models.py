@@ -0,0 +1,261 @@
+"""
+Shared InsightFace model registry.
+
+Loading and preparing ``FaceAnalysis`` takes seconds, so every path in this
+package draws its models from here instead of constructing its own. Models are
+created lazily on first use, keyed by model name, providers, det_size and the
+set of analysis modules and ONNX Runtime session settings, and stay resident
+until released. Only detection and
+recognition are loaded by default: this package never reads the landmark or
+gender/age outputs, which would otherwise run on every face. FaceAnalysis
+builds an ONNX Runtime session for every file of a pack before it applies
+``allowed_modules``, so the files of the other modules are left out up front.
+"""
+
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import config
+
+try:
+    import insightface
+except Exception:
+    insightface = None
+
+try:
+    import onnxruntime
+except Exception:
+    onnxruntime = None
+
+
+logger = logging.getLogger(__name__)
+
+# the recognition tier: every embedding in the gallery must come from the same pack
+DEFAULT_MODEL_NAME = config.RECOGNITION_MODEL
+DEFAULT_PROVIDERS: Tuple[str, ...] = ("CPUExecutionProvider",)
+DEFAULT_DET_SIZE: Tuple[int, int] = tuple(config.RECOGNITION_DET_SIZE)
+
+DETECTOR_MODULES: Tuple[str, ...] = ("detection",)
+
+# task of each ONNX file in the stock InsightFace packs; other files are left to FaceAnalysis
+PACK_FILE_TASKS: Dict[str, str] = {
+    "det_10g.onnx": "detection",
+    "det_2.5g.onnx": "detection",
+    "det_500m.onnx": "detection",
+    "w600k_r50.onnx": "recognition",
+    "w600k_mbf.onnx": "recognition",
+    "glintr100.onnx": "recognition",
+    "1k3d68.onnx": "landmark_3d_68",
+    "2d106det.onnx": "landmark_2d_106",
+    "genderage.onnx": "genderage",
+}
+
+ModelKey = Tuple[str, Tuple[str, ...], Tuple[int, int], Tuple[str, ...], Tuple[Tuple[str, Any], ...]]
+
+_lock = threading.Lock()
+_models: Dict[ModelKey, object] = {}
+_missing_packs_logged = set()
+
+_GRAPH_OPTIMIZATION = {
+    "disable": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+_EXECUTION_MODE = {"sequential": "ORT_SEQUENTIAL", "parallel": "ORT_PARALLEL"}
+
+
+def _parse_options(text: str) -> Dict[str, Any]:
+    """``"intra_op_threads=2,memory_arena=0"`` -> typed settings, checked against ``config.ORT_OPTIONS``."""
+    parsed: Dict[str, Any] = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        key, _, value = item.partition("=")
+        key, value = key.strip(), value.strip()
+        if key not in config.ORT_OPTIONS:
+            raise ValueError(f"Unknown ONNX Runtime option: {key}")
+        default = config.ORT_OPTIONS[key]
+        if isinstance(default, bool):
+            parsed[key] = value.lower() in ("1", "true", "yes", "on")
+        elif isinstance(default, int):
+            parsed[key] = int(value)
+        else:
+            parsed[key] = value.lower()
+    return parsed
+
+
+def session_settings(name: str, overrides: Optional[Mapping[str, Any]] = None) -> Dict[str, Any]:
+    """Effective ORT settings for model pack ``name``: defaults, env, per-pack config and env, then ``overrides``."""
+    settings = dict(config.ORT_OPTIONS)
+    settings.update(_parse_options(os.getenv("VR_ORT_OPTIONS", "")))
+    settings.update(config.ORT_MODEL_OPTIONS.get(name, {}))
+    settings.update(_parse_options(os.getenv(f"VR_ORT_OPTIONS_{name.upper()}", "")))
+    settings.update(overrides or {})
+    if settings["graph_optimization"] not in _GRAPH_OPTIMIZATION:
+        raise ValueError(f"Unknown graph optimization level: {settings['graph_optimization']}")
+    if settings["execution_mode"] not in _EXECUTION_MODE:
+        raise ValueError(f"Unknown execution mode: {settings['execution_mode']}")
+    return settings
+
+
+def make_session_options(settings: Mapping[str, Any]):
+    """Build ``onnxruntime.SessionOptions`` from ``session_settings`` output."""
+    if onnxruntime is None:
+        raise RuntimeError("onnxruntime is not installed")
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = int(settings["intra_op_threads"])
+    options.inter_op_num_threads = int(settings["inter_op_threads"])
+    options.graph_optimization_level = getattr(onnxruntime.GraphOptimizationLevel, _GRAPH_OPTIMIZATION[settings["graph_optimization"]])
+    options.execution_mode = getattr(onnxruntime.ExecutionMode, _EXECUTION_MODE[settings["execution_mode"]])
+    options.enable_cpu_mem_arena = bool(settings["memory_arena"])
+    if not settings["allow_spinning"]:
+        options.add_session_config_entry("session.intra_op.allow_spinning", "0")
+        options.add_session_config_entry("session.inter_op.allow_spinning", "0")
+    return options
+
+
+def _make_key(
+    name: str,
+    providers: Sequence[str],
+    det_size: Sequence[int],
+    modules: Optional[Sequence[str]],
+    session: Optional[Mapping[str, Any]],
+) -> ModelKey:
+    modules = config.FACE_MODULES if modules is None else modules
+    settings = tuple(sorted(session_settings(str(name), session).items()))
+    return (str(name), tuple(providers), (int(det_size[0]), int(det_size[1])), tuple(sorted(modules)), settings)
+
+
+def pack_dir(name: str, modules: Sequence[str], root: str = "~/.insightface") -> str:
+    """Model directory for pack ``name`` holding only the files ``modules`` need, or ``name`` itself.
+
+    The subset is a folder of symlinks inside the pack, so skipped modules never
+    get a session. ``name`` is returned as is (and FaceAnalysis loads or
+    downloads the whole pack) when all modules are wanted, the pack is not on
+    disk yet, nothing can be skipped, or the links cannot be created.
+    """
+    full = os.path.join(os.path.expanduser(root), "models", name)
+    if not modules or not os.path.isdir(full):
+        return name
+    files = sorted(f for f in os.listdir(full) if f.endswith(".onnx"))
+    wanted = [f for f in files if PACK_FILE_TASKS.get(f) in (None, *modules)]
+    if len(wanted) == len(files):
+        return name
+    subset = os.path.join(full, ".modules-" + "-".join(sorted(modules)))
+    try:
+        os.makedirs(subset, exist_ok=True)
+        for f in wanted:
+            link = os.path.join(subset, f)
+            if not os.path.lexists(link):
+                try:
+                    os.symlink(os.path.join(full, f), link)
+                except FileExistsError:
+                    pass  # another process linked it first
+    except OSError as e:
+        logger.debug("Loading all of %s, could not link a module subset: %s", name, e)
+        return name
+    return subset
+
+
+def detection_pack(root: str = "~/.insightface") -> str:
+    """Pack for the detection tier: ``config.DETECT_MODEL`` if it is on disk, else the recognition pack.
+
+    A missing detection pack is not downloaded, so a kiosk that only has the
+    recognition pack (offline or not) keeps starting with that single pack.
+    """
+    name = config.DETECT_MODEL
+    if name == config.RECOGNITION_MODEL or os.path.isdir(os.path.join(os.path.expanduser(root), "models", name)):
+        return name
+    if name not in _missing_packs_logged:
+        _missing_packs_logged.add(name)
+        logger.warning(
+            "Detection pack %s is not installed; detecting with %s instead. Download %s to use the lighter detector.",
+            name, config.RECOGNITION_MODEL, name,
+        )
+    return config.RECOGNITION_MODEL
+
+
+def get_face_analysis(
+    name: str = DEFAULT_MODEL_NAME,
+    providers: Sequence[str] = DEFAULT_PROVIDERS,
+    det_size: Sequence[int] = DEFAULT_DET_SIZE,
+    modules: Optional[Sequence[str]] = None,
+    session: Optional[Mapping[str, Any]] = None,
+):
+    """Return the shared, prepared ``FaceAnalysis`` for this configuration, loading it on first use.
+
+    ``modules`` are InsightFace task names (detection, recognition, landmark_2d_106,
+    landmark_3d_68, genderage); an empty sequence loads them all. ``session``
+    overrides individual ONNX Runtime settings (see ``session_settings``) for
+    every sub-model of the pack.
+    """
+    key = _make_key(name, providers, det_size, modules, session)
+    model = _models.get(key)
+    if model is not None:
+        return model
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            if insightface is None:
+                raise RuntimeError("insightface is not installed")
+            logger.info("Loading face model %s (providers=%s, det_size=%s, modules=%s, session=%s)", *key[:4], dict(key[4]))
+            model = insightface.app.FaceAnalysis(
+                name=pack_dir(key[0], key[3]),
+                providers=list(key[1]),
+                allowed_modules=list(key[3]) or None,
+                sess_options=make_session_options(dict(key[4])),
+            )
+            model.prepare(ctx_id=0, det_size=key[2])
+            _models[key] = model
+    return model
+
+
+def warmup(
+    name: str = DEFAULT_MODEL_NAME,
+    providers: Sequence[str] = DEFAULT_PROVIDERS,
+    det_size: Sequence[int] = DEFAULT_DET_SIZE,
+    modules: Optional[Sequence[str]] = None,
+    session: Optional[Mapping[str, Any]] = None,
+):
+    """Load a model ahead of time and run one inference so ONNX Runtime allocates its buffers."""
+    model = get_face_analysis(name, providers, det_size, modules, session)
+    blank = np.zeros((int(det_size[1]), int(det_size[0]), 3), dtype=np.uint8)
+    try:
+        model.get(blank)
+    except Exception as e:
+        logger.warning("Face model warm-up inference failed: %s", e)
+    return model
+
+
+def warmup_detector(providers: Sequence[str] = DEFAULT_PROVIDERS):
+    """Warm up the detection tier that runs on every live frame."""
+    return warmup(detection_pack(), providers, config.DETECT_SIZE, DETECTOR_MODULES)
+
+
+def release(
+    name: Optional[str] = None,
+    providers: Optional[Sequence[str]] = None,
+    det_size: Optional[Sequence[int]] = None,
+) -> int:
+    """Drop cached models matching the given fields (all models when called without arguments)."""
+    with _lock:
+        doomed = [
+            key for key in _models
+            if (name is None or key[0] == name)
+            and (providers is None or key[1] == tuple(providers))
+            and (det_size is None or key[2] == (int(det_size[0]), int(det_size[1])))
+        ]
+        for key in doomed:
+            del _models[key]
+    if doomed:
+        logger.info("Released %d face model(s)", len(doomed))
+    return len(doomed)
+
+
+def loaded_models() -> List[ModelKey]:
+    """Keys of the models currently resident in this process."""
+    with _lock:
+        return list(_models)
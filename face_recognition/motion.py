@@ -0,0 +1,96 @@
+"""
+Motion and presence gating.
+
+A cheap pre-stage in front of the face detector: frames are compared on a
+small grayscale copy and the detector only runs when something changed, or
+while faces are still in view. An idle/active frame-rate policy keeps the
+loop slow on an empty lobby and ramps up as soon as motion appears.
+"""
+
+import time
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from . import config
+
+
+class MotionGate:
+    """Frame differencing on a downscaled grayscale copy."""
+
+    def __init__(
+        self,
+        width: int = config.MOTION_DOWNSCALE_WIDTH,
+        pixel_delta: int = config.MOTION_PIXEL_DELTA,
+        min_changed_ratio: float = config.MOTION_MIN_CHANGED_RATIO,
+        background_alpha: float = config.MOTION_BACKGROUND_ALPHA,
+    ):
+        self.width = width
+        self.pixel_delta = pixel_delta
+        self.min_changed_ratio = min_changed_ratio
+        self.background_alpha = background_alpha
+        self._background: Optional[np.ndarray] = None
+        self.last_changed_ratio = 0.0
+
+    def _small_gray(self, frame: np.ndarray) -> np.ndarray:
+        h, w = frame.shape[:2]
+        height = max(1, int(h * self.width / max(w, 1)))
+        small = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (5, 5), 0).astype(np.float32)
+
+    def has_motion(self, frame: np.ndarray) -> bool:
+        """Return True if ``frame`` differs enough from the running background."""
+        gray = self._small_gray(frame)
+        if self._background is None or self._background.shape != gray.shape:
+            self._background = gray
+            self.last_changed_ratio = 1.0
+            return True
+        changed = np.abs(gray - self._background) > self.pixel_delta
+        self.last_changed_ratio = float(changed.mean())
+        # slow running average absorbs lighting drift without hiding people
+        cv2.accumulateWeighted(gray, self._background, self.background_alpha)
+        return self.last_changed_ratio >= self.min_changed_ratio
+
+    def reset(self):
+        self._background = None
+
+
+class FramePacer:
+    """Idle/active frame-rate policy.
+
+    Stays at ``idle_fps`` until motion or a face is seen, then runs at
+    ``active_fps`` until ``active_hold_s`` seconds pass without either.
+    """
+
+    def __init__(
+        self,
+        idle_fps: float = config.IDLE_FPS,
+        active_fps: float = config.ACTIVE_FPS,
+        active_hold_s: float = config.ACTIVE_HOLD_SECS,
+    ):
+        self.idle_fps = idle_fps
+        self.active_fps = active_fps
+        self.active_hold_s = active_hold_s
+        self._active_until = 0.0
+        self._last_tick = 0.0
+
+    @property
+    def active(self) -> bool:
+        return time.time() < self._active_until
+
+    def mark_activity(self):
+        self._active_until = time.time() + self.active_hold_s
+
+    def wait(self, stop_event=None):
+        """Sleep until the next frame is due under the current policy."""
+        fps = self.active_fps if self.active else self.idle_fps
+        if fps > 0:
+            delay = self._last_tick + 1.0 / fps - time.time()
+            if delay > 0:
+                if stop_event is not None:
+                    stop_event.wait(delay)
+                else:
+                    time.sleep(delay)
+        self._last_tick = time.time()
@@ -0,0 +1,153 @@
+"""
+Auto-enrollment daemon for the employee photo folder.
+
+Watches ``VR_EMP_PHOTOS`` and, whenever images are added or changed, runs the
+incremental enrollment from ``enroll_faces.py`` on a background thread: only
+new or changed photos are embedded, new employees are journaled into the live
+store and running Recognizers pick them up through the gallery watcher. Uses
+filesystem notifications (inotify via watchfiles) when available and polls
+otherwise. Run standalone with ``python -m face_recognition.photo_watcher`` or
+set ``VR_PHOTO_WATCH=1`` to start it with the agent.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from . import config
+from .enroll_faces import EMBEDDINGS_FILE, FACE_DB_DIR, IMAGE_EXTENSIONS, enroll
+
+try:
+    import watchfiles
+except Exception:
+    watchfiles = None
+
+
+logger = logging.getLogger(__name__)
+
+
+def snapshot(photos_dir: str) -> Dict[str, Tuple[int, int]]:
+    """``{path: (size, mtime_ns)}`` of every image under ``photos_dir``."""
+    found = {}
+    for root, _, files in os.walk(photos_dir):
+        for fname in files:
+            if os.path.splitext(fname)[1].lower() in IMAGE_EXTENSIONS:
+                path = os.path.join(root, fname)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                found[path] = (st.st_size, st.st_mtime_ns)
+    return found
+
+
+class PhotoWatcher:
+    """Background thread that keeps the embedding store in sync with a photo folder."""
+
+    def __init__(
+        self,
+        photos_dir: str = FACE_DB_DIR,
+        output: str = EMBEDDINGS_FILE,
+        poll_interval: float = config.PHOTO_WATCH_POLL_SECS,
+        debounce: float = config.PHOTO_WATCH_DEBOUNCE_SECS,
+        use_notifications: bool = True,
+    ):
+        self.photos_dir = photos_dir
+        self.output = output
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.use_notifications = use_notifications and watchfiles is not None
+        self.runs = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "PhotoWatcher":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="photo-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def sync(self):
+        """Enroll whatever changed since the last run; errors are logged, never raised."""
+        try:
+            summary = enroll(self.photos_dir, self.output, workers=1)
+            self.runs += 1
+            if summary["updated"] or summary["removed"]:
+                logger.info("Auto-enrolled %s from %s in %.1fs", ", ".join(summary["updated"]) or "no one", self.photos_dir, summary["seconds"])
+        except Exception as e:
+            logger.warning("Auto-enrollment from %s failed: %s", self.photos_dir, e)
+
+    def _run(self):
+        os.makedirs(self.photos_dir, exist_ok=True)
+        # catch up on photos added while nothing was watching
+        self.sync()
+        if self.use_notifications:
+            self._watch_notifications()
+        else:
+            self._watch_polling()
+
+    def _watch_notifications(self):
+        def is_image(change, path):
+            return os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS
+
+        # watchfiles batches events until the folder has been quiet for ``debounce``
+        for _ in watchfiles.watch(
+            self.photos_dir, watch_filter=is_image, debounce=int(self.debounce * 1000),
+            stop_event=self._stop, raise_interrupt=False,
+        ):
+            self.sync()
+
+    def _watch_polling(self):
+        last = snapshot(self.photos_dir)
+        while not self._stop.wait(self.poll_interval):
+            current = snapshot(self.photos_dir)
+            if current == last:
+                continue
+            # wait for copies in progress to settle before embedding
+            while not self._stop.wait(self.debounce):
+                settled = snapshot(self.photos_dir)
+                if settled == current:
+                    break
+                current = settled
+            last = current
+            self.sync()
+
+
+_watcher: Optional[PhotoWatcher] = None
+_watcher_lock = threading.Lock()
+
+
+def start_photo_watcher(photos_dir: str = FACE_DB_DIR, output: str = EMBEDDINGS_FILE) -> PhotoWatcher:
+    """Start the process-wide photo watcher once; later calls return the running one."""
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = PhotoWatcher(photos_dir, output).start()
+            logger.info("Watching %s for new employee photos (%s)", photos_dir, "notifications" if _watcher.use_notifications else "polling")
+        return _watcher
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Auto-enroll employee photos as they are added.")
+    parser.add_argument("--photos", default=FACE_DB_DIR)
+    parser.add_argument("--output", default=EMBEDDINGS_FILE)
+    parser.add_argument("--poll", action="store_true", help="poll instead of using filesystem notifications")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    watcher = PhotoWatcher(args.photos, args.output, use_notifications=not args.poll).start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        watcher.stop()
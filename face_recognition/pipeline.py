@@ -0,0 +1,227 @@
+"""
+Staged recognition pipeline.
+
+``recognize_stream`` splits ``Recognizer.recognize_frame`` across threads:
+
+    capture -> [frames] -> detect -> [plans] -> recognize -> [results] -> caller (decide)
+
+Capture reads the frame source, detect runs the light detector, tracker and
+quality gate (``Recognizer.plan``), and recognize runs the recognition pack's
+confirmation, ArcFace and gallery matching (``Recognizer.complete_frames``). The
+caller consumes ``(frame, results)`` pairs from the generator and makes its
+decisions. ONNX Runtime and OpenCV release the GIL while they compute, so the
+camera keeps delivering and the detector works on frame N+1 while ArcFace is
+still busy with frame N.
+
+Stages are joined by small ``DropOldestQueue``s: a stage that falls behind
+loses the oldest pending work instead of adding latency, so the caller always
+sees results for recent frames. A dropped plan only postpones embedding a
+track to its next frame. Sources replayed at maximum speed get blocking
+queues instead, so every recorded frame is still processed exactly once.
+"""
+
+import collections
+import logging
+import threading
+import time
+from typing import Iterator, List, Dict, Optional, Tuple
+
+import numpy as np
+
+from . import config, metrics
+from .frame_source import FrameSource
+from .motion import FramePacer, MotionGate
+from .recognize_wrapper import Recognizer
+from .tracker import FaceTracker
+
+
+logger = logging.getLogger(__name__)
+
+CLOSED = object()
+
+
+class DropOldestQueue:
+    """Bounded FIFO whose ``put`` never blocks: when full, the oldest item is discarded.
+
+    With ``lossless=True`` a full queue makes ``put`` wait for space instead.
+    """
+
+    def __init__(self, maxsize: int = config.PIPELINE_QUEUE_SIZE, lossless: bool = False):
+        self._items = collections.deque(maxlen=max(1, maxsize))
+        self._cond = threading.Condition()
+        self._closed = False
+        self.lossless = lossless
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if self.lossless:
+                self._cond.wait_for(lambda: len(self._items) < self._items.maxlen or self._closed)
+            if self._closed:
+                return
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify_all()
+
+    def get(self, timeout: Optional[float] = None):
+        """Next item; None on timeout, ``CLOSED`` once closed and drained."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout=timeout):
+                return None
+            if self._items:
+                item = self._items.popleft()
+                self._cond.notify_all()
+                return item
+            return CLOSED
+
+    def drain(self) -> list:
+        """Remove and return everything currently queued."""
+        with self._cond:
+            items = list(self._items)
+            self._items.clear()
+            self._cond.notify_all()
+            return items
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+
+class _Stage(threading.Thread):
+    """Runs ``step`` on every item of ``inp`` and forwards the result to ``out``.
+
+    A ``batch`` stage takes everything waiting in ``inp`` at once; its ``step``
+    maps a list of items to a list of results.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        step,
+        inp: Optional[DropOldestQueue],
+        out: DropOldestQueue,
+        stop: threading.Event,
+        batch: bool = False,
+    ):
+        super().__init__(name=name, daemon=True)
+        self.step = step
+        self.inp = inp
+        self.out = out
+        self.stop = stop
+        self.batch = batch
+        self.error: Optional[BaseException] = None
+
+    def run(self):
+        try:
+            while not self.stop.is_set():
+                if self.inp is None:
+                    item = self.step(None)
+                else:
+                    item = self.inp.get(timeout=0.2)
+                    if item is None:
+                        continue
+                    if item is CLOSED:
+                        break
+                    if self.batch:
+                        for result in self.step([item] + self.inp.drain()):
+                            self.out.put(result)
+                        continue
+                    item = self.step(item)
+                if item is CLOSED:
+                    break
+                if item is not None:
+                    self.out.put(item)
+        except BaseException as e:
+            logger.exception("Face pipeline stage %s failed", self.name)
+            self.error = e
+        finally:
+            self.out.close()
+
+
+def recognize_stream(
+    recognizer: Recognizer,
+    source: FrameSource,
+    tracker: Optional[FaceTracker] = None,
+    gate: Optional[MotionGate] = None,
+    pacer: Optional[FramePacer] = None,
+    timeout_s: Optional[float] = None,
+    stop: Optional[threading.Event] = None,
+    queue_size: int = config.PIPELINE_QUEUE_SIZE,
+) -> Iterator[Tuple[np.ndarray, List[Dict]]]:
+    """Yield ``(frame, results)`` for frames of ``source`` as the stages finish them.
+
+    ``results`` are those of ``Recognizer.recognize_frame``. With a ``gate``,
+    static frames without faces in view skip detection and yield ``[]``; a
+    ``pacer`` sets the capture rate. The stream ends when the source runs dry,
+    ``timeout_s`` passes, ``stop`` is set or the caller stops iterating. The
+    frame is the source's shared, read-only array.
+    """
+    halt = threading.Event()
+    lossless = getattr(source, "realtime", True) is False
+    frames, plans, results = (DropOldestQueue(queue_size, lossless) for _ in range(3))
+    cursor = source.cursor()
+    faces_in_view = [False]
+
+    def capture(_):
+        if pacer is not None:
+            pacer.wait(halt)
+        with metrics.timer("frame_read"):
+            ok, frame = cursor.read(timeout=0.5)
+        if ok:
+            return frame
+        return None if source.is_opened() else CLOSED
+
+    def detect(frame):
+        # skip the detector on a static, empty scene; keep running while faces are in view
+        if gate is not None and not gate.has_motion(frame) and not faces_in_view[0]:
+            metrics.incr("frames_skipped")
+            return frame, None
+        if pacer is not None:
+            pacer.mark_activity()
+        plan = recognizer.plan(frame, tracker)
+        faces_in_view[0] = plan.faces > 0
+        return frame, plan
+
+    def recognize(items):
+        # plans that queued up while ArcFace was busy are embedded together in one batch
+        planned = [(frame, plan) for frame, plan in items if plan is not None]
+        done = iter(recognizer.complete_frames(planned, tracker) if planned else ())
+        return [(frame, [] if plan is None else next(done)) for frame, plan in items]
+
+    stages = [
+        _Stage("face-capture", capture, None, frames, halt),
+        _Stage("face-detect", detect, frames, plans, halt),
+        _Stage("face-recognize", recognize, plans, results, halt, batch=True),
+    ]
+    for stage in stages:
+        stage.start()
+    deadline = None if timeout_s is None else time.monotonic() + timeout_s
+    try:
+        while stop is None or not stop.is_set():
+            wait = 0.2
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    return
+            item = results.get(timeout=wait)
+            if item is None:
+                continue
+            if item is CLOSED:
+                for stage in stages:
+                    if stage.error is not None:
+                        raise stage.error
+                return
+            yield item
+    finally:
+        halt.set()
+        for queue in (frames, plans, results):
+            queue.close()
+        for stage in stages:
+            stage.join(timeout=2)
+        metrics.incr("frames_dropped", frames.dropped + plans.dropped + results.dropped)
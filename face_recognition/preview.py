@@ -0,0 +1,235 @@
+"""
+Debug preview for the face loops.
+
+``Preview`` replaces the per-frame ``cv2.imshow``/``cv2.waitKey`` calls. With a
+desktop it shows annotated frames in a window as before. In headless mode
+(``VR_HEADLESS=1``) it does no GUI work and no frame copies at all, unless
+``VR_MJPEG_PORT`` is set: then a small local HTTP server streams annotated
+frames as MJPEG to technicians at ``MJPEG_FPS``, and frames are only copied,
+drawn and encoded when a viewer is connected and the next one is due.
+
+    http://127.0.0.1:<VR_MJPEG_PORT>/          latest frame as an MJPEG stream
+    http://127.0.0.1:<VR_MJPEG_PORT>/snapshot.jpg   latest frame as a JPEG
+
+Each LiveKit job process streams its own frames on the first free port from
+``VR_MJPEG_PORT`` upward and logs the URL it got.
+"""
+
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from . import config
+from .recognize_wrapper import draw_detections
+
+
+logger = logging.getLogger(__name__)
+
+_BOUNDARY = "clara-frame"
+
+
+class MjpegServer:
+    """Serves the most recently published JPEG to any number of HTTP clients."""
+
+    def __init__(self, host: str = config.MJPEG_HOST, port: int = config.MJPEG_PORT, fps: float = config.MJPEG_FPS):
+        self.host = host
+        self.port = port
+        self.interval = 1.0 / max(fps, 0.1)
+        self.clients = 0
+        self._jpeg: Optional[bytes] = None
+        self._seq = 0
+        self._last_publish = 0.0
+        self._cond = threading.Condition()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def start(self) -> "MjpegServer":
+        if self._server is not None:
+            return self
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, fmt, *args):
+                logger.debug("MJPEG %s: " + fmt, self.address_string(), *args)
+
+            def do_GET(self):
+                if self.path.startswith("/snapshot.jpg"):
+                    jpeg = server.latest()
+                    if jpeg is None:
+                        self.send_error(503, "No frame yet")
+                        return
+                    self.send_response(200)
+                    self.send_header("Content-Type", "image/jpeg")
+                    self.send_header("Content-Length", str(len(jpeg)))
+                    self.end_headers()
+                    self.wfile.write(jpeg)
+                    return
+                if self.path not in ("/", "/stream.mjpg"):
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={_BOUNDARY}")
+                self.end_headers()
+                server._stream(self.wfile)
+
+        attempts = max(1, config.DEBUG_PORT_ATTEMPTS) if self.port else 1
+        for port in range(self.port, self.port + attempts):
+            try:
+                self._server = ThreadingHTTPServer((self.host, port), Handler)
+                break
+            except OSError:
+                # taken by another job process of this worker
+                if port == self.port + attempts - 1:
+                    raise
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="mjpeg-server", daemon=True).start()
+        logger.info("MJPEG debug stream of process %d on http://%s:%d/", os.getpid(), self.host, self.port)
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        with self._cond:
+            self._cond.notify_all()
+
+    def wants_frame(self) -> bool:
+        """True when a client is watching and the throttle interval has passed."""
+        return self.clients > 0 and time.monotonic() - self._last_publish >= self.interval
+
+    def publish(self, frame: np.ndarray):
+        ok, buf = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), config.MJPEG_QUALITY])
+        if not ok:
+            return
+        with self._cond:
+            self._jpeg = buf.tobytes()
+            self._seq += 1
+            self._last_publish = time.monotonic()
+            self._cond.notify_all()
+
+    def latest(self) -> Optional[bytes]:
+        with self._cond:
+            return self._jpeg
+
+    def _stream(self, wfile):
+        with self._cond:
+            self.clients += 1
+            seen = -1
+        try:
+            while self._server is not None:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._seq != seen or self._server is None, timeout=5.0)
+                    jpeg, seen = self._jpeg, self._seq
+                if jpeg is None:
+                    continue
+                wfile.write(
+                    f"--{_BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n".encode()
+                    + jpeg + b"\r\n"
+                )
+                wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with self._cond:
+                self.clients -= 1
+
+
+_server: Optional[MjpegServer] = None
+_server_lock = threading.Lock()
+
+
+def get_mjpeg_server() -> Optional[MjpegServer]:
+    """The process-wide MJPEG server, started on first use; None when ``VR_MJPEG_PORT`` is unset."""
+    global _server
+    if not config.MJPEG_PORT:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = MjpegServer().start()
+            except OSError as e:
+                logger.warning(
+                    "MJPEG debug stream could not start on ports %s-%s: %s",
+                    config.MJPEG_PORT, config.MJPEG_PORT + config.DEBUG_PORT_ATTEMPTS - 1, e,
+                )
+                return None
+        return _server
+
+
+class Preview:
+    """Window or MJPEG output for one face loop; every method is a no-op when nobody can see the result."""
+
+    def __init__(self, window_name: str, size: Optional[Tuple[int, int]] = None, headless: Optional[bool] = None):
+        self.window_name = window_name
+        self.headless = config.HEADLESS if headless is None else headless
+        self.stream = get_mjpeg_server()
+        self._window = False
+        if not self.headless:
+            try:
+                cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
+                if size:
+                    cv2.resizeWindow(window_name, *size)
+                self._window = True
+            except Exception:
+                pass
+
+    @property
+    def active(self) -> bool:
+        """Whether the next ``show`` would draw anything."""
+        return not self.headless or (self.stream is not None and self.stream.wants_frame())
+
+    def show(
+        self,
+        frame: np.ndarray,
+        detections: Sequence[Dict] = (),
+        text: str = "",
+        color: Tuple[int, int, int] = (0, 255, 255),
+        scale: float = 0.7,
+        delay_ms: int = 1,
+    ) -> bool:
+        """Annotate and display ``frame``; returns False when the user pressed 'q' in the window.
+
+        Without a window a ``delay_ms`` above 1 is still waited out, so loops that pause
+        between hints keep their pace headless.
+        """
+        if not self.active:
+            self._pause(delay_ms)
+            return True
+        out = frame.copy()
+        if detections:
+            draw_detections(out, list(detections))
+        if text:
+            cv2.putText(out, text, (20, 40), cv2.FONT_HERSHEY_SIMPLEX, scale, color, 2, cv2.LINE_AA)
+        if self.stream is not None and self.stream.wants_frame():
+            self.stream.publish(out)
+        if self.headless:
+            self._pause(delay_ms)
+            return True
+        try:
+            cv2.imshow(self.window_name, out)
+            return (cv2.waitKey(delay_ms) & 0xFF) != ord("q")
+        except Exception:
+            self._pause(delay_ms)
+            return True
+
+    @staticmethod
+    def _pause(delay_ms: int):
+        # waitKey(1) only pumps the GUI; longer delays are deliberate pauses
+        if delay_ms > 1:
+            time.sleep(delay_ms / 1000.0)
+
+    def close(self):
+        if self._window:
+            try:
+                cv2.destroyWindow(self.window_name)
+            except Exception:
+                pass
+            self._window = False
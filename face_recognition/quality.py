@@ -0,0 +1,102 @@
+"""
+Face crop quality scoring.
+
+Runs between detection and recognition: each detected face is scored for
+sharpness (variance of the Laplacian), brightness, size relative to the frame
+and head pose (from the five detector keypoints). Unusable crops skip the
+ArcFace call entirely, and enrollment uses the same score to keep its best
+frames.
+"""
+
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from . import config
+
+
+@dataclass
+class QualityScore:
+    sharpness: float
+    brightness: float
+    face_ratio: float
+    yaw: float
+    pitch: float
+    score: float
+    reason: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return not self.reason
+
+
+def _pose(kps: Optional[np.ndarray]) -> Tuple[float, float]:
+    """Yaw and pitch proxies from (left eye, right eye, nose, left mouth, right mouth); 0 is frontal."""
+    if kps is None or len(kps) < 5:
+        return 0.0, 0.0
+    kps = np.asarray(kps, dtype=np.float32)
+    eye_mid = (kps[0] + kps[1]) / 2.0
+    mouth_mid = (kps[3] + kps[4]) / 2.0
+    eye_dist = max(float(np.linalg.norm(kps[1] - kps[0])), 1e-6)
+    # nose offset from the eye midline, in inter-eye distances
+    yaw = float(kps[2][0] - eye_mid[0]) / eye_dist
+    face_h = max(float(mouth_mid[1] - eye_mid[1]), 1e-6)
+    # the nose sits about halfway between eyes and mouth on a level head
+    pitch = float(kps[2][1] - eye_mid[1]) / face_h - 0.5
+    return yaw, pitch
+
+
+def assess(frame: np.ndarray, bbox: Sequence[float], kps: Optional[np.ndarray] = None) -> QualityScore:
+    """Score one detected face in ``frame``; ``reason`` names the first failed check, empty when usable."""
+    h, w = frame.shape[:2]
+    x1, y1, x2, y2 = [int(round(v)) for v in bbox[:4]]
+    x1, y1 = max(0, x1), max(0, y1)
+    x2, y2 = min(w, x2), min(h, y2)
+    if x2 - x1 < 2 or y2 - y1 < 2:
+        return QualityScore(0.0, 0.0, 0.0, 0.0, 0.0, 0.0, "face outside frame")
+
+    crop = frame[y1:y2, x1:x2]
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    # measure at the recognizer's input scale so large and small faces are comparable
+    gray = cv2.resize(gray, (112, 112), interpolation=cv2.INTER_AREA)
+    sharpness = float(cv2.Laplacian(gray, cv2.CV_64F).var())
+    brightness = float(gray.mean())
+    face_ratio = max((x2 - x1) / float(w), (y2 - y1) / float(h))
+    yaw, pitch = _pose(kps)
+
+    if face_ratio < config.MIN_FACE_RATIO:
+        reason = "face too small"
+    elif brightness < config.BRIGHTNESS_MIN:
+        reason = "too dark"
+    elif brightness > config.BRIGHTNESS_MAX:
+        reason = "too bright"
+    elif sharpness < config.VAR_LAPLACIAN_MIN:
+        reason = "too blurry"
+    elif abs(yaw) > config.POSE_MAX_YAW or abs(pitch) > config.POSE_MAX_PITCH:
+        reason = "not facing the camera"
+    else:
+        reason = ""
+
+    # each term saturates at 1 once comfortably past its threshold
+    mid = (config.BRIGHTNESS_MIN + config.BRIGHTNESS_MAX) / 2.0
+    half = (config.BRIGHTNESS_MAX - config.BRIGHTNESS_MIN) / 2.0
+    score = (
+        min(1.0, sharpness / (2.0 * config.VAR_LAPLACIAN_MIN))
+        * max(0.0, 1.0 - (abs(brightness - mid) / half) ** 2 / 2.0)
+        * min(1.0, face_ratio / (3.0 * config.MIN_FACE_RATIO))
+        * max(0.0, 1.0 - abs(yaw) / (2.0 * config.POSE_MAX_YAW))
+        * max(0.0, 1.0 - abs(pitch) / (2.0 * config.POSE_MAX_PITCH))
+    )
+    return QualityScore(sharpness, brightness, face_ratio, yaw, pitch, float(score), reason)
+
+
+def best_face(frame: np.ndarray, faces) -> Tuple[Optional[object], Optional[QualityScore]]:
+    """The highest-quality face among insightface ``faces`` (objects with ``bbox`` and ``kps``)."""
+    best, best_quality = None, None
+    for face in faces:
+        quality = assess(frame, face.bbox, getattr(face, "kps", None))
+        if best_quality is None or (quality.ok, quality.score) > (best_quality.ok, best_quality.score):
+            best, best_quality = face, quality
+    return best, best_quality
@@ -0,0 +1,120 @@
+"""
+Compact gallery matrices for small edge boxes.
+
+``QuantizedMatrix`` holds the gallery as int8 with a float32 scale per row
+(``row ~= scale * int8_row``), a quarter of the float32 footprint, or as one
+float16 buffer, a half. It saves resident memory, not time: NumPy has no
+int8 or float16 matrix kernels, so blocks of ``block`` rows are widened to
+float32 for BLAS. int8 then scores at about float32 speed; float16 is two to
+three times slower, because widening it is slow, and is not recommended.
+An integer int8 x int8 -> int32 product was measured too and is slower still.
+
+The gallery rescores its best candidates against the exact float32 rows.
+That matrix stays on disk and memory-mapped, and only the candidates' pages
+are read. So the saving is in resident memory; the store keeps both copies.
+"""
+
+import logging
+import os
+import threading
+from typing import Optional
+
+import numpy as np
+
+from . import config
+
+
+logger = logging.getLogger(__name__)
+
+PRECISIONS = ("float32", "float16", "int8")
+
+
+class QuantizedMatrix:
+    """float16 or per-row-scaled int8 copy of an (n, d) normalized matrix."""
+
+    def __init__(self, data: np.ndarray, scales: Optional[np.ndarray] = None, block: int = 512):
+        self.data = data
+        self.scales = scales
+        self.block = block
+
+    @property
+    def precision(self) -> str:
+        return "int8" if self.scales is not None else "float16"
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.data.nbytes + (self.scales.nbytes if self.scales is not None else 0))
+
+    @classmethod
+    def quantize(cls, matrix: np.ndarray, precision: str) -> "QuantizedMatrix":
+        if precision == "float16":
+            return cls(np.asarray(matrix, dtype=np.float16))
+        if precision == "int8":
+            matrix = np.asarray(matrix, dtype=np.float32)
+            scales = np.abs(matrix).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            data = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+            return cls(data, scales.astype(np.float32))
+        raise ValueError(f"Unknown gallery precision: {precision}")
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        """Approximate (q, n) inner products of float32 ``queries`` with every row."""
+        n = self.data.shape[0]
+        out = np.empty((queries.shape[0], n), dtype=np.float32)
+        for start in range(0, n, self.block):
+            end = min(start + self.block, n)
+            # BLAS has no float16/int8 kernels; widen one cache-sized block at a time
+            # (an int8 x int8 -> int32 matmul in NumPy is 2-4x slower than this)
+            out[:, start:end] = queries @ self.data[start:end].astype(np.float32).T
+        if self.scales is not None:
+            out *= self.scales
+        return out
+
+    def file_names(self, generation: int):
+        base = f"quantized-{generation}-{self.precision}"
+        return f"{base}.npy", f"{base}-scales.npy"
+
+    def save(self, store_dir: str, generation: int):
+        names = self.file_names(generation)
+        arrays = [self.data] + ([self.scales] if self.scales is not None else [])
+        # scales first: load() takes the data file's presence to mean the copy is complete
+        for name, array in reversed(list(zip(names, arrays))):
+            path = os.path.join(store_dir, name)
+            tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+            with open(tmp, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, store_dir: str, generation: int, precision: str) -> Optional["QuantizedMatrix"]:
+        base = os.path.join(store_dir, f"quantized-{generation}-{precision}")
+        if not os.path.exists(f"{base}.npy"):
+            return None
+        data = np.load(f"{base}.npy", mmap_mode="r")
+        scales = np.load(f"{base}-scales.npy") if precision == "int8" else None
+        return cls(data, scales)
+
+
+def load_or_quantize(
+    store_dir: str, generation: int, matrix: np.ndarray, precision: Optional[str] = None, build: bool = True
+) -> Optional[QuantizedMatrix]:
+    """Compact copy of one store generation, loaded if persisted, else built and saved; None for float32.
+
+    As with ``load_or_build``, building belongs under the store's writer lock;
+    with ``build=False`` a missing copy raises ``FileNotFoundError``.
+    """
+    precision = precision or config.GALLERY_PRECISION
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown gallery precision: {precision}")
+    if precision == "float32" or matrix.shape[0] == 0:
+        return None
+    quantized = QuantizedMatrix.load(store_dir, generation, precision)
+    if quantized is None and not build:
+        raise FileNotFoundError(f"quantized-{generation}-{precision}")
+    if quantized is None:
+        quantized = QuantizedMatrix.quantize(matrix, precision)
+        try:
+            quantized.save(store_dir, generation)
+        except OSError as e:
+            logger.warning("Could not persist %s gallery for %s: %s", precision, store_dir, e)
+    return quantized
@@ -6,9 +6,11 @@ import os
 # sys.path.append(anti_spoof_src)
 
 import cv2
-import pickle
 import numpy as np
-import insightface
+
+from .embedding_store import open_store
+from .frame_source import open_source
+from .models import get_face_analysis
 
 # from Silent_Face_Anti_Spoofing_master.src.anti_spoof_predict import AntiSpoofPredict
 # from Silent_Face_Anti_Spoofing_master.src.generate_patches import CropImage
@@ -21,30 +23,15 @@ FRAME_SKIP = 1
 # ANTI_SPOOF_SKIP = 2
 THRESHOLD =  0.65 #0.5  # Recognition threshold
 
-def cosine_similarity(a, b):
-    return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
-
 def load_embeddings(path):
-    with open(path, "rb") as f:
-        embeddings_dict = pickle.load(f)
-    
-    # Normalize all embeddings
-    for k, v in embeddings_dict.items():
-        v = np.array(v).flatten() # Ensure it's a 2D array
-        embeddings_dict[k] = v / np.linalg.norm(v)
-    return embeddings_dict
-
-def recognize_face(face_embedding, embeddings_dict, threshold=THRESHOLD):
-    best_score = -1
-    best_name = "Unknown"
-    for name, db_emb in embeddings_dict.items():
-        # db_emb = np.array(db_emb).flatten()
-        score = cosine_similarity(face_embedding, db_emb)
-
-        if score > best_score:
-            best_score = score
-            best_name = name
-
+    # Memory-mapped gallery; a legacy pickle is migrated to a store on first use
+    return open_store(path).load()
+
+def recognize_face(face_embedding, gallery, threshold=THRESHOLD):
+    matches = gallery.match(face_embedding[None, :], k=1)[0]
+    if not matches:
+        return "Unknown", -1.0
+    best_name, best_score = matches[0]
     if best_score >= threshold:
         return best_name, best_score
     else:
@@ -52,17 +39,16 @@ def recognize_face(face_embedding, embeddings_dict, threshold=THRESHOLD):
 
 def main():
     embeddings_dict = load_embeddings(EMBEDDINGS_FILE)
-    model = insightface.app.FaceAnalysis(name="buffalo_l",providers=['CPUExecutionProvider'])
-    model.prepare(ctx_id=0, det_size=(640, 640))
+    model = get_face_analysis()
 
     # Anti-spoofing setup (disabled)
     # anti_spoof = AntiSpoofPredict(0)
     # cropper = CropImage()
     # h_input, w_input, _, scale = parse_model_name(os.path.basename(ANTI_SPOOF_MODEL_PATH))
 
-    cap = cv2.VideoCapture(0)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+    # optional argument: a video file, image folder or "synthetic" instead of the camera
+    source = open_source(sys.argv[1] if len(sys.argv) > 1 else None)
+    cap = source.cursor()
     print("Press 'q' to quit.")
 
     frame_count = 0
@@ -72,6 +58,8 @@ def main():
         ret, frame = cap.read()
         if not ret:
             break
+        # source frames are shared and read-only; boxes are drawn on a copy
+        frame = frame.copy()
 
         frame_count += 1
         # Skip some frames to reduce processing
@@ -127,7 +115,7 @@ def main():
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break 
 
-    cap.release()
+    source.stop()
     cv2.destroyAllWindows()
 
 if __name__ == "__main__":
@@ -1,70 +1,353 @@
+import logging
 import os
-import pickle
-from typing import List, Dict, Tuple
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Tuple
 
 import cv2
 import numpy as np
-import insightface
+
+from . import config, metrics
+from .embedding_store import open_store
+from .gallery import GalleryBase, stack_embeddings
+from .gallery_watcher import get_watcher
+from .models import DETECTOR_MODULES, detection_pack, get_face_analysis
+from .quality import QualityScore, assess
+from .tracker import FaceTracker, iou_matrix, subject_scores
+
+try:
+    from insightface.utils import face_align
+except Exception:
+    face_align = None
+
+
+logger = logging.getLogger(__name__)
+
+# Galleries shared by every Recognizer in the process, reloaded when the store changes
+_gallery_cache: Dict[str, Tuple[tuple, GalleryBase]] = {}
+_gallery_lock = threading.Lock()
+
+
+def load_gallery(path: str) -> GalleryBase:
+    """Open the embedding store for ``path`` as a memory-mapped Gallery, reusing the cached copy if unchanged."""
+    store = open_store(path)
+    stamp = store.stamp()
+    key = os.path.abspath(store.path)
+    with _gallery_lock:
+        cached = _gallery_cache.get(key)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        gallery = store.load()
+        _gallery_cache[key] = (stamp, gallery)
+        return gallery
+
+
+@dataclass
+class Detection:
+    """A detected face; ``quality`` and ``embedding`` are filled in by later stages."""
+    bbox: np.ndarray
+    kps: Optional[np.ndarray]
+    det_score: float
+    embedding: Optional[np.ndarray] = None
+    quality: Optional[QualityScore] = None
+
+
+@dataclass
+class FramePlan:
+    """Output of the detection stage: the faces ``complete`` should embed for one frame."""
+    to_embed: List[Detection]
+    background: List[Dict] = field(default_factory=list)
+    # tracker mode: (track, bbox at this frame) for every track, and the track of each face in to_embed
+    tracks: Optional[List[Tuple[object, np.ndarray]]] = None
+    embed_tracks: List[object] = field(default_factory=list)
+    primary_id: Optional[int] = None
+    now: float = 0.0
+    # faces the detector found, embedded or not
+    faces: int = 0
 
 
 class Recognizer:
-    def __init__(self, embeddings_path: str, threshold: float = 0.65):
+    def __init__(
+        self,
+        embeddings_path: str,
+        threshold: float = 0.65,
+        top_k: int = 3,
+        hot_reload: bool = True,
+        quality_gate: Optional[bool] = None,
+        mode: Optional[str] = None,
+    ):
         self.embeddings_path = embeddings_path
         self.threshold = float(os.getenv("VR_FACE_THRESHOLD", threshold))
-        self._embeddings = self._load_embeddings(embeddings_path)
-        self._face = insightface.app.FaceAnalysis(name="buffalo_l", providers=['CPUExecutionProvider'])
-        self._face.prepare(ctx_id=0, det_size=(640, 640))
-
-    def _cosine_similarity(self, a: np.ndarray, b: np.ndarray) -> float:
-        return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
-
-    def _load_embeddings(self, path: str) -> Dict[str, np.ndarray]:
-        with open(path, "rb") as f:
-            data = pickle.load(f)
-        normalized = {}
-        for key, vec in data.items():
-            arr = np.array(vec).flatten().astype(np.float32)
-            norm = np.linalg.norm(arr)
-            if norm == 0:
+        self.top_k = max(1, int(top_k))
+        self.quality_gate = config.QUALITY_GATE if quality_gate is None else quality_gate
+        # "primary": recognize only the main subject; "all": every detected face
+        self.mode = (mode or config.FACE_MODE).lower()
+        if self.mode not in ("primary", "all"):
+            raise ValueError(f"Unknown face recognition mode: {self.mode}")
+        self._gallery = self._load_embeddings(embeddings_path)
+        # cheap detector on every frame; the recognition pack only sees crops about to be embedded
+        self._face = get_face_analysis()
+        self._detector = get_face_analysis(detection_pack(), det_size=config.DETECT_SIZE, modules=DETECTOR_MODULES)
+        # cleared when the recognition model turns out to accept only one crop per run
+        self._batched = True
+        if hot_reload:
+            # new enrollments are swapped in by the watcher thread without touching the model
+            get_watcher(embeddings_path).subscribe(self._swap_gallery)
+
+    @property
+    def gallery(self) -> GalleryBase:
+        return self._gallery
+
+    def _load_embeddings(self, path: str) -> GalleryBase:
+        return load_gallery(path)
+
+    def _swap_gallery(self, gallery: GalleryBase):
+        # a single reference assignment; frames in flight finish on the snapshot they started with
+        self._gallery = gallery
+
+    @property
+    def tiered(self) -> bool:
+        return self._detector is not self._face
+
+    def detect(self, frame) -> List[Detection]:
+        """Run only the detection tier's face detector."""
+        bboxes, kpss = self._detector.det_model.detect(frame, max_num=0, metric="default")
+        return [
+            Detection(bbox=bboxes[i, 0:4], kps=None if kpss is None else kpss[i], det_score=float(bboxes[i, 4]))
+            for i in range(bboxes.shape[0])
+        ]
+
+    def usable(self, frame, detections: List[Detection]) -> List[Detection]:
+        """Score each detection's crop quality and keep those worth embedding."""
+        if not self.quality_gate:
+            return list(detections)
+        usable = []
+        for det in detections:
+            det.quality = q = assess(frame, det.bbox, det.kps)
+            if q.ok:
+                usable.append(det)
                 continue
-            normalized[key] = arr / norm
-        return normalized
+            metrics.incr("faces_gated")
+            logger.debug(
+                "Face not embedded, %s: sharpness=%.0f brightness=%.0f face_ratio=%.3f yaw=%.2f pitch=%.2f",
+                q.reason, q.sharpness, q.brightness, q.face_ratio, q.yaw, q.pitch,
+            )
+        return usable
 
-    def recognize_frame(self, frame) -> List[Dict]:
-        results: List[Dict] = []
-        faces = self._face.get(frame)
-        for face in faces:
-            bbox = face.bbox.astype(int)
-            emb = face.embedding.astype(np.float32).flatten()
-            norm = np.linalg.norm(emb)
-            if norm == 0:
+    def confirm(self, frame, detections: List[Detection]) -> List[Detection]:
+        """Re-detect each face with the recognition pack's detector on a padded crop.
+
+        Detections it does not find are dropped as false positives of the light
+        detector; the rest take its bbox and keypoints, which ArcFace alignment
+        depends on. A no-op when both tiers are the same model.
+        """
+        if not self.tiered:
+            return list(detections)
+        h, w = frame.shape[:2]
+        confirmed = []
+        for det in detections:
+            x1, y1, x2, y2 = [float(v) for v in det.bbox[:4]]
+            pad = config.CONFIRM_PAD * max(x2 - x1, y2 - y1)
+            cx1, cy1 = int(max(0, x1 - pad)), int(max(0, y1 - pad))
+            cx2, cy2 = int(min(w, x2 + pad)), int(min(h, y2 + pad))
+            if cx2 - cx1 < 2 or cy2 - cy1 < 2:
                 continue
-            emb = emb / norm
-
-            best_id = "Unknown"
-            best_score = -1.0
-            for label, db_emb in self._embeddings.items():
-                score = self._cosine_similarity(emb, db_emb)
-                if score > best_score:
-                    best_score = score
-                    best_id = label
-
-            emp_id = best_id if best_score >= self.threshold else "Unknown"
-            results.append({
-                "emp_id": emp_id,
-                "bbox": (int(bbox[0]), int(bbox[1]), int(bbox[2]-bbox[0]), int(bbox[3]-bbox[1])),
-                "conf": float(best_score),
-            })
+            bboxes, kpss = self._face.det_model.detect(
+                frame[cy1:cy2, cx1:cx2], input_size=config.CONFIRM_DET_SIZE, max_num=0, metric="default"
+            )
+            if bboxes.shape[0] == 0:
+                continue
+            offset = np.array([cx1, cy1], dtype=np.float32)
+            boxes = bboxes[:, :4] + np.tile(offset, 2)
+            overlap = iou_matrix(np.asarray(det.bbox[:4])[None], boxes)[0]
+            best = int(np.argmax(overlap))
+            if overlap[best] < config.CONFIRM_MIN_IOU:
+                continue
+            det.bbox = boxes[best]
+            det.det_score = float(bboxes[best, 4])
+            if kpss is not None:
+                det.kps = kpss[best] + offset
+            confirmed.append(det)
+        return confirmed
+
+    def embed(self, frame, detections: List[Detection]) -> np.ndarray:
+        """Compute normalized ArcFace embeddings for the given detections as an (n, d) matrix."""
+        return self.embed_frames([(frame, detections)])
+
+    def embed_frames(self, items: List[Tuple[np.ndarray, List[Detection]]]) -> np.ndarray:
+        """Embed the detections of one or more ``(frame, detections)`` pairs, in order, as one ArcFace batch.
+
+        Every face is aligned first and the crops go through the ONNX session
+        together, so a group at the desk costs about one forward pass. Models
+        with a fixed batch size of one are run crop by crop.
+        """
+        rec_model = self._face.models["recognition"]
+        detections = [det for _, dets in items for det in dets]
+        if not detections:
+            return np.zeros((0, 0), dtype=np.float32)
+        if face_align is None or not hasattr(rec_model, "get_feat"):
+            for frame, dets in items:
+                for det in dets:
+                    rec_model.get(frame, det)
+            return stack_embeddings(det.embedding for det in detections)
+        size = rec_model.input_size[0]
+        crops = [face_align.norm_crop(frame, landmark=det.kps, image_size=size) for frame, dets in items for det in dets]
+        feats = self._run_batches(rec_model, crops)
+        for det, feat in zip(detections, feats):
+            det.embedding = feat
+        return stack_embeddings(feats)
+
+    def _run_batches(self, rec_model, crops: List[np.ndarray]) -> np.ndarray:
+        batch = rec_model.input_shape[0] if isinstance(rec_model.input_shape[0], int) else config.REC_BATCH_SIZE
+        if not self._batched or batch <= 1:
+            return np.concatenate([rec_model.get_feat(crop) for crop in crops])
+        try:
+            return np.concatenate([rec_model.get_feat(crops[i:i + batch]) for i in range(0, len(crops), batch)])
+        except Exception as e:
+            logger.warning("Recognition model rejected a batch of %d crops, embedding one at a time: %s", len(crops), e)
+            self._batched = False
+            return np.concatenate([rec_model.get_feat(crop) for crop in crops])
+
+    def _result(self, bbox, candidates, primary: bool = True) -> Dict:
+        best_id, best_score = candidates[0] if candidates else ("Unknown", -1.0)
+        emp_id = best_id if best_score >= self.threshold else "Unknown"
+        bbox = np.asarray(bbox).astype(int)
+        return {
+            "emp_id": emp_id,
+            "bbox": (int(bbox[0]), int(bbox[1]), int(bbox[2]-bbox[0]), int(bbox[3]-bbox[1])),
+            "conf": float(best_score),
+            "candidates": candidates,
+            "primary": primary,
+        }
+
+    def recognize_frame(self, frame, tracker: Optional[FaceTracker] = None) -> List[Dict]:
+        """Detect, embed and match faces in ``frame``.
+
+        In "primary" mode only the largest, most central face is embedded; the
+        others are returned as boxes with ``primary`` False and no candidates.
+        Faces failing the quality gate or not confirmed by the recognition tier
+        are not embedded. With a ``tracker``, only
+        tracks that are new, have moved or whose identity has expired are
+        embedded; the rest reuse the identity cached on the track.
+        """
+        return self.complete(frame, self.plan(frame, tracker), tracker)
+
+    def plan(self, frame, tracker: Optional[FaceTracker] = None) -> FramePlan:
+        """Detection stage: detect, track and quality-gate, and decide which faces to embed."""
+        with metrics.timer("detect"):
+            detections = self.detect(frame)
+        metrics.incr("frames_processed")
+        metrics.incr("faces_detected", len(detections))
+        if tracker is None:
+            if not detections:
+                return FramePlan([])
+            others: List[Detection] = []
+            if self.mode == "primary" and len(detections) > 1:
+                best = int(np.argmax(subject_scores(np.stack([d.bbox for d in detections]), frame.shape)))
+                others = [d for i, d in enumerate(detections) if i != best]
+                detections = [detections[best]]
+            background = [self._result(d.bbox, [], primary=False) for d in others]
+            with metrics.timer("quality"):
+                usable = self.usable(frame, detections)
+            return FramePlan(usable, background, faces=len(others) + len(detections))
+
+        now = time.time()
+        with tracker.lock:
+            if not detections:
+                tracker.update(np.zeros((0, 4)))
+                return FramePlan([], tracks=[], now=now)
+            tracks = tracker.update(np.stack([d.bbox for d in detections]))
+            stale = [i for i, t in enumerate(tracks) if tracker.needs_embedding(t, now)]
+            if self.mode == "primary":
+                # background faces stay cheap tracked boxes; only the primary subject is embedded
+                primary = tracker.select_primary(tracks, frame.shape)
+                stale = [i for i in stale if tracks[i] is primary]
+            # boxes as of this frame; the detection stage may move the tracks on before complete() runs
+            snapshot = [(t, t.bbox) for t in tracks]
+            primary_id = tracker.primary_id
+        # a blurry, turned or unconfirmed face stays stale and is retried on a later frame
+        with metrics.timer("quality"):
+            usable = {id(d) for d in self.usable(frame, [detections[i] for i in stale])}
+        stale = [i for i in stale if id(detections[i]) in usable]
+        return FramePlan(
+            [detections[i] for i in stale],
+            tracks=snapshot,
+            embed_tracks=[tracks[i] for i in stale],
+            primary_id=primary_id,
+            now=now,
+            faces=len(detections),
+        )
+
+    def complete(self, frame, plan: FramePlan, tracker: Optional[FaceTracker] = None) -> List[Dict]:
+        """Recognition stage: confirm, embed and match the planned faces and build the results."""
+        return self.complete_frames([(frame, plan)], tracker)[0]
+
+    def complete_frames(
+        self, items: List[Tuple[np.ndarray, FramePlan]], tracker: Optional[FaceTracker] = None
+    ) -> List[List[Dict]]:
+        """``complete`` for several frames, in order, with one ArcFace batch and one gallery search for all of them."""
+        gallery = self._gallery
+        with metrics.timer("confirm"):
+            confirmed = [self.confirm(frame, plan.to_embed) for frame, plan in items]
+        with metrics.timer("embed"):
+            embs = self.embed_frames([(frame, dets) for (frame, _), dets in zip(items, confirmed)])
+        metrics.incr("faces_embedded", len(embs))
+        valid = np.flatnonzero(np.linalg.norm(embs, axis=1) > 0) if len(embs) else np.zeros(0, dtype=int)
+        matches: List[Optional[List]] = [None] * len(embs)
+        if len(valid):
+            with metrics.timer("match"):
+                found = gallery.match(embs[valid], k=self.top_k)
+            for row, candidates in zip(valid, found):
+                matches[row] = candidates
+        results, start = [], 0
+        for (_, plan), dets in zip(items, confirmed):
+            rows = matches[start:start + len(dets)]
+            start += len(dets)
+            results.append(self._finish(plan, dets, rows, tracker))
+        return results
+
+    def _finish(self, plan: FramePlan, confirmed: List[Detection], matches: List[Optional[List]], tracker) -> List[Dict]:
+        # matches[i] is None when confirmed[i] produced no usable embedding
+        if plan.tracks is None:
+            return [
+                self._result(det.bbox, candidates) for det, candidates in zip(confirmed, matches) if candidates is not None
+            ] + plan.background
+
+        if confirmed:
+            track_of = {id(d): t for d, t in zip(plan.to_embed, plan.embed_tracks)}
+            with tracker.lock:
+                for det, candidates in zip(confirmed, matches):
+                    if candidates is None:
+                        continue
+                    track = track_of[id(det)]
+                    best = self._result(track.bbox, candidates)
+                    tracker.assign_identity(track, best["emp_id"], best["conf"], candidates, plan.now)
+        results: List[Dict] = []
+        for track, bbox in plan.tracks:
+            is_primary = self.mode == "all" or track.track_id == plan.primary_id
+            if track.embedded_bbox is None:
+                if is_primary:
+                    continue
+                result = self._result(bbox, [], primary=False)
+            else:
+                result = self._result(bbox, track.candidates, primary=is_primary)
+            result["track_id"] = track.track_id
+            # False when the identity is cached from an earlier frame
+            result["fresh"] = track.embedded_at == plan.now
+            results.append(result)
         return results
 
 
 def draw_detections(frame, detections: List[Dict]):
     for det in detections:
         x, y, w, h = det["bbox"]
+        if not det.get("primary", True) and not det.get("candidates"):
+            # background face in primary mode: never recognized, drawn as a thin grey box
+            cv2.rectangle(frame, (x, y), (x+w, y+h), (160, 160, 160), 1)
+            continue
         label = f"{det['emp_id']}" if det["emp_id"] != "Unknown" else "Unknown"
         color = (0, 255, 0) if det["emp_id"] != "Unknown" else (0, 255, 255)
         cv2.rectangle(frame, (x, y), (x+w, y+h), color, 2)
         cv2.putText(frame, label, (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
     return frame
-
-
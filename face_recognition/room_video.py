@@ -0,0 +1,188 @@
+"""
+LiveKit room video as a frame source.
+
+``RoomVideoSource`` subscribes to the kiosk participant's camera track in the
+agent's room and exposes the same ``latest``/``wait_newer``/``cursor`` API as
+the local ``CameraService``, so the face tools run unchanged while the worker
+lives in a data center and the kiosk is a thin client.
+
+Frames are received on the agent's event loop but only converted when a
+consumer reads them, on the consumer's thread and outside the lock the event
+loop takes to publish a frame: the LiveKit buffer is wrapped
+with ``np.frombuffer`` (no copy) and turned into BGR by a single
+``cv2.cvtColor``, straight from I420 when the decoder delivers it. For
+simulcast publications the low layer is requested, which is plenty for the
+detector; anything wider than ``ROOM_VIDEO_MAX_WIDTH`` is downscaled.
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from . import config
+from .frame_source import FrameSource
+
+try:
+    from livekit import rtc
+except Exception:
+    rtc = None
+
+
+logger = logging.getLogger(__name__)
+
+
+def frame_to_bgr(frame, max_width: int = 0) -> np.ndarray:
+    """Convert a ``rtc.VideoFrame`` to an (h, w, 3) uint8 BGR array with one conversion pass."""
+    w, h = frame.width, frame.height
+    if frame.type == rtc.VideoBufferType.I420 and w % 2 == 0 and h % 2 == 0:
+        yuv = np.frombuffer(frame.data, dtype=np.uint8, count=w * h * 3 // 2).reshape(h * 3 // 2, w)
+        bgr = cv2.cvtColor(yuv, cv2.COLOR_YUV2BGR_I420)
+    else:
+        if frame.type != rtc.VideoBufferType.BGRA:
+            frame = frame.convert(rtc.VideoBufferType.BGRA)
+        bgra = np.frombuffer(frame.data, dtype=np.uint8, count=w * h * 4).reshape(h, w, 4)
+        bgr = cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR)
+    if max_width and w > max_width:
+        bgr = cv2.resize(bgr, (max_width, max(1, h * max_width // w)), interpolation=cv2.INTER_AREA)
+    return bgr
+
+
+class RoomVideoSource(FrameSource):
+    """Newest frame of a participant's video track, converted to BGR on demand."""
+
+    def __init__(self, max_width: int = config.ROOM_VIDEO_MAX_WIDTH):
+        self.max_width = max_width
+        self.room = None
+        self.track_sid: Optional[str] = None
+        self._raw = None  # newest rtc.VideoFrame, not yet converted
+        self._frame: Optional[np.ndarray] = None
+        self._frame_seq = 0
+        self._seq = 0
+        self._cond = threading.Condition()
+        # serializes readers' conversions so each frame is converted once; the event loop never takes it
+        self._convert_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stopped = False
+
+    def attach(self, room) -> "RoomVideoSource":
+        """Follow ``room``'s remote camera tracks; call from the agent's event loop."""
+        if rtc is None:
+            raise RuntimeError("livekit is not installed")
+        self.room = room
+        self._stopped = False
+        room.on("track_subscribed", self._on_track_subscribed)
+        room.on("track_unsubscribed", self._on_track_unsubscribed)
+        for participant in room.remote_participants.values():
+            for publication in participant.track_publications.values():
+                if publication.track is not None:
+                    self._on_track_subscribed(publication.track, publication, participant)
+        return self
+
+    def _on_track_subscribed(self, track, publication, participant):
+        if track.kind != rtc.TrackKind.KIND_VIDEO or publication.source == rtc.TrackSource.SOURCE_SCREENSHARE:
+            return
+        if publication.simulcasted:
+            try:
+                publication.set_video_quality(rtc.VideoQuality.VIDEO_QUALITY_LOW)
+            except Exception as e:
+                logger.debug("Could not request the low video layer: %s", e)
+        if self._task is not None:
+            self._task.cancel()
+        self.track_sid = publication.sid
+        logger.info("Face recognition following video track %s of %s", publication.sid, participant.identity)
+        self._task = asyncio.ensure_future(self._consume(track))
+
+    def _on_track_unsubscribed(self, track, publication, participant):
+        if publication.sid == self.track_sid and self._task is not None:
+            self._task.cancel()
+            self._task, self.track_sid = None, None
+
+    async def _consume(self, track):
+        stream = rtc.VideoStream(track)
+        try:
+            async for event in stream:
+                self._on_frame(event.frame)
+        finally:
+            await stream.aclose()
+
+    def _on_frame(self, frame):
+        # only the reference is kept here; conversion happens on the reader's thread
+        with self._cond:
+            self._raw = frame
+            self._seq += 1
+            self._cond.notify_all()
+
+    def _converted(self) -> Tuple[int, Optional[np.ndarray]]:
+        """``(sequence, frame)`` of the newest converted frame; called without ``_cond`` held."""
+        with self._convert_lock:
+            with self._cond:
+                if self._frame_seq == self._seq or self._raw is None:
+                    return self._frame_seq, self._frame
+                raw, seq = self._raw, self._seq
+            # _on_frame runs on the event loop and takes _cond, so the cvtColor/resize happens without it
+            frame = frame_to_bgr(raw, self.max_width)
+            with self._cond:
+                self._frame, self._frame_seq = frame, seq
+                if self._raw is raw:
+                    self._raw = None
+                return seq, frame
+
+    def is_opened(self) -> bool:
+        return self.room is not None and not self._stopped
+
+    def latest(self) -> Tuple[int, Optional[np.ndarray]]:
+        """Return ``(sequence, frame)`` for the newest frame; read-only and shared like the camera's."""
+        return self._converted()
+
+    def wait_newer(self, after_seq: int, timeout: float = 1.0) -> Tuple[int, Optional[np.ndarray]]:
+        """Block until a frame newer than ``after_seq`` arrives; returns ``(after_seq, None)`` on timeout."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > after_seq or self._stopped, timeout=timeout):
+                return after_seq, None
+            if self._seq <= after_seq:
+                return after_seq, None
+        return self._converted()
+
+    def stop(self):
+        self._stopped = True
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self.room is not None:
+            self.room.off("track_subscribed", self._on_track_subscribed)
+            self.room.off("track_unsubscribed", self._on_track_unsubscribed)
+            self.room = None
+        with self._cond:
+            self._cond.notify_all()
+
+
+_room_source: Optional[RoomVideoSource] = None
+_room_lock = threading.Lock()
+
+
+def attach_room(room) -> RoomVideoSource:
+    """Make ``room``'s video the process-wide room frame source, replacing any previous room."""
+    global _room_source
+    with _room_lock:
+        if _room_source is not None:
+            _room_source.stop()
+        _room_source = RoomVideoSource().attach(room)
+        return _room_source
+
+
+def get_room_source() -> Optional[RoomVideoSource]:
+    with _room_lock:
+        return _room_source
+
+
+def detach_room():
+    """Stop following the room; the face tools fall back to the local camera."""
+    global _room_source
+    with _room_lock:
+        if _room_source is not None:
+            _room_source.stop()
+            _room_source = None
@@ -0,0 +1,159 @@
+"""
+Lightweight IoU/centroid face tracker.
+
+Sits between detection and recognition: detections are associated with
+existing tracks frame to frame, and a track is only re-embedded when it is new,
+its box has moved or resized significantly, or its identity is older than the
+refresh interval. Everything else reuses the identity cached on the track.
+"""
+
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from . import config
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between (n, 4) and (m, 4) boxes in ``x1, y1, x2, y2`` form."""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    a = np.asarray(a, dtype=np.float32)[:, None, :]
+    b = np.asarray(b, dtype=np.float32)[None, :, :]
+    iw = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    ih = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = iw * ih
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-6)
+
+
+def _centroid_distance(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise centroid distance normalized by the diagonal of the boxes in ``a``."""
+    ca = np.stack([(a[:, 0] + a[:, 2]) / 2, (a[:, 1] + a[:, 3]) / 2], axis=1)
+    cb = np.stack([(b[:, 0] + b[:, 2]) / 2, (b[:, 1] + b[:, 3]) / 2], axis=1)
+    diag = np.hypot(a[:, 2] - a[:, 0], a[:, 3] - a[:, 1])
+    return np.linalg.norm(ca[:, None, :] - cb[None, :, :], axis=2) / np.maximum(diag, 1e-6)[:, None]
+
+
+def subject_scores(boxes: np.ndarray, frame_shape: Tuple[int, ...], center_weight: float = config.PRIMARY_CENTER_WEIGHT) -> np.ndarray:
+    """How likely each box is the person addressing the camera: bigger and more central scores higher."""
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    h, w = frame_shape[:2]
+    area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1]) / float(w * h)
+    cx = (boxes[:, 0] + boxes[:, 2]) / 2 - w / 2
+    cy = (boxes[:, 1] + boxes[:, 3]) / 2 - h / 2
+    # 0 at the centre, 1 in a corner
+    off_center = np.hypot(cx, cy) / (np.hypot(w, h) / 2)
+    return np.sqrt(np.clip(area, 0, None)) * (1.0 - center_weight * off_center)
+
+
+@dataclass
+class Track:
+    track_id: int
+    bbox: np.ndarray
+    emp_id: str = "Unknown"
+    conf: float = -1.0
+    candidates: list = field(default_factory=list)
+    embedded_bbox: Optional[np.ndarray] = None
+    embedded_at: float = 0.0
+    embed_count: int = 0
+    hits: int = 1
+    missed: int = 0
+
+
+class FaceTracker:
+    """Associates per-frame detections with persistent track IDs."""
+
+    def __init__(
+        self,
+        iou_min: float = config.TRACK_IOU_MIN,
+        max_centroid_shift: float = config.TRACK_MAX_CENTROID_SHIFT,
+        max_missed: int = config.TRACK_MAX_MISSED,
+        reembed_iou: float = config.TRACK_REEMBED_IOU,
+        refresh_s: float = config.TRACK_REFRESH_SECS,
+        confirm_embeds: int = config.TRACK_CONFIRM_EMBEDS,
+    ):
+        self.iou_min = iou_min
+        self.max_centroid_shift = max_centroid_shift
+        self.max_missed = max_missed
+        self.reembed_iou = reembed_iou
+        self.refresh_s = refresh_s
+        self.confirm_embeds = confirm_embeds
+        self.tracks: List[Track] = []
+        self._ids = itertools.count(1)
+        # track_id of the primary subject in "primary" recognition mode
+        self.primary_id: Optional[int] = None
+        # held by the pipeline stages that update tracks and assign identities concurrently
+        self.lock = threading.RLock()
+
+    def update(self, boxes: np.ndarray) -> List[Track]:
+        """Associate ``x1, y1, x2, y2`` boxes with tracks; returns the track for each box, in order."""
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        assigned: List[Optional[Track]] = [None] * len(boxes)
+        if self.tracks and len(boxes):
+            prev = np.stack([t.bbox for t in self.tracks])
+            ious = iou_matrix(prev, boxes)
+            shifts = _centroid_distance(prev, boxes)
+            # IoU first; fall back to centroid proximity for fast movement between frames
+            score = np.where(ious >= self.iou_min, 1.0 + ious, np.where(shifts <= self.max_centroid_shift, 1.0 - shifts, 0.0))
+            for flat in np.argsort(-score, axis=None):
+                ti, di = np.unravel_index(flat, score.shape)
+                if score[ti, di] <= 0:
+                    break
+                track = self.tracks[ti]
+                if assigned[di] is not None or any(a is track for a in assigned):
+                    continue
+                track.bbox = boxes[di]
+                track.hits += 1
+                track.missed = 0
+                assigned[di] = track
+        matched = {id(t) for t in assigned if t is not None}
+        for track in self.tracks:
+            if id(track) not in matched:
+                track.missed += 1
+        self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+        for di, box in enumerate(boxes):
+            if assigned[di] is None:
+                track = Track(track_id=next(self._ids), bbox=box)
+                self.tracks.append(track)
+                assigned[di] = track
+        return assigned
+
+    def needs_embedding(self, track: Track, now: Optional[float] = None) -> bool:
+        """Whether the track's cached identity is missing, unconfirmed, stale or for a different box."""
+        now = time.time() if now is None else now
+        if track.embedded_bbox is None or track.embed_count < self.confirm_embeds:
+            return True
+        if now - track.embedded_at >= self.refresh_s:
+            return True
+        return float(iou_matrix(track.embedded_bbox[None], track.bbox[None])[0, 0]) < self.reembed_iou
+
+    def assign_identity(self, track: Track, emp_id: str, conf: float, candidates: list, now: Optional[float] = None):
+        track.emp_id = emp_id
+        track.conf = float(conf)
+        track.candidates = candidates
+        track.embedded_bbox = track.bbox.copy()
+        track.embedded_at = time.time() if now is None else now
+        track.embed_count += 1
+
+    def select_primary(self, tracks: List[Track], frame_shape: Tuple[int, ...], switch_ratio: float = config.PRIMARY_SWITCH_RATIO) -> Optional[Track]:
+        """Pick the primary subject among this frame's ``tracks``, sticking with the current one unless clearly beaten."""
+        if not tracks:
+            self.primary_id = None
+            return None
+        scores = subject_scores(np.stack([t.bbox for t in tracks]), frame_shape)
+        best = int(np.argmax(scores))
+        current = next((i for i, t in enumerate(tracks) if t.track_id == self.primary_id), None)
+        if current is not None and scores[best] < switch_ratio * scores[current]:
+            best = current
+        self.primary_id = tracks[best].track_id
+        return tracks[best]
+
+    def reset(self):
+        self.tracks = []
+        self.primary_id = None
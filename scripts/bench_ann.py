@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Recall vs. latency benchmark for the gallery nearest-neighbour indexes.
+
+Builds a synthetic clustered gallery (or opens a real store with --store),
+queries it with perturbed enrollments and compares each index against exact
+brute-force search. Run from the repository root:
+
+    python scripts/bench_ann.py --employees 20000 --per-employee 5
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from face_recognition.embedding_store import EmbeddingStore
+from face_recognition.gallery import Gallery, normalize_rows
+from face_recognition.gallery_index import FaissIndex, IVFIndex, faiss
+
+
+def synthetic_gallery(employees: int, per_employee: int, dim: int, seed: int = 0) -> Gallery:
+    rng = np.random.default_rng(seed)
+    centers = normalize_rows(rng.normal(size=(employees, dim)))
+    # spread of ~0.35 rad around the identity centre, similar to ArcFace intra-class spread
+    rows = centers[:, None, :] + 0.35 / np.sqrt(dim) * rng.normal(size=(employees, per_employee, dim))
+    data = {f"E{i:06d}": rows[i] for i in range(employees)}
+    return Gallery.from_dict(data)
+
+
+def make_queries(gallery: Gallery, n: int, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(gallery.size, size=min(n, gallery.size), replace=False)
+    noise = 0.35 / np.sqrt(gallery.dim) * rng.normal(size=(len(picks), gallery.dim))
+    return normalize_rows(np.asarray(gallery.matrix[np.sort(picks)]) + noise)
+
+
+def timed_search(gallery: Gallery, queries: np.ndarray, k: int):
+    # one query at a time, as in the live loop
+    start = time.perf_counter()
+    labels = [gallery.search(q[None, :], k)[1][0] for q in queries]
+    elapsed = (time.perf_counter() - start) / len(queries)
+    return np.stack(labels), elapsed * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", help="benchmark an existing embedding store instead of synthetic data")
+    parser.add_argument("--employees", type=int, default=20000)
+    parser.add_argument("--per-employee", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--nlist", type=int, default=0, help="IVF lists (0 = 4 * sqrt(rows))")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 64, 128])
+    args = parser.parse_args()
+
+    if args.store:
+        gallery = EmbeddingStore(args.store).load(index=False)
+        if not isinstance(gallery, Gallery):
+            parser.error("store has uncompacted journal entries; compact it first")
+    else:
+        gallery = synthetic_gallery(args.employees, args.per_employee, args.dim)
+    queries = make_queries(gallery, args.queries)
+    print(f"Gallery: {len(gallery.labels)} employees, {gallery.size} rows, dim {gallery.dim}; {len(queries)} queries, k={args.k}")
+
+    exact_labels, exact_ms = timed_search(gallery, queries, args.k)
+    print(f"{'index':<28}{'build s':>10}{'ms/query':>10}{'recall@1':>10}{'recall@k':>10}")
+    print(f"{'bruteforce':<28}{0.0:>10.2f}{exact_ms:>10.3f}{1.0:>10.3f}{1.0:>10.3f}")
+
+    def report(name, build_s):
+        labels, ms = timed_search(gallery, queries, args.k)
+        at1 = float(np.mean(labels[:, 0] == exact_labels[:, 0]))
+        atk = float(np.mean([len(set(a) & set(b)) / args.k for a, b in zip(labels, exact_labels)]))
+        print(f"{name:<28}{build_s:>10.2f}{ms:>10.3f}{at1:>10.3f}{atk:>10.3f}")
+
+    start = time.perf_counter()
+    ivf = IVFIndex(nlist=args.nlist).build(gallery.matrix)
+    build_s = time.perf_counter() - start
+    gallery.index = ivf
+    for nprobe in args.nprobe:
+        ivf.nprobe = nprobe
+        report(f"ivf nlist={ivf.centroids.shape[0]} nprobe={nprobe}", build_s)
+
+    if faiss is not None:
+        start = time.perf_counter()
+        hnsw = FaissIndex().build(gallery.matrix)
+        build_s = time.perf_counter() - start
+        gallery.index = hnsw
+        for ef in args.ef_search:
+            hnsw.ef_search = ef
+            report(f"faiss hnsw ef={ef}", build_s)
+    else:
+        print("faiss not installed; skipping HNSW")
+
+
+if __name__ == "__main__":
+    main()
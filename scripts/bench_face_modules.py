@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Load time, per-frame latency and resident memory of each InsightFace module set.
+
+Every pack and module set is measured in a fresh subprocess so the RSS figures
+do not include models loaded by an earlier run; the peak column shows whether
+skipped modules were ever loaded. Frames come from the employee photo folder
+(or --image); a blank frame is used when none is found. Run from the
+repository root:
+
+    python scripts/bench_face_modules.py --models buffalo_l,buffalo_s --frames 50
+"""
+
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CONFIGS = {
+    "all": (),
+    "detection+recognition": ("detection", "recognition"),
+    "detection": ("detection",),
+}
+
+
+def rss_mb(field: str = "VmRSS") -> float:
+    """Current (or, with ``VmHWM``, peak) resident set size of this process in MiB (Linux)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def load_frame(image: str):
+    import cv2
+    from face_recognition.enroll_faces import FACE_DB_DIR, IMAGE_EXTENSIONS
+
+    paths = [image] if image else sorted(
+        p for p in glob.glob(os.path.join(FACE_DB_DIR, "**", "*"), recursive=True)
+        if p.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    for path in paths:
+        frame = cv2.imread(path)
+        if frame is not None:
+            return frame, path
+    return np.zeros((480, 640, 3), dtype=np.uint8), None
+
+
+def measure(model: str, modules, frames: int, image: str) -> dict:
+    """Load one module set of pack ``model`` and time ``FaceAnalysis.get``; runs inside the child process."""
+    from face_recognition.models import get_face_analysis
+
+    before = rss_mb()
+    start = time.perf_counter()
+    app = get_face_analysis(model, modules=modules)
+    load_s = time.perf_counter() - start
+    frame, path = load_frame(image)
+    app.get(frame)  # first call allocates ONNX Runtime buffers
+    times = []
+    faces = 0
+    for _ in range(frames):
+        start = time.perf_counter()
+        faces = len(app.get(frame))
+        times.append(time.perf_counter() - start)
+    times_ms = np.array(times) * 1000.0
+    return {
+        "models": sorted(app.models),
+        "load_s": load_s,
+        "rss_mb": rss_mb() - before,
+        "peak_mb": rss_mb("VmHWM") - before,
+        "p50_ms": float(np.percentile(times_ms, 50)),
+        "p95_ms": float(np.percentile(times_ms, 95)),
+        "faces": faces,
+        "image": path,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", default="buffalo_l,buffalo_s", help="comma-separated model packs (default: %(default)s)")
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--image", default="", help="frame to analyse (default: first employee photo)")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(measure(args.models, CONFIGS[args.child], args.frames, args.image)))
+        return
+
+    for model in filter(None, (m.strip() for m in args.models.split(","))):
+        print(f"\n{model}")
+        print(f"{'modules':<24} {'loaded':<48} {'load s':>7} {'RSS MiB':>8} {'peak MiB':>9} {'p50 ms':>8} {'p95 ms':>8}")
+        results = {}
+        for name in CONFIGS:
+            cmd = [sys.executable, os.path.abspath(__file__), "--child", name, "--models", model,
+                   "--frames", str(args.frames), "--image", args.image]
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(f"{name:<24} failed: {proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else proc.returncode}")
+                continue
+            r = results[name] = json.loads(proc.stdout.strip().splitlines()[-1])
+            print(
+                f"{name:<24} {','.join(r['models']):<48} {r['load_s']:>7.2f} {r['rss_mb']:>8.1f} "
+                f"{r['peak_mb']:>9.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f}"
+            )
+
+        if "all" in results and "detection+recognition" in results:
+            full, lean = results["all"], results["detection+recognition"]
+            print(
+                f"detection+recognition vs all: {full['load_s'] - lean['load_s']:.2f} s faster load, "
+                f"{full['rss_mb'] - lean['rss_mb']:.1f} MiB less resident ({full['peak_mb'] - lean['peak_mb']:.1f} MiB peak), "
+                f"{full['p50_ms'] - lean['p50_ms']:.1f} ms less per frame (p50, {lean['faces']} face(s))"
+            )
+
+
+if __name__ == "__main__":
+    main()
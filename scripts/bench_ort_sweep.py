@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+ONNX Runtime session settings sweep for the face model tiers.
+
+Loads the detection tier and the recognition tier under every combination of
+the given thread counts, graph optimization levels, execution modes and arena
+settings, and reports the per-frame detection and per-face embedding latency.
+Pass --busy N to keep N cores busy during the run, roughly what the LiveKit
+audio pipeline takes on a kiosk. Copy the winning row into VR_ORT_OPTIONS (or
+VR_ORT_OPTIONS_<PACK>). Run from the repository root:
+
+    python scripts/bench_ort_sweep.py --threads 1,2,4 --busy 1
+"""
+
+import argparse
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from face_recognition import config
+from face_recognition.models import DETECTOR_MODULES, detection_pack, get_face_analysis, release
+from scripts.bench_face_modules import load_frame
+
+
+def _spin(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(10000))
+
+
+def _percentiles(times):
+    ms = np.array(times) * 1000.0
+    return float(np.percentile(ms, 50)), float(np.percentile(ms, 95))
+
+
+def measure(settings: dict, frame, frames: int):
+    """(detect p50, p95, embed p50, p95) in ms for one settings combination."""
+    detector = get_face_analysis(detection_pack(), det_size=config.DETECT_SIZE, modules=DETECTOR_MODULES, session=settings)
+    recognizer = get_face_analysis(session=settings)
+    faces = recognizer.get(frame)  # warm-up; also yields the crops to embed
+    detector.det_model.detect(frame, max_num=0, metric="default")
+    rec = recognizer.models["recognition"]
+    det_times, emb_times = [], []
+    for _ in range(frames):
+        start = time.perf_counter()
+        detector.det_model.detect(frame, max_num=0, metric="default")
+        det_times.append(time.perf_counter() - start)
+        for face in faces[:1]:
+            start = time.perf_counter()
+            rec.get(frame, face)
+            emb_times.append(time.perf_counter() - start)
+    release()
+    emb = _percentiles(emb_times) if emb_times else (float("nan"), float("nan"))
+    return _percentiles(det_times) + emb
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", default="1,2,4", help="intra-op thread counts (0 = ORT default)")
+    parser.add_argument("--optimization", default="basic,all")
+    parser.add_argument("--execution-mode", default="sequential")
+    parser.add_argument("--arena", default="1", help="memory arena settings to try, e.g. 1,0")
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--busy", type=int, default=0, help="cores to keep busy while measuring")
+    parser.add_argument("--image", default="")
+    args = parser.parse_args()
+
+    frame, path = load_frame(args.image)
+    print(f"frame: {path or 'blank'}  detection tier: {detection_pack()} {config.DETECT_SIZE}  "
+          f"recognition tier: {config.RECOGNITION_MODEL}  busy cores: {args.busy}")
+
+    stop = multiprocessing.Event()
+    hogs = [multiprocessing.Process(target=_spin, args=(stop,), daemon=True) for _ in range(args.busy)]
+    for hog in hogs:
+        hog.start()
+    try:
+        grid = itertools.product(
+            [int(v) for v in args.threads.split(",")],
+            args.optimization.split(","),
+            args.execution_mode.split(","),
+            [v.strip() == "1" for v in args.arena.split(",")],
+        )
+        print(f"{'threads':>7} {'opt':<9} {'mode':<10} {'arena':<5} {'det p50':>8} {'det p95':>8} {'emb p50':>8} {'emb p95':>8}")
+        for threads, optimization, mode, arena in grid:
+            settings = {
+                "intra_op_threads": threads,
+                "graph_optimization": optimization,
+                "execution_mode": mode,
+                "memory_arena": arena,
+            }
+            d50, d95, e50, e95 = measure(settings, frame, args.frames)
+            print(f"{threads:>7} {optimization:<9} {mode:<10} {str(arena):<5} {d50:>8.1f} {d95:>8.1f} {e50:>8.1f} {e95:>8.1f}")
+    finally:
+        stop.set()
+        for hog in hogs:
+            hog.join(timeout=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Accuracy / latency / memory report for compact gallery precisions.
+
+Compares float16 and int8 galleries (with and without float32 rescoring)
+against exact float32 matching on a synthetic clustered gallery, or on a real
+store with --store. Run from the repository root:
+
+    python scripts/bench_quantization.py --employees 20000 --per-employee 5
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from face_recognition.embedding_store import EmbeddingStore
+from face_recognition.gallery import Gallery
+from face_recognition.quantization import QuantizedMatrix
+from scripts.bench_ann import make_queries, synthetic_gallery
+
+
+def timed(fn, queries):
+    start = time.perf_counter()
+    results = [fn(q[None, :]) for q in queries]
+    return results, (time.perf_counter() - start) / len(queries) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", help="benchmark an existing embedding store instead of synthetic data")
+    parser.add_argument("--employees", type=int, default=20000)
+    parser.add_argument("--per-employee", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.store:
+        gallery = EmbeddingStore(args.store).load(index=False)
+        if not isinstance(gallery, Gallery):
+            parser.error("store has uncompacted journal entries; compact it first")
+    else:
+        gallery = synthetic_gallery(args.employees, args.per_employee, args.dim)
+    queries = make_queries(gallery, args.queries)
+    print(f"Gallery: {len(gallery.labels)} employees, {gallery.size} rows, dim {gallery.dim}; {len(queries)} queries, k={args.k}")
+
+    exact, exact_ms = timed(lambda q: gallery.search(q, args.k), queries)
+    exact_top1 = np.array([idx[0, 0] for _, idx in exact])
+    exact_scores = np.array([s[0, 0] for s, _ in exact])
+    print(f"{'mode':<22}{'MB':>8}{'ms/query':>10}{'recall@1':>10}{'max |dscore|':>14}")
+    print(f"{'float32':<22}{gallery.matrix.nbytes / 1e6:>8.1f}{exact_ms:>10.3f}{1.0:>10.3f}{0.0:>14.5f}")
+
+    for precision in ("float16", "int8"):
+        quantized = QuantizedMatrix.quantize(gallery.matrix, precision)
+
+        # first pass only: quantized dot product, reduced per employee
+        def raw(q):
+            per_label = np.maximum.reduceat(quantized.scores(q), gallery.offsets[:-1], axis=1)
+            j = int(np.argmax(per_label[0]))
+            return per_label[0, j], j
+
+        results, ms = timed(raw, queries)
+        top1 = np.array([j for _, j in results])
+        err = np.abs(np.array([s for s, _ in results]) - exact_scores)[top1 == exact_top1]
+        print(f"{precision + ' raw':<22}{quantized.nbytes / 1e6:>8.1f}{ms:>10.3f}{np.mean(top1 == exact_top1):>10.3f}{err.max(initial=0.0):>14.5f}")
+
+        gallery.quantized = quantized
+        results, ms = timed(lambda q: gallery.search(q, args.k), queries)
+        gallery.quantized = None
+        top1 = np.array([idx[0, 0] for _, idx in results])
+        err = np.abs(np.array([s[0, 0] for s, _ in results]) - exact_scores)
+        print(f"{precision + ' + rescore':<22}{quantized.nbytes / 1e6:>8.1f}{ms:>10.3f}{np.mean(top1 == exact_top1):>10.3f}{err.max(initial=0.0):>14.5f}")
+
+
+if __name__ == "__main__":
+    main()
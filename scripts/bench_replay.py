@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Recognition pipeline throughput on recorded footage.
+
+Replays a video file, an image directory / glob or a synthetic stream through
+``Recognizer.recognize_frame`` (with the face tracker, as the live loops use
+it) and reports frames per second, per-frame latency and the identities seen.
+At maximum speed (the default) every frame is processed, which measures
+throughput; with --realtime the clip plays at its own frame rate and frames
+the pipeline cannot keep up with are dropped, as on a kiosk. Run from the
+repository root:
+
+    python scripts/bench_replay.py lobby_incident.mp4 --embeddings face_embeddings.pkl
+    python scripts/bench_replay.py synthetic:Employee/EMP_Photos/E001.jpg --frames 300
+"""
+
+import argparse
+import collections
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from face_recognition.frame_source import SyntheticSource, open_source
+from face_recognition.motion import MotionGate
+from face_recognition.recognize_wrapper import Recognizer
+from face_recognition.tracker import FaceTracker
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="video file, image directory or glob, 'synthetic' or 'synthetic:<face image>'")
+    parser.add_argument("--embeddings", default=os.getenv("VR_FACE_EMBEDDINGS", "face_embeddings.pkl"))
+    parser.add_argument("--realtime", action="store_true", help="play at the clip's frame rate and drop late frames")
+    parser.add_argument("--frames", type=int, default=0, help="stop after this many frames (synthetic sources default to 300)")
+    parser.add_argument("--motion", action="store_true", help="skip detection on static frames, as FaceGreetingService does")
+    args = parser.parse_args()
+
+    source = open_source(args.source, realtime=args.realtime)
+    if isinstance(source, SyntheticSource) and not source.limit:
+        source.limit = args.frames or 300
+    recognizer = Recognizer(args.embeddings, hot_reload=False)
+    tracker = FaceTracker()
+    gate = MotionGate() if args.motion else None
+    cursor = source.cursor()
+
+    times, faces = [], 0
+    seen = collections.Counter()
+    detections = []
+    started = time.perf_counter()
+    while not args.frames or len(times) < args.frames:
+        ok, frame = cursor.read(timeout=2.0)
+        if not ok:
+            break
+        t0 = time.perf_counter()
+        if gate is None or gate.has_motion(frame) or detections:
+            detections = recognizer.recognize_frame(frame, tracker=tracker)
+        times.append(time.perf_counter() - t0)
+        faces += len(detections)
+        seen.update(d["emp_id"] for d in detections if d.get("primary", True) and d["emp_id"] != "Unknown")
+    elapsed = time.perf_counter() - started
+    source.stop()
+
+    if not times:
+        print("No frames read.")
+        return
+    ms = np.array(times) * 1000.0
+    print(f"source: {args.source} ({'realtime' if args.realtime else 'max speed'})")
+    print(f"frames processed: {len(times)}  published: {getattr(source, 'frames', len(times))}  "
+          f"wall: {elapsed:.2f}s  throughput: {len(times) / elapsed:.1f} fps")
+    print(f"per frame: p50 {np.percentile(ms, 50):.1f} ms  p95 {np.percentile(ms, 95):.1f} ms  max {ms.max():.1f} ms")
+    print(f"face boxes: {faces}  recognized: {dict(seen.most_common()) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
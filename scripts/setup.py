@@ -93,13 +93,14 @@ def check_data_files():
 
 def check_face_embeddings():
     """Check if face embeddings exist."""
+    embeddings_store = Path("face_embeddings.store") / "index.json"
     embeddings_file = Path("face_embeddings.pkl")
-    if embeddings_file.exists():
+    if embeddings_store.exists() or embeddings_file.exists():
         print("✅ Face embeddings found")
         return True
     else:
         print("⚠️  Face embeddings not found")
-        print("   Run 'python face_recognition/enroll_faces.py' to create face embeddings")
+        print("   Run 'python -m face_recognition.enroll_faces' to create face embeddings")
         return False
 
 def main():
@@ -129,7 +130,7 @@ def main():
     print("=" * 60)
     print("\nNext steps:")
     print("1. Edit .env file with your Gmail credentials")
-    print("2. Create face embeddings: python face_recognition/enroll_faces.py")
+    print("2. Create face embeddings: python -m face_recognition.enroll_faces")
     print("3. Run the bot: python agent.py console")
     print("\nFor face recognition mode:")
     print("   $env:VR_FACE_EMBEDDINGS=\"face_embeddings.pkl\"; $env:AUTO_FACE_GREETING=\"1\"; python agent.py console")
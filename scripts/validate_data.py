@@ -5,6 +5,8 @@ Validates CSV files and face embeddings
 """
 
 import os
+import json
+import numpy as np
 import pandas as pd
 import pickle
 from pathlib import Path
@@ -49,9 +51,28 @@ def validate_candidate_csv(csv_path: str) -> tuple[bool, str]:
     except Exception as e:
         return False, f"Error reading CSV: {e}"
 
+def validate_embedding_store(store_path: str) -> tuple[bool, str]:
+    """Validate a face embedding store directory."""
+    try:
+        with open(os.path.join(store_path, "index.json"), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("format_version") != 1:
+            return False, f"Unsupported embedding store format {index.get('format_version')}"
+        if not index["labels"]:
+            return False, "Face embedding store is empty"
+        matrix = np.load(os.path.join(store_path, index["matrix"]), mmap_mode="r")
+        if matrix.shape != (index["count"], index["dim"]) or index["offsets"][-1] != index["count"]:
+            return False, "Embedding matrix does not match the store index"
+        return True, f"Face embedding store valid with {len(index['labels'])} employees ({index['count']} enrollments)"
+    except Exception as e:
+        return False, f"Error reading face embedding store: {e}"
+
 def validate_face_embeddings(embeddings_path: str) -> tuple[bool, str]:
     """Validate face embeddings file."""
     try:
+        store_path = os.path.splitext(embeddings_path)[0] + ".store"
+        if os.path.exists(os.path.join(store_path, "index.json")):
+            return validate_embedding_store(store_path)
         if not os.path.exists(embeddings_path):
             return False, "Face embeddings file not found"
         
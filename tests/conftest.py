@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+import face_recognition.recognize_wrapper as rw
+from face_recognition.embedding_store import EmbeddingStore
+from face_recognition.models import DETECTOR_MODULES
+
+
+@pytest.fixture
+def eye_store(tmp_path):
+    """Path of a store enrolling E001..E003 as the matching 8-d unit vectors (E002 is ``np.eye(8)[2]``)."""
+    path = str(tmp_path / "faces.store")
+    EmbeddingStore(path).write_dict({f"E00{i}": np.eye(8)[i] for i in range(1, 4)})
+    return path
+
+
+@pytest.fixture
+def fake_face_analysis(monkeypatch):
+    """Serve ``app`` for every model the recognizer loads, or ``detector`` for its detection tier."""
+
+    def install(app, detector=None):
+        def get_face_analysis(*args, **kwargs):
+            return detector if detector is not None and kwargs.get("modules") == DETECTOR_MODULES else app
+
+        monkeypatch.setattr(rw, "get_face_analysis", get_face_analysis)
+        return app
+
+    return install
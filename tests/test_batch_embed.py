@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+import face_recognition.recognize_wrapper as rw
+from face_recognition.tracker import FaceTracker
+
+KPS = np.array([[30, 40], [70, 40], [50, 60], [35, 80], [65, 80]], dtype=np.float32)
+
+
+class Detector:
+    def detect(self, frame, max_num=0, metric="default"):
+        # three faces side by side
+        boxes = np.array([[x, 20, x + 80, 100, 0.9] for x in (0, 200, 400)], dtype=np.float32)
+        return boxes, np.stack([KPS + [x, 0] for x in (0, 200, 400)])
+
+
+class BatchArcFace:
+    input_size = (112, 112)
+
+    def __init__(self, input_shape=("None", 3, 112, 112), max_batch=None):
+        self.input_shape = list(input_shape)
+        self.max_batch = max_batch
+        self.batches = []
+
+    def get_feat(self, imgs):
+        imgs = imgs if isinstance(imgs, list) else [imgs]
+        if self.max_batch and len(imgs) > self.max_batch:
+            raise RuntimeError("Got invalid dimensions for input: data")
+        assert all(img.shape == (112, 112, 3) for img in imgs)
+        self.batches.append(len(imgs))
+        return np.tile(np.eye(8, dtype=np.float32)[2] * 3, (len(imgs), 1))
+
+
+class App:
+    def __init__(self, rec):
+        self.det_model = Detector()
+        self.models = {"recognition": rec}
+
+
+@pytest.fixture
+def make_recognizer(eye_store, fake_face_analysis):
+    def make(rec):
+        fake_face_analysis(App(rec))
+        return rw.Recognizer(eye_store, hot_reload=False, quality_gate=False, mode="all")
+
+    return make
+
+
+def test_all_faces_of_a_frame_share_one_arcface_run(make_recognizer):
+    rec = BatchArcFace()
+    recognizer = make_recognizer(rec)
+    results = recognizer.recognize_frame(np.zeros((120, 640, 3), dtype=np.uint8), tracker=FaceTracker())
+    assert rec.batches == [3]
+    assert [r["emp_id"] for r in results] == ["E002"] * 3
+    assert all(abs(r["conf"] - 1.0) < 1e-5 for r in results)
+
+
+def test_queued_frames_are_embedded_together(make_recognizer):
+    rec = BatchArcFace()
+    recognizer = make_recognizer(rec)
+    frames = [np.zeros((120, 640, 3), dtype=np.uint8) for _ in range(2)]
+    plans = [(frame, recognizer.plan(frame)) for frame in frames]
+    results = recognizer.complete_frames(plans)
+    assert rec.batches == [6]
+    assert [len(r) for r in results] == [3, 3]
+
+
+def test_fixed_batch_models_fall_back_to_one_crop_per_run(make_recognizer):
+    rec = BatchArcFace(max_batch=1)
+    recognizer = make_recognizer(rec)
+    frame = np.zeros((120, 640, 3), dtype=np.uint8)
+    assert len(recognizer.recognize_frame(frame)) == 3
+    assert rec.batches == [1, 1, 1]
+    # remembered: later frames skip the failing batched call
+    recognizer.recognize_frame(frame)
+    assert rec.batches == [1] * 6
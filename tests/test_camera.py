@@ -0,0 +1,57 @@
+import threading
+
+import numpy as np
+
+import face_recognition.camera as camera
+
+
+class FakeCapture:
+    opened = 0
+    # each release lets the grab loop read exactly one frame
+    frames = threading.Semaphore(0)
+
+    def __init__(self, index):
+        FakeCapture.opened += 1
+        self.count = 0
+
+    def set(self, prop, value):
+        return True
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        FakeCapture.frames.acquire()
+        self.count += 1
+        return True, np.full((4, 4, 3), self.count, dtype=np.uint8)
+
+    def release(self):
+        pass
+
+
+def test_shared_camera_serves_newest_frame(monkeypatch):
+    monkeypatch.setattr(camera.cv2, "VideoCapture", FakeCapture)
+    FakeCapture.opened = 0
+    FakeCapture.frames = threading.Semaphore(0)
+    try:
+        first = camera.get_camera(7)
+        assert first.is_opened()
+        assert camera.get_camera(7) is first
+        assert FakeCapture.opened == 1
+
+        cursor = first.cursor()
+        assert cursor.read(timeout=0.05) == (False, None)
+        FakeCapture.frames.release()
+        ok, a = cursor.read(timeout=5.0)
+        FakeCapture.frames.release()
+        ok2, b = cursor.read(timeout=5.0)
+        assert ok and ok2
+        assert a[0, 0, 0] == 1 and b[0, 0, 0] == 2
+
+        seq, latest = first.latest()
+        assert seq == 2 and latest is b
+    finally:
+        # unblock the grab loop so it can see the stop request
+        FakeCapture.frames.release(100)
+        camera.release_camera(7)
+    assert not first.is_opened()
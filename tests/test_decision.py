@@ -0,0 +1,40 @@
+from face_recognition.decision import ACCEPT, PENDING, REJECT, TIMEOUT, DecisionEngine
+
+
+def _frame(*candidates, fresh=True):
+    return [{"emp_id": candidates[0][0], "candidates": list(candidates), "fresh": fresh}]
+
+
+def test_clear_face_is_accepted_on_margin_in_two_frames():
+    engine = DecisionEngine(threshold=0.65, margin=0.05, min_frames=2)
+    assert engine.update(_frame(("E001", 0.70), ("E002", 0.40))).outcome == PENDING
+    verdict = engine.update(_frame(("E001", 0.72), ("E002", 0.41)))
+    assert verdict.outcome == ACCEPT and verdict.emp_id == "E001" and verdict.reason == "margin"
+    assert 0.5 < verdict.confidence <= 1.0 and verdict.frames == 2
+
+
+def test_lookalikes_need_accumulated_evidence_and_cached_frames_do_not_count():
+    engine = DecisionEngine(threshold=0.65, margin=0.05, min_frames=2, accept_log_odds=3.0)
+    close = (("E001", 0.71), ("E002", 0.70))
+    outcomes = [engine.update(_frame(*close)).outcome for _ in range(2)]
+    # the tracker repeating the cached identity adds nothing
+    outcomes += [engine.update(_frame(*close, fresh=False)).outcome for _ in range(5)]
+    assert set(outcomes) == {PENDING}
+    verdict = engine.update(_frame(*close))
+    assert verdict.outcome == ACCEPT and verdict.reason == "evidence" and verdict.frames == 3
+
+
+def test_best_face_is_used_and_sustained_unknowns_reject():
+    engine = DecisionEngine(threshold=0.65, min_frames=2, reject_frames=3)
+    # the strongest face decides, not the first one listed
+    frame = [{"candidates": [("E009", 0.30)]}, {"candidates": [("E001", 0.80), ("E002", 0.30)]}]
+    engine.update(frame)
+    assert engine.update(frame).emp_id == "E001"
+
+    engine.reset()
+    verdicts = [engine.update(_frame(("E003", 0.35))) for _ in range(3)]
+    assert [v.outcome for v in verdicts] == [PENDING, PENDING, REJECT]
+
+    engine.reset()
+    engine.update([])
+    assert engine.finalize().outcome == TIMEOUT and engine.finalize().reason == "no face"
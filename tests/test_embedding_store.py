@@ -0,0 +1,130 @@
+import json
+import pickle
+
+import numpy as np
+
+from face_recognition.embedding_store import EmbeddingStore, open_store, resolve_store_path
+
+
+def test_pickle_is_migrated_once_and_memory_mapped(tmp_path):
+    pkl = tmp_path / "face_embeddings.pkl"
+    rng = np.random.default_rng(0)
+    # both legacy container types: ndarray and list of enrollments
+    pickle.dump({"E001": rng.normal(size=512), "E002": [rng.normal(size=512), rng.normal(size=512)]}, open(pkl, "wb"))
+
+    store = open_store(str(pkl))
+    assert store.path == resolve_store_path(str(pkl)) == str(tmp_path / "face_embeddings.store")
+    index = json.loads((tmp_path / "face_embeddings.store" / "index.json").read_text())
+    assert index["format_version"] == 1
+    assert index["labels"] == ["E001", "E002"] and index["offsets"] == [0, 1, 3]
+
+    gallery = store.load()
+    assert isinstance(gallery.matrix.base, np.memmap)
+    assert gallery.matrix.shape == (3, 512)
+
+    # second open does not re-read the pickle
+    pkl.write_bytes(b"not a pickle")
+    assert open_store(str(pkl)).generation == 1
+
+
+def test_rewrite_creates_new_generation_atomically(tmp_path):
+    store = EmbeddingStore(str(tmp_path / "gallery.store"))
+    store.write_dict({"E001": np.ones(8)})
+    before = store.load()
+
+    generation = store.replace("E001", [np.arange(8, dtype=np.float32), np.ones(8)])
+
+    assert generation == 2 and store.generation == 2
+    after = store.load()
+    assert list(after.offsets) == [0, 2]
+    # the earlier snapshot is untouched
+    assert before.matrix.shape == (1, 8)
+    assert sorted(p.name for p in (tmp_path / "gallery.store").iterdir()) == ["embeddings-2.npy", "index.json", "store.lock"]
+
+
+def test_enrollments_are_journaled_then_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr("face_recognition.embedding_store.start_compactor", lambda store: None)
+    store = EmbeddingStore(str(tmp_path / "gallery.store"))
+    store.write_dict({"E001": np.eye(8)[0]})
+
+    store.add("E001", np.eye(8)[1])
+    store.add("E009", np.eye(8)[2])
+
+    # main matrix untouched, readers see main + journal
+    assert store.generation == 1
+    view = store.load()
+    assert list(view.labels) == ["E001", "E009"]
+    assert [m[0][0] for m in view.match(np.eye(8)[[1, 2]], k=1)] == ["E001", "E009"]
+
+    stamp = store.stamp()
+    assert store.compact() == 2
+    assert store.stamp() != stamp
+    assert store.compact() is None
+
+    compacted = store.load()
+    assert list(compacted.labels) == ["E001", "E009"]
+    assert list(compacted.offsets) == [0, 2, 3]
+    assert sorted(p.name for p in (tmp_path / "gallery.store").iterdir()) == ["embeddings-2.npy", "index.json", "store.lock"]
+
+
+def _registration_process(path, added, compacted):
+    # a job process: its journal fd stays open across another process's compaction
+    store = EmbeddingStore(path)
+    store.add("E100", np.eye(8)[3])
+    added.set()
+    compacted.wait(10)
+    store.add("E101", np.eye(8)[4])
+
+
+def test_appends_survive_a_compaction_by_another_process(tmp_path, monkeypatch):
+    import multiprocessing
+
+    monkeypatch.setattr("face_recognition.embedding_store.start_compactor", lambda store: None)
+    path = str(tmp_path / "gallery.store")
+    store = EmbeddingStore(path)
+    store.write_dict({"E001": np.eye(8)[0]})
+
+    ctx = multiprocessing.get_context("spawn")
+    added, compacted = ctx.Event(), ctx.Event()
+    job = ctx.Process(target=_registration_process, args=(path, added, compacted))
+    job.start()
+    assert added.wait(30)
+    assert store.compact() == 2
+    compacted.set()
+    job.join(30)
+    assert job.exitcode == 0
+
+    assert list(store.load().labels) == ["E001", "E100", "E101"]
+    assert store.compact() == 3
+    assert list(store.load().labels) == ["E001", "E100", "E101"]
+
+
+def test_failed_rewrites_keep_journaled_enrollments(tmp_path, monkeypatch):
+    import pytest
+
+    monkeypatch.setattr("face_recognition.embedding_store.start_compactor", lambda store: None)
+    store = EmbeddingStore(str(tmp_path / "gallery.store"))
+    store.write_dict({"E001": np.eye(8)[0]})
+    store.add("E002", np.eye(8)[1])
+
+    # the mutation fails before anything is detached
+    with pytest.raises(ValueError):
+        store.update({"E003": np.ones(256)})
+    store.add("E004", np.eye(8)[2])
+    assert store.generation == 1
+
+    # the writer dies after detaching: its journal is left behind and folded by the next rewrite
+    def crash(gallery, generation, folded_journals):
+        raise OSError("disk full")
+
+    with monkeypatch.context() as m:
+        m.setattr(store, "_write", crash)
+        with pytest.raises(OSError):
+            store.compact()
+    store.add("E005", np.eye(8)[3])
+    assert list(store.load().labels) == ["E001", "E002", "E004", "E005"]
+
+    assert store.compact() == 2
+    assert list(store.load().labels) == ["E001", "E002", "E004", "E005"]
+    assert not list((tmp_path / "gallery.store").glob("journal-*"))
+    assert store.compact() is None
@@ -0,0 +1,133 @@
+import cv2
+import numpy as np
+
+import face_recognition.enroll_faces as ef
+from face_recognition.embedding_store import EmbeddingStore, open_store
+
+
+class FakeFace:
+    def __init__(self, embedding):
+        self.bbox = np.array([0, 0, 8, 8], dtype=np.float32)
+        self.embedding = embedding
+
+
+class FakeModel:
+    calls = 0
+
+    def get(self, img):
+        FakeModel.calls += 1
+        if img.max() == 0:
+            return []
+        return [FakeFace(np.r_[img[0, 0].astype(np.float32), 1.0])]
+
+
+def _photo(path, color):
+    cv2.imwrite(str(path), np.full((8, 8, 3), color, dtype=np.uint8))
+
+
+def test_reenrollment_only_embeds_new_photos_and_merges(tmp_path, monkeypatch):
+    monkeypatch.setattr(ef, "_worker_model", FakeModel())
+    monkeypatch.setattr("face_recognition.embedding_store.start_compactor", lambda store: None)
+    photos = tmp_path / "photos"
+    photos.mkdir()
+    _photo(photos / "E001.png", (200, 0, 0))
+    _photo(photos / "E002.png", (0, 200, 0))
+    _photo(photos / "blank.png", (0, 0, 0))
+    output = str(tmp_path / "faces.pkl")
+
+    FakeModel.calls = 0
+    first = ef.enroll(str(photos), output, workers=1)
+    assert FakeModel.calls == 3 and first["employees"] == 2
+
+    # a live registration journaled between runs must survive the merge
+    store = EmbeddingStore(first["store"])
+    store.add("E777", np.r_[1.0, 1.0, 1.0, 0.0])
+
+    _photo(photos / "E003.png", (0, 0, 200))
+    (photos / "E002").mkdir()
+    _photo(photos / "E002" / "side.png", (0, 150, 50))
+    FakeModel.calls = 0
+    second = ef.enroll(str(photos), output, workers=1)
+
+    assert FakeModel.calls == 2
+    assert second["updated"] == ["E002", "E003"]
+    data = store.to_dict()
+    assert sorted(data) == ["E001", "E002", "E003", "E777"]
+    assert data["E002"].shape == (2, 4)
+
+    FakeModel.calls = 0
+    third = ef.enroll(str(photos), output, workers=1)
+    assert FakeModel.calls == 0 and third["updated"] == [] and third["generation"] == second["generation"]
+
+
+def test_legacy_pickle_is_migrated_before_photos_are_merged(tmp_path, monkeypatch):
+    import pickle
+
+    monkeypatch.setattr(ef, "_worker_model", FakeModel())
+    monkeypatch.setattr("face_recognition.embedding_store.start_compactor", lambda store: None)
+    photos = tmp_path / "photos"
+    photos.mkdir()
+    _photo(photos / "E001.png", (200, 0, 0))
+    output = tmp_path / "faces.pkl"
+    pickle.dump({"E999": np.r_[0.0, 0.0, 1.0, 0.0]}, open(output, "wb"))
+
+    summary = ef.enroll(str(photos), str(output), workers=1)
+    assert sorted(EmbeddingStore(summary["store"]).load().labels) == ["E001", "E999"]
+
+
+def test_zero_embedding_is_not_enrolled(monkeypatch, tmp_path):
+    class ZeroModel:
+        def get(self, img):
+            return [FakeFace(np.zeros(4, dtype=np.float32))]
+
+    monkeypatch.setattr(ef, "_worker_model", ZeroModel())
+    _photo(tmp_path / "E001.png", (200, 0, 0))
+    assert ef.embed_photo(str(tmp_path / "E001.png")) == (None, "no usable embedding")
+
+
+def test_registration_photos_keep_the_registered_enrollment(tmp_path, monkeypatch):
+    monkeypatch.setattr(ef, "_worker_model", FakeModel())
+    monkeypatch.setattr("face_recognition.embedding_store.start_compactor", lambda store: None)
+    photos = tmp_path / "photos"
+    photos.mkdir()
+    _photo(photos / "E001.png", (200, 0, 0))
+    output = str(tmp_path / "faces.pkl")
+    ef.enroll(str(photos), output, workers=1)
+
+    # the camera registration journals its averaged embedding and saves the frame it used
+    store = open_store(output)
+    registered = np.r_[0.0, 0.0, 1.0, 0.0].astype(np.float32)
+    store.add("E002", registered)
+    assert ef.save_registration_photo(str(photos / "E002.png"), np.full((8, 8, 3), 90, dtype=np.uint8))
+
+    summary = ef.enroll(str(photos), output, workers=1)
+    assert summary["updated"] == [] and summary["photos"] == 1
+    label, score = store.load().match(registered[None, :], k=1)[0][0]
+    assert label == "E002" and score > 0.999
+
+    # a photo put in its place later is enrolled as usual
+    _photo(photos / "E002.png", (30, 0, 0))
+    assert ef.enroll(str(photos), output, workers=1)["updated"] == ["E002"]
+
+
+def test_changed_photo_keeps_camera_registrations_of_the_same_employee(tmp_path, monkeypatch):
+    monkeypatch.setattr(ef, "_worker_model", FakeModel())
+    monkeypatch.setattr("face_recognition.embedding_store.start_compactor", lambda store: None)
+    photos = tmp_path / "photos"
+    (photos / "E001").mkdir(parents=True)
+    _photo(photos / "E001" / "front.png", (200, 0, 0))
+    _photo(photos / "E001" / "side.png", (0, 200, 0))
+    output = str(tmp_path / "faces.store")
+    ef.enroll(str(photos), output, workers=1)
+    store = open_store(output)
+    registered = np.r_[1.0, -1.0, 0.0, 0.0].astype(np.float32) / np.sqrt(2)
+    store.add("E001", registered)
+
+    _photo(photos / "E001" / "front.png", (0, 0, 200))
+    assert ef.enroll(str(photos), output, workers=1)["updated"] == ["E001"]
+    rows = store.to_dict()["E001"]
+    # the old front.png row is gone; side.png, the new front.png and the registration remain
+    assert len(rows) == 3
+    assert max(float(row @ registered) for row in rows) > 0.999
+    old = np.r_[200.0, 0.0, 0.0, 1.0] / np.linalg.norm([200.0, 0.0, 0.0, 1.0])
+    assert max(float(row @ old) for row in rows) < 0.99
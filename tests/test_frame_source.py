@@ -0,0 +1,123 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import face_recognition.config as face_config
+from face_recognition.face_integration import FaceGreetingService
+from face_recognition.frame_source import ReplaySource, SyntheticSource, open_source
+from face_recognition.recognize_wrapper import FramePlan
+
+
+def _write_frames(folder, count):
+    for i in range(count):
+        frame = np.full((24, 32, 3), i * 10, dtype=np.uint8)
+        cv2.imwrite(str(folder / f"frame_{i:03d}.png"), frame)
+
+
+def test_max_speed_replay_delivers_every_frame_once_in_order(tmp_path):
+    _write_frames(tmp_path, 5)
+    source = open_source(str(tmp_path), realtime=False)
+    assert isinstance(source, ReplaySource)
+    cursor = source.cursor()
+    seen = []
+    while True:
+        ok, frame = cursor.read(timeout=2.0)
+        if not ok:
+            break
+        seen.append(int(frame[0, 0, 0]))
+    assert seen == [0, 10, 20, 30, 40]
+    assert not source.is_opened()
+
+
+def test_realtime_replay_drops_frames_for_a_slow_reader(tmp_path):
+    _write_frames(tmp_path, 6)
+    source = ReplaySource(str(tmp_path / "*.png"), realtime=True, fps=200).start()
+    source._thread.join(timeout=2)
+    ok, frame = source.cursor().read(timeout=0.1)
+    # the clip played on without us; only the newest frame is left
+    assert ok and int(frame[0, 0, 0]) == 50
+    assert source.frames == 6
+
+
+def test_greeting_service_runs_on_any_source(tmp_path, monkeypatch):
+    monkeypatch.setattr(face_config, "HEADLESS", True)
+    monkeypatch.setattr(face_config, "MOTION_GATING", False)
+    emp_csv = tmp_path / "employees.csv"
+    emp_csv.write_text("EmployeeID,Name\nE001,Alice\n")
+    source = SyntheticSource(width=64, height=48, realtime=False, frames=3).start()
+    svc = FaceGreetingService(str(tmp_path / "missing.store"), str(emp_csv), cooldown_s=0, source=source)
+
+    class FakeRec:
+        frames = 0
+
+        def plan(self, frame, tracker=None):
+            FakeRec.frames += 1
+            assert frame.shape == (48, 64, 3)
+            return FramePlan([], faces=1)
+
+        def complete_frames(self, items, tracker=None):
+            return [[{"emp_id": "E001", "bbox": (0, 0, 10, 10), "conf": 0.99}] for _ in items]
+
+    svc.recognizer = FakeRec()
+    svc.employee_db = {"E001": {"Name": "Alice"}}
+    greeted = []
+    svc._run(lambda emp: greeted.append(emp["Name"]))  # returns when the source runs dry
+    assert FakeRec.frames == 3 and greeted[0] == "Alice"
+
+
+class _MatchingRec:
+    threshold = 0.5
+
+    def plan(self, frame, tracker=None):
+        return FramePlan([], faces=1)
+
+    def complete_frames(self, items, tracker=None):
+        match = {"emp_id": "E001", "bbox": (0, 0, 10, 10), "conf": 0.99, "candidates": [("E001", 0.99), ("E002", 0.1)]}
+        return [[dict(match)] for _ in items]
+
+
+def _stage_threads():
+    return [t for t in threading.enumerate() if t.name.startswith("face-") and t.is_alive()]
+
+
+def test_retry_decision_closes_its_stream_and_keeps_the_threshold(monkeypatch):
+    from face_recognition import face_integration
+
+    seen = []
+    monkeypatch.setattr(face_integration, "_get_recognizer", lambda path, threshold=0.65: seen.append(threshold) or _MatchingRec())
+    source = SyntheticSource(width=64, height=48, fps=50)
+    source.start()
+    try:
+        message = face_integration._retry_decision(
+            "faces.store", {"E001": {"Name": "Alice"}}, 0, timeout_s=5, source=source, threshold=0.42
+        )
+        assert message.startswith("SUCCESS: Hello Alice")
+        assert seen == [0.42]
+        # the early return on ACCEPT still shuts the capture/detect/recognize threads down
+        deadline = time.time() + 2
+        while _stage_threads() and time.time() < deadline:
+            time.sleep(0.02)
+        assert _stage_threads() == []
+    finally:
+        source.stop()
+
+
+def test_sources_opened_from_a_spec_are_stopped(monkeypatch):
+    from face_recognition import face_integration, frame_source
+
+    assert frame_source.owns_source("synthetic") and frame_source.owns_source("clip.mp4")
+    assert not any(frame_source.owns_source(spec) for spec in (None, 0, "1", "room", SyntheticSource()))
+
+    opened = []
+
+    def open_and_record(spec, camera_index=0, realtime=True):
+        opened.append(open_source(spec, camera_index, realtime))
+        return opened[-1]
+
+    monkeypatch.setattr(face_integration, "open_source", open_and_record)
+    monkeypatch.setattr(face_integration, "_get_recognizer", lambda path, threshold=0.65: _MatchingRec())
+    message = face_integration._retry_decision("faces.store", {"E001": {"Name": "Alice"}}, 0, timeout_s=5, source="synthetic")
+    assert message.startswith("SUCCESS")
+    assert not opened[0]._thread.is_alive()
@@ -0,0 +1,39 @@
+import numpy as np
+
+from face_recognition.gallery import Gallery, normalize_rows
+
+
+def test_multi_enrollment_entries_are_kept_per_row():
+    rng = np.random.default_rng(0)
+    a1, a2, b = rng.normal(size=(3, 512)).astype(np.float32)
+    gallery = Gallery.from_dict({"E001": [a1, a2], "E002": b, "E003": np.zeros(512)})
+
+    assert list(gallery.labels) == ["E001", "E002"]
+    assert gallery.matrix.shape == (3, 512)
+    assert list(gallery.row_labels) == [0, 0, 1]
+    np.testing.assert_allclose(np.linalg.norm(gallery.matrix, axis=1), 1.0, rtol=1e-5)
+
+
+def test_search_reduces_max_over_exemplars_and_ranks_top_k():
+    rng = np.random.default_rng(1)
+    data = {f"E{i:03d}": rng.normal(size=(2, 64)) for i in range(20)}
+    gallery = Gallery.from_dict(data)
+
+    # query is the second enrollment of E007 -> exact match on that exemplar
+    queries = normalize_rows(np.stack([data["E007"][1], data["E013"][0]]))
+    matches = gallery.match(queries, k=3)
+
+    assert [m[0][0] for m in matches] == ["E007", "E013"]
+    assert abs(matches[0][0][1] - 1.0) < 1e-5
+    assert all(len(m) == 3 for m in matches)
+    assert all(m[0][1] >= m[1][1] >= m[2][1] for m in matches)
+
+    # agrees with the per-pair brute force reference
+    ref = {k: max(float(q @ v) for v in normalize_rows(e)) for k, e in data.items() for q in queries[:1]}
+    assert matches[0][1][0] == sorted(ref, key=ref.get, reverse=True)[1]
+
+
+def test_empty_gallery_returns_no_candidates():
+    gallery = Gallery.from_dict({})
+    assert len(gallery) == 0
+    assert gallery.match(np.ones((1, 512), dtype=np.float32), k=3) == [[]]
@@ -0,0 +1,83 @@
+import os
+
+import numpy as np
+
+from face_recognition import config
+from face_recognition.embedding_store import EmbeddingStore
+from face_recognition.gallery import Gallery, GalleryView, normalize_rows
+from face_recognition.gallery_index import IVFIndex, create_index
+
+
+def _clustered(n_labels=300, per_label=4, dim=64, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_labels, dim))
+    return {f"E{i:04d}": centers[i] + 0.2 * rng.normal(size=(per_label, dim)) for i in range(n_labels)}
+
+
+def test_ivf_with_all_lists_probed_matches_exact_search():
+    data = _clustered()
+    exact = Gallery.from_dict(data)
+    approx = Gallery.from_dict(data)
+    approx.index = IVFIndex(nlist=16, nprobe=16).build(approx.matrix)
+
+    queries = normalize_rows(np.stack([data[f"E{i:04d}"][0] + 0.1 for i in range(0, 300, 7)]))
+    got, want = approx.match(queries, k=3), exact.match(queries, k=3)
+    assert [[label for label, _ in m] for m in got] == [[label for label, _ in m] for m in want]
+    np.testing.assert_allclose([[s for _, s in m] for m in got], [[s for _, s in m] for m in want], rtol=1e-5)
+
+
+def test_ivf_partial_probe_keeps_top1_recall_and_view_merges_journal():
+    data = _clustered(seed=1)
+    main = Gallery.from_dict(data)
+    main.index = IVFIndex(nlist=32, nprobe=4).build(main.matrix)
+    rng = np.random.default_rng(2)
+    newcomer = rng.normal(size=64)
+    view = GalleryView([main, Gallery.from_dict({"NEW": newcomer})])
+
+    queries = normalize_rows(np.stack([data[f"E{i:04d}"][1] for i in range(0, 300, 3)] + [newcomer]))
+    top1 = [m[0][0] for m in view.match(queries, k=2)]
+    expected = [f"E{i:04d}" for i in range(0, 300, 3)] + ["NEW"]
+    assert np.mean([a == b for a, b in zip(top1, expected)]) >= 0.95
+    assert top1[-1] == "NEW"
+    # bruteforce is the gallery's own exact scan, not an index
+    assert create_index("bruteforce") is None
+
+
+def test_store_persists_index_per_generation(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "FACE_INDEX", "ivf")
+    monkeypatch.setattr(config, "INDEX_MIN_ROWS", 100)
+    store = EmbeddingStore(str(tmp_path / "faces.store"))
+    store.write_dict(_clustered(n_labels=50))
+    # persisted by the writer, so no reader has to train it
+    assert [p for p in os.listdir(store.path) if p.startswith("ivf-1-")]
+
+    gallery = store.load()
+    assert isinstance(gallery.index, IVFIndex)
+    assert [p for p in os.listdir(store.path) if p.startswith("ivf-1-")]
+
+    store.write_dict(_clustered(n_labels=60, seed=3))
+    store.load()
+    names = [p for p in os.listdir(store.path) if p.startswith("ivf-")]
+    assert names and all(p.startswith("ivf-2-") for p in names)
+
+
+def test_compaction_reuses_centroids_until_the_gallery_grows(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "FACE_INDEX", "ivf")
+    monkeypatch.setattr(config, "INDEX_MIN_ROWS", 100)
+    monkeypatch.setattr("face_recognition.embedding_store.start_compactor", lambda store: None)
+    store = EmbeddingStore(str(tmp_path / "faces.store"))
+    store.write_dict(_clustered(n_labels=50))
+    first = store.load().index
+    trained = []
+    monkeypatch.setattr(IVFIndex, "_kmeans", lambda self, m, n: trained.append(m.shape[0]) or first.centroids)
+
+    store.add("NEW", np.random.default_rng(5).normal(size=64))
+    store.compact()
+    reused = store.load().index
+    assert trained == [] and reused.trained_rows == 200
+    np.testing.assert_array_equal(reused.centroids, first.centroids)
+    assert len(reused.order) == 201
+
+    # past IVF_RETRAIN_GROWTH times the trained size the centroids are retrained
+    store.update(_clustered(n_labels=100, seed=4))
+    assert trained == [401]
@@ -0,0 +1,31 @@
+import time
+
+import numpy as np
+
+import face_recognition.recognize_wrapper as rw
+from face_recognition.embedding_store import EmbeddingStore
+from face_recognition.gallery_watcher import notify_gallery_changed
+
+
+def test_new_enrollment_is_recognizable_without_new_recognizer(tmp_path, monkeypatch, fake_face_analysis):
+    fake_face_analysis(object())
+    monkeypatch.setattr("face_recognition.embedding_store.start_compactor", lambda store: None)
+    path = str(tmp_path / "faces.store")
+    store = EmbeddingStore(path)
+    store.write_dict({"E001": np.eye(8)[0]})
+
+    recognizer = rw.Recognizer(path)
+    old = recognizer.gallery
+    assert list(old.labels) == ["E001"]
+
+    store.add("E042", np.eye(8)[5])
+    notify_gallery_changed(path)
+
+    deadline = time.time() + 5.0
+    while time.time() < deadline and "E042" not in list(recognizer.gallery.labels):
+        time.sleep(0.02)
+
+    assert "E042" in list(recognizer.gallery.labels)
+    assert recognizer.gallery.match(np.eye(8)[5], k=1)[0][0][0] == "E042"
+    # the snapshot held by in-flight frames is unchanged
+    assert list(old.labels) == ["E001"]
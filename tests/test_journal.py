@@ -0,0 +1,32 @@
+import threading
+
+import numpy as np
+
+from face_recognition.journal import EnrollmentJournal, read_records
+
+
+def test_concurrent_appends_are_durable_and_decodable(tmp_path):
+    journal = EnrollmentJournal(str(tmp_path / "journal.log"), fsync_interval=0.01)
+
+    def enroll(i):
+        journal.append(f"E{i:03d}", np.full((1, 4), i, dtype=np.float32))
+
+    threads = [threading.Thread(target=enroll, args=(i,)) for i in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    records = read_records(journal.path)
+    assert sorted(label for label, _ in records) == [f"E{i:03d}" for i in range(10)]
+    assert all(vec[0] == int(label[1:]) for label, vec in records)
+
+
+def test_torn_tail_is_ignored(tmp_path):
+    journal = EnrollmentJournal(str(tmp_path / "journal.log"))
+    journal.append("E001", np.ones(4))
+    journal.append("E002", np.ones(4))
+    data = (tmp_path / "journal.log").read_bytes()
+    (tmp_path / "journal.log").write_bytes(data[:-3])
+
+    assert [label for label, _ in read_records(journal.path)] == ["E001"]
@@ -0,0 +1,92 @@
+import json
+import urllib.request
+
+import numpy as np
+
+import face_recognition.config as face_config
+from face_recognition import metrics
+from face_recognition.frame_source import SyntheticSource
+from face_recognition.pipeline import recognize_stream
+from face_recognition.recognize_wrapper import FramePlan
+
+
+def test_disabled_metrics_are_shared_noops(monkeypatch):
+    monkeypatch.setattr(face_config, "METRICS", False)
+    monkeypatch.setattr(metrics, "_metrics", None)
+    assert metrics.timer("detect") is metrics.timer("embed")
+    with metrics.timer("detect"):
+        metrics.incr("frames_processed")
+    assert metrics.get_metrics() is None and metrics._metrics is None
+
+
+def test_histogram_quantiles_and_counters():
+    m = metrics.Metrics()
+    for ms in [1, 2, 3, 4, 40]:
+        m.observe("detect", ms / 1000)
+    m.incr("faces_detected", 3)
+    m.incr("faces_detected")
+    snap = m.snapshot()
+    detect = snap["stages"]["detect"]
+    assert detect["count"] == 5 and abs(detect["max"] - 0.040) < 1e-9
+    assert detect["p50"] == 0.005 and detect["p95"] == 0.040
+    assert snap["counters"] == {"faces_detected": 4}
+    assert "detect: n=5" in m.summary() and "faces_detected=4" in m.summary()
+
+
+def test_endpoint_serves_prometheus_text_and_json():
+    m = metrics.Metrics()
+    m.observe("embed", 0.012)
+    m.incr("decisions_made")
+    server = metrics.MetricsServer(m, port=0).start()
+    try:
+        base = f"http://127.0.0.1:{server.port}"
+        text = urllib.request.urlopen(base + "/metrics", timeout=5).read().decode()
+        assert 'clara_face_stage_seconds_bucket{stage="embed",le="0.025"} 1' in text
+        assert 'clara_face_stage_seconds_count{stage="embed"} 1' in text
+        assert "clara_face_decisions_made_total 1" in text
+        data = json.loads(urllib.request.urlopen(base + "/metrics.json", timeout=5).read())
+        assert data["counters"]["decisions_made"] == 1
+    finally:
+        server.stop()
+
+
+def test_pipeline_records_stages_and_counters(monkeypatch):
+    monkeypatch.setattr(face_config, "METRICS", True)
+    monkeypatch.setattr(face_config, "METRICS_PORT", 0)
+    monkeypatch.setattr(face_config, "METRICS_LOG_INTERVAL_SECS", 0)
+    monkeypatch.setattr(metrics, "_metrics", None)
+
+    class FakeRecognizer:
+        def plan(self, frame, tracker=None):
+            metrics.incr("frames_processed")
+            return FramePlan([], faces=0)
+
+        def complete_frames(self, items, tracker=None):
+            return [[] for _ in items]
+
+    class StillGate:
+        def has_motion(self, frame):
+            return int(frame[0, 0, 0]) == 0
+
+    frames = [np.full((24, 32, 3), v, dtype=np.uint8) for v in (0, 1, 1, 0)]
+    source = SyntheticSource(width=32, height=24, realtime=False, frames=4)
+    source._read = lambda: frames.pop(0) if frames else None
+    list(recognize_stream(FakeRecognizer(), source.start(), gate=StillGate()))
+    snap = metrics.get_metrics().snapshot()
+    assert snap["counters"]["frames_processed"] == 2
+    assert snap["counters"]["frames_skipped"] == 2
+    assert snap["stages"]["frame_read"]["count"] >= 4
+
+
+def test_second_process_endpoint_takes_the_next_free_port():
+    first = metrics.MetricsServer(metrics.Metrics(), port=0).start()
+    try:
+        # a job process finding the configured port taken moves up instead of going dark
+        second = metrics.MetricsServer(metrics.Metrics(), port=first.port).start()
+        try:
+            assert first.port < second.port < first.port + face_config.DEBUG_PORT_ATTEMPTS
+            assert urllib.request.urlopen(f"http://127.0.0.1:{second.port}/metrics.json").status == 200
+        finally:
+            second.stop()
+    finally:
+        first.stop()
@@ -0,0 +1,102 @@
+import threading
+
+import pytest
+
+import face_recognition.models as models
+
+
+class FakeFaceAnalysis:
+    instances = 0
+
+    def __init__(self, name, providers, allowed_modules=None, sess_options=None):
+        FakeFaceAnalysis.instances += 1
+        self.name = name
+        self.providers = providers
+        self.allowed_modules = allowed_modules
+        self.sess_options = sess_options
+
+    def prepare(self, ctx_id, det_size):
+        self.det_size = det_size
+
+    def get(self, img):
+        return []
+
+
+def test_registry_shares_one_model_per_key(monkeypatch):
+    class FakeInsightface:
+        class app:
+            FaceAnalysis = FakeFaceAnalysis
+
+    monkeypatch.setattr(models, "insightface", FakeInsightface)
+    monkeypatch.setattr(models, "_models", {})
+    FakeFaceAnalysis.instances = 0
+
+    seen = []
+    threads = [threading.Thread(target=lambda: seen.append(models.get_face_analysis())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert FakeFaceAnalysis.instances == 1
+    assert all(m is seen[0] for m in seen)
+    assert sorted(seen[0].allowed_modules) == ["detection", "recognition"]
+    assert models.get_face_analysis(modules=("recognition", "detection")) is seen[0]
+
+    small = models.warmup(det_size=(320, 320))
+    assert small is not seen[0] and small.det_size == (320, 320)
+    full = models.get_face_analysis(modules=())
+    assert full.allowed_modules is None
+    assert len(models.loaded_models()) == 3
+
+    assert models.release(det_size=(320, 320)) == 1
+    assert models.release() == 2
+    assert models.loaded_models() == []
+
+
+def test_session_settings_layer_env_and_per_pack_overrides(monkeypatch):
+    monkeypatch.setenv("VR_ORT_OPTIONS", "intra_op_threads=3,memory_arena=0")
+    monkeypatch.setenv("VR_ORT_OPTIONS_BUFFALO_S", "intra_op_threads=1,graph_optimization=basic")
+    monkeypatch.setitem(models.config.ORT_MODEL_OPTIONS, "buffalo_s", {"execution_mode": "parallel"})
+
+    assert models.session_settings("buffalo_l")["intra_op_threads"] == 3
+    small = models.session_settings("buffalo_s")
+    assert (small["intra_op_threads"], small["graph_optimization"], small["execution_mode"], small["memory_arena"]) == (1, "basic", "parallel", False)
+    assert models.session_settings("buffalo_s", {"intra_op_threads": 4})["intra_op_threads"] == 4
+
+    options = models.make_session_options(small)
+    assert options.intra_op_num_threads == 1 and not options.enable_cpu_mem_arena
+    assert options.graph_optimization_level == models.onnxruntime.GraphOptimizationLevel.ORT_ENABLE_BASIC
+
+    monkeypatch.setenv("VR_ORT_OPTIONS", "threads=2")
+    with pytest.raises(ValueError, match="threads"):
+        models.session_settings("buffalo_l")
+
+
+def test_pack_dir_links_only_the_wanted_modules(tmp_path):
+    pack = tmp_path / "models" / "buffalo_l"
+    pack.mkdir(parents=True)
+    for name in ("det_10g.onnx", "w600k_r50.onnx", "1k3d68.onnx", "2d106det.onnx", "genderage.onnx", "custom.onnx"):
+        (pack / name).write_bytes(b"onnx")
+
+    subset = models.pack_dir("buffalo_l", ("detection", "recognition"), root=str(tmp_path))
+    assert subset == str(pack / ".modules-detection-recognition")
+    # unknown files are kept for FaceAnalysis to classify
+    assert sorted(p.name for p in (pack / ".modules-detection-recognition").iterdir()) == ["custom.onnx", "det_10g.onnx", "w600k_r50.onnx"]
+    assert models.pack_dir("buffalo_l", ("recognition", "detection"), root=str(tmp_path)) == subset
+
+    assert models.pack_dir("buffalo_l", (), root=str(tmp_path)) == "buffalo_l"
+    assert models.pack_dir("buffalo_s", ("detection",), root=str(tmp_path)) == "buffalo_s"
+
+
+def test_missing_detection_pack_falls_back_to_the_recognition_pack(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(models.config, "DETECT_MODEL", "buffalo_s")
+    monkeypatch.setattr(models.config, "RECOGNITION_MODEL", "buffalo_l")
+    monkeypatch.setattr(models, "_missing_packs_logged", set())
+    with caplog.at_level("WARNING", logger=models.__name__):
+        assert models.detection_pack(str(tmp_path)) == "buffalo_l"
+        assert models.detection_pack(str(tmp_path)) == "buffalo_l"
+    assert len([r for r in caplog.records if "buffalo_s is not installed" in r.getMessage()]) == 1
+
+    (tmp_path / "models" / "buffalo_s").mkdir(parents=True)
+    assert models.detection_pack(str(tmp_path)) == "buffalo_s"
@@ -0,0 +1,24 @@
+import numpy as np
+
+from face_recognition.motion import FramePacer, MotionGate
+
+
+def test_static_frames_are_gated_and_motion_passes():
+    gate = MotionGate()
+    lobby = np.full((480, 640, 3), 90, dtype=np.uint8)
+
+    assert gate.has_motion(lobby)  # first frame seeds the background
+    assert not gate.has_motion(lobby.copy())
+    noisy = np.clip(lobby.astype(int) + np.random.default_rng(0).integers(-3, 4, lobby.shape), 0, 255).astype(np.uint8)
+    assert not gate.has_motion(noisy)
+
+    visitor = lobby.copy()
+    visitor[150:400, 250:400] = 220
+    assert gate.has_motion(visitor)
+
+
+def test_pacer_switches_between_idle_and_active():
+    pacer = FramePacer(idle_fps=2, active_fps=30, active_hold_s=5)
+    assert not pacer.active
+    pacer.mark_activity()
+    assert pacer.active
@@ -0,0 +1,41 @@
+import time
+
+import cv2
+import numpy as np
+
+import face_recognition.enroll_faces as ef
+from face_recognition.embedding_store import EmbeddingStore
+from face_recognition.photo_watcher import PhotoWatcher
+
+
+class FakeModel:
+    def get(self, img):
+        face = type("Face", (), {})()
+        face.bbox = np.array([0, 0, 8, 8], dtype=np.float32)
+        face.embedding = np.r_[img[0, 0].astype(np.float32), 1.0]
+        return [face]
+
+
+def test_polling_watcher_enrolls_dropped_photo(tmp_path, monkeypatch):
+    monkeypatch.setattr(ef, "_worker_model", FakeModel())
+    monkeypatch.setattr("face_recognition.embedding_store.start_compactor", lambda store: None)
+    photos = tmp_path / "photos"
+    photos.mkdir()
+    cv2.imwrite(str(photos / "E001.png"), np.full((8, 8, 3), 90, dtype=np.uint8))
+    output = str(tmp_path / "faces.store")
+
+    watcher = PhotoWatcher(str(photos), output, poll_interval=0.05, debounce=0.05, use_notifications=False).start()
+    try:
+        store = EmbeddingStore(output)
+        deadline = time.time() + 5.0
+        while time.time() < deadline and watcher.runs < 1:
+            time.sleep(0.02)
+        assert sorted(store.to_dict()) == ["E001"]
+
+        cv2.imwrite(str(photos / "E050.png"), np.full((8, 8, 3), 30, dtype=np.uint8))
+        deadline = time.time() + 5.0
+        while time.time() < deadline and watcher.runs < 2:
+            time.sleep(0.02)
+        assert sorted(store.to_dict()) == ["E001", "E050"]
+    finally:
+        watcher.stop()
@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from face_recognition.frame_source import SyntheticSource
+from face_recognition.pipeline import CLOSED, DropOldestQueue, recognize_stream
+from face_recognition.recognize_wrapper import FramePlan
+
+
+class FakeRecognizer:
+    def __init__(self, faces=1):
+        self.faces = faces
+        self.planned = []
+
+    def plan(self, frame, tracker=None):
+        self.planned.append(int(frame[0, 0, 0]))
+        return FramePlan([], faces=self.faces)
+
+    def complete_frames(self, items, tracker=None):
+        return [self.complete(frame, plan, tracker) for frame, plan in items]
+
+    def complete(self, frame, plan, tracker=None):
+        return [{"emp_id": "E001", "bbox": (0, 0, 10, 10), "conf": 0.9}] if plan.faces else []
+
+
+def test_queue_drops_oldest_when_full():
+    q = DropOldestQueue(2)
+    for i in range(4):
+        q.put(i)
+    assert q.dropped == 2
+    assert [q.get(timeout=0), q.get(timeout=0)] == [2, 3]
+    assert q.get(timeout=0) is None
+    q.close()
+    assert q.get(timeout=0) is CLOSED
+
+
+def test_lossless_queue_waits_for_space():
+    q = DropOldestQueue(1, lossless=True)
+    q.put("a")
+    writer = threading.Thread(target=q.put, args=("b",))
+    writer.start()
+    writer.join(timeout=0.1)
+    assert writer.is_alive()
+    assert q.get(timeout=1) == "a"
+    writer.join(timeout=1)
+    assert q.get(timeout=1) == "b" and q.dropped == 0
+
+
+def test_stream_processes_every_replayed_frame_in_order():
+    source = SyntheticSource(width=32, height=24, realtime=False, frames=6).start()
+    recognizer = FakeRecognizer()
+    out = list(recognize_stream(recognizer, source))
+    assert len(out) == 6
+    assert all(results[0]["emp_id"] == "E001" for _, results in out)
+    assert len(recognizer.planned) == 6
+
+
+def test_stream_stops_on_timeout_and_joins_its_threads():
+    source = SyntheticSource(width=32, height=24, realtime=True, fps=50).start()
+    before = threading.active_count()
+    stop = threading.Event()
+    frames = 0
+    for frame, results in recognize_stream(FakeRecognizer(), source, timeout_s=0.3, stop=stop):
+        frames += 1
+    source.stop()
+    assert frames > 0
+    assert threading.active_count() <= before
+
+
+def test_stream_reraises_stage_errors():
+    class Broken(FakeRecognizer):
+        def plan(self, frame, tracker=None):
+            raise ValueError("detector failed")
+
+    source = SyntheticSource(width=32, height=24, realtime=False, frames=3).start()
+    with pytest.raises(ValueError, match="detector failed"):
+        list(recognize_stream(Broken(), source))
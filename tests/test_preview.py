@@ -0,0 +1,69 @@
+import time
+import urllib.request
+
+import cv2
+import numpy as np
+
+from face_recognition import config
+from face_recognition.preview import MjpegServer, Preview
+
+
+def test_headless_preview_does_no_gui_work_without_viewers(monkeypatch):
+    monkeypatch.setattr(cv2, "imshow", lambda *a: (_ for _ in ()).throw(AssertionError("imshow called")))
+    preview = Preview("test", headless=True)
+    preview.stream = None
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    assert not preview.active
+    assert preview.show(frame, [{"emp_id": "E001", "bbox": (5, 5, 20, 20)}], text="hello")
+    assert not frame.any()
+
+
+def test_mjpeg_stream_serves_annotated_frames_to_viewers():
+    server = MjpegServer(port=0, fps=1000).start()
+    try:
+        preview = Preview("test", headless=True)
+        preview.stream = server
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        assert not preview.active
+
+        response = urllib.request.urlopen(f"http://127.0.0.1:{server.port}/stream.mjpg", timeout=5)
+        assert response.headers["Content-Type"].startswith("multipart/x-mixed-replace")
+        deadline = time.time() + 5
+        while server.clients == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        assert preview.active
+        preview.show(frame, [{"emp_id": "E001", "bbox": (5, 5, 20, 20)}])
+        assert not frame.any()  # annotations go on a copy
+
+        part = response.read(200)
+        assert b"Content-Type: image/jpeg" in part and b"\xff\xd8" in part
+        jpeg = server.latest()
+        decoded = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+        assert decoded.shape == frame.shape and decoded.any()
+        response.close()
+    finally:
+        server.stop()
+
+
+def test_second_process_stream_takes_the_next_free_port():
+    first = MjpegServer(port=0).start()
+    try:
+        second = MjpegServer(port=first.port).start()
+        try:
+            assert first.port < second.port < first.port + config.DEBUG_PORT_ATTEMPTS
+        finally:
+            second.stop()
+    finally:
+        first.stop()
+
+
+def test_headless_show_keeps_deliberate_pauses():
+    preview = Preview("test", headless=True)
+    preview.stream = None
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    start = time.monotonic()
+    preview.show(frame)
+    assert time.monotonic() - start < 0.05
+    start = time.monotonic()
+    preview.show(frame, text="Adjust lighting", delay_ms=200)
+    assert time.monotonic() - start >= 0.19
@@ -0,0 +1,69 @@
+import cv2
+import numpy as np
+
+import face_recognition.recognize_wrapper as rw
+from face_recognition.quality import assess
+
+# five keypoints of a frontal face in a 100x100 box at (100, 100)
+FRONTAL = np.array([[135, 140], [165, 140], [150, 158], [138, 176], [162, 176]], dtype=np.float32)
+BOX = np.array([100, 100, 200, 200], dtype=np.float32)
+
+
+def _frame(seed=0, level=128):
+    rng = np.random.default_rng(seed)
+    frame = np.full((480, 640, 3), level, dtype=np.uint8)
+    texture = rng.integers(-60, 60, size=(100, 100, 1))
+    frame[100:200, 100:200] = np.clip(level + texture, 0, 255).astype(np.uint8)
+    return frame
+
+
+def test_quality_checks_each_failure_mode():
+    frame = _frame()
+    good = assess(frame, BOX, FRONTAL)
+    assert good.ok and 0 < good.score <= 1
+
+    assert assess(cv2.GaussianBlur(frame, (21, 21), 8), BOX, FRONTAL).reason == "too blurry"
+    assert assess(_frame(level=25), BOX, FRONTAL).reason == "too dark"
+    assert assess(frame, np.array([100, 100, 120, 120]), None).reason == "face too small"
+    turned = FRONTAL.copy()
+    turned[2, 0] += 18
+    assert assess(frame, BOX, turned).reason == "not facing the camera"
+    assert assess(frame, BOX, turned).score < good.score
+
+
+class FakeDetector:
+    def detect(self, frame, max_num=0, metric="default"):
+        return np.array([[100, 100, 200, 200, 0.9]], dtype=np.float32), FRONTAL[None]
+
+
+class FakeArcFace:
+    calls = 0
+
+    def get(self, frame, face):
+        FakeArcFace.calls += 1
+        face.embedding = np.eye(8, dtype=np.float32)[1]
+
+
+class FakeApp:
+    det_model = FakeDetector()
+    models = {"recognition": FakeArcFace()}
+
+
+def test_recognizer_skips_embedding_for_unusable_crops(eye_store, fake_face_analysis, monkeypatch):
+    from face_recognition import metrics
+
+    monkeypatch.setattr(rw.config, "METRICS", True)
+    monkeypatch.setattr(rw.config, "METRICS_PORT", 0)
+    monkeypatch.setattr(rw.config, "METRICS_LOG_INTERVAL_SECS", 0)
+    monkeypatch.setattr(metrics, "_metrics", None)
+    fake_face_analysis(FakeApp())
+    assert rw.Recognizer(eye_store, hot_reload=False).quality_gate is False
+    recognizer = rw.Recognizer(eye_store, hot_reload=False, quality_gate=True)
+
+    FakeArcFace.calls = 0
+    assert recognizer.recognize_frame(cv2.GaussianBlur(_frame(), (21, 21), 8)) == []
+    assert FakeArcFace.calls == 0
+    assert metrics.get_metrics().snapshot()["counters"]["faces_gated"] == 1
+
+    results = recognizer.recognize_frame(_frame())
+    assert FakeArcFace.calls == 1 and results[0]["emp_id"] == "E001"
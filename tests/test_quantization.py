@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+
+from face_recognition import config
+from face_recognition.embedding_store import EmbeddingStore
+from face_recognition.gallery import Gallery, normalize_rows
+from face_recognition.quantization import QuantizedMatrix
+
+
+def _data(n_labels=200, per_label=3, dim=128, seed=0):
+    rng = np.random.default_rng(seed)
+    return {f"E{i:04d}": rng.normal(size=(per_label, dim)) for i in range(n_labels)}
+
+
+def test_compact_modes_match_float32_after_rescoring():
+    data = _data()
+    exact = Gallery.from_dict(data)
+    queries = normalize_rows(np.stack([data[f"E{i:04d}"][2] + 0.3 for i in range(0, 200, 9)]))
+    want = exact.match(queries, k=3)
+
+    for precision, footprint in (("float16", 2), ("int8", 1)):
+        compact = Gallery.from_dict(data)
+        compact.quantized = QuantizedMatrix.quantize(compact.matrix, precision)
+        assert compact.quantized.data.nbytes == compact.matrix.size * footprint
+        approx = compact.quantized.scores(queries)
+        assert np.abs(approx - queries @ compact.matrix.T).max() < 0.02
+
+        got = compact.match(queries, k=3)
+        assert [[label for label, _ in m] for m in got] == [[label for label, _ in m] for m in want]
+        # rescored against float32 rows, so the reported scores are exact
+        np.testing.assert_allclose([[s for _, s in m] for m in got], [[s for _, s in m] for m in want], rtol=1e-5)
+
+
+def test_store_persists_int8_copy(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "GALLERY_PRECISION", "int8")
+    store = EmbeddingStore(str(tmp_path / "faces.store"))
+    store.write_dict(_data(n_labels=20))
+
+    gallery = store.load()
+    assert gallery.quantized.precision == "int8"
+    assert sorted(p for p in os.listdir(store.path) if p.startswith("quantized-")) == ["quantized-1-int8-scales.npy", "quantized-1-int8.npy"]
+    assert gallery.match(gallery.rows(5)[:1], k=1)[0][0][0] == "E0005"
@@ -0,0 +1,72 @@
+import cv2
+import numpy as np
+from livekit import rtc
+
+from face_recognition.room_video import RoomVideoSource, frame_to_bgr
+
+
+def _bgr_frame(h=48, w=64):
+    frame = np.zeros((h, w, 3), dtype=np.uint8)
+    frame[:, : w // 2] = (255, 0, 0)
+    frame[:, w // 2 :] = (0, 0, 255)
+    return frame
+
+
+def test_frame_conversion_from_i420_and_bgra():
+    bgr = _bgr_frame()
+    i420 = cv2.cvtColor(bgr, cv2.COLOR_BGR2YUV_I420)
+    out = frame_to_bgr(rtc.VideoFrame(64, 48, rtc.VideoBufferType.I420, i420.tobytes()))
+    assert out.shape == (48, 64, 3)
+    assert np.abs(out.astype(int) - bgr).mean() < 8
+
+    bgra = cv2.cvtColor(bgr, cv2.COLOR_BGR2BGRA)
+    out = frame_to_bgr(rtc.VideoFrame(64, 48, rtc.VideoBufferType.BGRA, bgra.tobytes()), max_width=32)
+    assert out.shape == (24, 32, 3)
+    np.testing.assert_array_equal(out[:, 0], np.tile([255, 0, 0], (24, 1)))
+
+
+def test_room_source_serves_newest_frame_through_a_cursor():
+    source = RoomVideoSource(max_width=0)
+    source.room = object()
+    cursor = source.cursor()
+    assert cursor.read(timeout=0.01) == (False, None)
+
+    bgra = cv2.cvtColor(_bgr_frame(), cv2.COLOR_BGR2BGRA)
+    for _ in range(3):  # frames nobody read in between are dropped, never converted
+        source._on_frame(rtc.VideoFrame(64, 48, rtc.VideoBufferType.BGRA, bgra.tobytes()))
+    ok, frame = cursor.read(timeout=0.1)
+    assert ok and frame.shape == (48, 64, 3)
+    seq, latest = source.latest()
+    assert seq == 3 and latest is frame
+    assert cursor.read(timeout=0.01) == (False, None)
+
+
+def test_frames_are_converted_without_blocking_the_event_loop(monkeypatch):
+    import threading
+
+    import face_recognition.room_video as room_video
+
+    source = RoomVideoSource(max_width=0)
+    source.room = object()
+    bgra = cv2.cvtColor(_bgr_frame(), cv2.COLOR_BGR2BGRA)
+    source._on_frame(rtc.VideoFrame(64, 48, rtc.VideoBufferType.BGRA, bgra.tobytes()))
+
+    converting, release = threading.Event(), threading.Event()
+
+    def slow_convert(frame, max_width=0):
+        converting.set()
+        release.wait(5)
+        return frame_to_bgr(frame, max_width)
+
+    monkeypatch.setattr(room_video, "frame_to_bgr", slow_convert)
+    reader = threading.Thread(target=source.latest)
+    reader.start()
+    assert converting.wait(5)
+    # the event loop publishes the next frame while the reader is still converting
+    publisher = threading.Thread(target=source._on_frame, args=(rtc.VideoFrame(64, 48, rtc.VideoBufferType.BGRA, bgra.tobytes()),))
+    publisher.start()
+    publisher.join(1)
+    assert not publisher.is_alive()
+    release.set()
+    reader.join(5)
+    assert source.latest()[0] == 2
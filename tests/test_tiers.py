@@ -0,0 +1,56 @@
+import numpy as np
+
+import face_recognition.recognize_wrapper as rw
+
+KPS = np.array([[130, 140], [170, 140], [150, 160], [135, 180], [165, 180]], dtype=np.float32)
+
+
+class LightDetector:
+    calls = 0
+
+    def detect(self, frame, max_num=0, metric="default"):
+        LightDetector.calls += 1
+        # a real face and a false positive in the corner
+        boxes = np.array([[100, 100, 200, 200, 0.8], [0, 0, 40, 40, 0.6]], dtype=np.float32)
+        return boxes, np.stack([KPS + 3, KPS])
+
+
+class HeavyDetector:
+    def __init__(self):
+        self.sizes = []
+
+    def detect(self, frame, input_size=None, max_num=0, metric="default"):
+        self.sizes.append(input_size)
+        if frame.shape[0] < 100:
+            return np.zeros((0, 5), dtype=np.float32), np.zeros((0, 5, 2), dtype=np.float32)
+        # crop coordinates: the padded crop around the real face starts at (50, 50)
+        return np.array([[52, 52, 148, 148, 0.95]], dtype=np.float32), (KPS - 50)[None]
+
+
+class ArcFace:
+    def __init__(self):
+        self.faces = []
+
+    def get(self, frame, face):
+        self.faces.append(face)
+        face.embedding = np.eye(8, dtype=np.float32)[3]
+
+
+class App:
+    def __init__(self, det_model, rec=None):
+        self.det_model = det_model
+        self.models = {"recognition": rec} if rec else {}
+
+
+def test_light_detector_runs_on_frames_and_heavy_pack_confirms_crops(eye_store, fake_face_analysis):
+    heavy = fake_face_analysis(App(HeavyDetector(), ArcFace()), detector=App(LightDetector()))
+    recognizer = rw.Recognizer(eye_store, hot_reload=False, quality_gate=False, mode="all")
+    assert recognizer.tiered
+
+    results = recognizer.recognize_frame(np.zeros((480, 640, 3), dtype=np.uint8))
+    assert LightDetector.calls == 1
+    assert [r["emp_id"] for r in results] == ["E003"]
+    # the corner false positive never reached ArcFace; the real face uses the heavy detector's keypoints
+    (face,) = heavy.models["recognition"].faces
+    np.testing.assert_allclose(face.kps, KPS)
+    assert set(heavy.det_model.sizes) == {rw.config.CONFIRM_DET_SIZE}
@@ -0,0 +1,90 @@
+import numpy as np
+
+import face_recognition.recognize_wrapper as rw
+from face_recognition.tracker import FaceTracker, iou_matrix, subject_scores
+
+
+def test_iou_matrix():
+    a = np.array([[0, 0, 10, 10]])
+    b = np.array([[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]])
+    np.testing.assert_allclose(iou_matrix(a, b)[0], [1.0, 50 / 150, 0.0], rtol=1e-6)
+
+
+def test_track_keeps_id_and_only_reembeds_when_needed():
+    tracker = FaceTracker(confirm_embeds=1, refresh_s=2.0, reembed_iou=0.6)
+
+    (track,) = tracker.update([[100, 100, 200, 200]])
+    assert tracker.needs_embedding(track, now=0.0)
+    tracker.assign_identity(track, "E001", 0.9, [("E001", 0.9)], now=0.0)
+
+    # small jitter: same track, cached identity is reused
+    (same,) = tracker.update([[102, 101, 203, 201]])
+    assert same is track
+    assert not tracker.needs_embedding(same, now=0.5)
+
+    # refresh interval expired
+    assert tracker.needs_embedding(same, now=2.5)
+
+    # large move keeps the track but invalidates the identity
+    (moved,) = tracker.update([[140, 100, 240, 200]])
+    assert moved is track
+    assert tracker.needs_embedding(moved, now=0.6)
+
+
+def test_new_face_gets_new_track_and_lost_tracks_expire():
+    tracker = FaceTracker(max_missed=1)
+    first, = tracker.update([[0, 0, 50, 50]])
+    a, b = tracker.update([[1, 1, 51, 51], [300, 300, 350, 350]])
+    assert a is first and b.track_id != first.track_id
+
+    tracker.update(np.zeros((0, 4)))
+    tracker.update(np.zeros((0, 4)))
+    assert tracker.tracks == []
+
+
+def test_primary_subject_prefers_large_central_faces_and_is_sticky():
+    frame_shape = (480, 640, 3)
+    center, corner = [270, 190, 370, 290], [0, 0, 110, 110]
+    scores = subject_scores(np.array([center, corner]), frame_shape)
+    assert scores[0] > scores[1]
+
+    tracker = FaceTracker()
+    tracks = tracker.update([center, [500, 200, 590, 290]])
+    assert tracker.select_primary(tracks, frame_shape) is tracks[0]
+    # the other person steps slightly closer: not enough to steal the primary slot
+    tracks = tracker.update([center, [495, 195, 600, 300]])
+    assert tracker.select_primary(tracks, frame_shape) is tracks[0]
+
+
+class _Detector:
+    def detect(self, frame, max_num=0, metric="default"):
+        boxes = [[270, 190, 370, 290, 0.9], [20, 20, 80, 80, 0.9], [540, 30, 600, 90, 0.9]]
+        return np.array(boxes, dtype=np.float32), None
+
+
+class _ArcFace:
+    calls = 0
+
+    def get(self, frame, face):
+        _ArcFace.calls += 1
+        face.embedding = np.eye(8, dtype=np.float32)[2]
+
+
+class _App:
+    det_model = _Detector()
+    models = {"recognition": _ArcFace()}
+
+
+def test_primary_mode_embeds_one_face_and_all_mode_embeds_every_face(eye_store, fake_face_analysis):
+    fake_face_analysis(_App())
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    primary = rw.Recognizer(eye_store, hot_reload=False, quality_gate=False, mode="primary")
+    _ArcFace.calls = 0
+    results = primary.recognize_frame(frame, tracker=FaceTracker())
+    assert _ArcFace.calls == 1
+    assert [(r["emp_id"], r["primary"]) for r in results] == [("E002", True), ("Unknown", False), ("Unknown", False)]
+
+    everyone = rw.Recognizer(eye_store, hot_reload=False, quality_gate=False, mode="all")
+    _ArcFace.calls = 0
+    assert len(everyone.recognize_frame(frame)) == 3 and _ArcFace.calls == 3